@@ -0,0 +1,955 @@
+import os
+import asyncio
+import contextlib
+import functools
+import datetime
+import time
+import inspect
+import itertools
+import json
+from typing import Dict, List, Any, Optional, Callable, Union
+from playwright.async_api import async_playwright, Page, Browser, BrowserContext, Playwright, Response, Route
+
+from network import NetworkInterceptor, format_response_body, format_responses, parse_bool, NOT_CAPTURED
+from http_cache import HttpCache, CACHE_DIR as HTTP_CACHE_DIR, has_credentials
+from browser import (format_cookies, format_storage, format_elements, element_query_options,
+                     parse_extract_schema, format_extract_result, SB_HELPERS_SCRIPT, SB_CALL, SB_CALL_ELEMENTS,
+                     SNAPSHOT_SCRIPT, SNAPSHOT_TAKE, format_snapshot, format_dom_diff, snapshot_hash,
+                     resolve_init_scripts, session_option_defaults, apply_start_options,
+                     START_OPTION_GROUPS, RECYCLE_OPTION_GROUPS)
+
+
+class AsyncBrowserController:
+    def __init__(self):
+        self.browser: Optional[Browser] = None
+        self.page: Optional[Page] = None
+        self.context: Optional[BrowserContext] = None
+        self.playwright: Optional[Playwright] = None
+        self.running = False
+        self.current_page_index = 0
+        self.pages: List[Page] = []
+        self.page_ids: Dict[str, Page] = {}
+        self.page_id_counter = itertools.count(1)
+        self.browser_type = "chromium"
+        self.browser_options = {
+            "headless": False,
+            "slow_mo": 50,
+        }
+        self.context_options = {
+            "viewport": {"width": 1280, "height": 800},
+            "ignore_https_errors": True,
+            "java_script_enabled": True,
+        }
+        self.network_options = {
+            "block_resources": None,
+            "block_trackers": False,
+            "block_urls": None,
+            "capture_responses": False,
+            "max_captured_responses": 100,
+        }
+        self.network: Optional[NetworkInterceptor] = None
+        self.network_routed = False
+        # 磁盘HTTP缓存在上下文之间共享，开启后所有请求都先经过缓存
+        self.http_cache_options = {
+            "http_cache": False,
+            "http_cache_dir": HTTP_CACHE_DIR,
+            "http_cache_size_mb": 500,
+            "http_cache_mode": "normal",
+        }
+        self.http_cache: Optional[HttpCache] = None
+        # HAR 录制与回放：record_har 将上下文的所有请求在关闭时保存为HAR文件，
+        # replay_har 从HAR文件返回响应，未录制的请求按 har_not_found 中止(abort)或继续访问网络(fallback)
+        self.har_options = {
+            "record_har": None,
+            "replay_har": None,
+            "har_url_filter": None,
+            "har_not_found": "abort",
+        }
+        # 注入每个页面的初始化脚本：inject_jquery 注入 jquery/ 目录中的 jQuery，
+        # init_scripts 为 register_init_script 注册的脚本名称列表（逗号分隔）
+        self.script_options = {
+            "inject_jquery": False,
+            "init_scripts": None,
+        }
+        self.session_option_defaults = session_option_defaults(self)
+        self.event_listeners = {
+            "browser_closed": [],
+        }
+        self._trigger_event_called = False
+        self._start_lock: Optional[asyncio.Lock] = None
+        # 浏览器意外断开后关闭旧的上下文和 playwright 驱动进程的任务，下次启动前需等待其完成
+        self._closing: Optional[asyncio.Future] = None
+        # 指令共享当前上下文并发执行，回收上下文需等待进行中的指令结束，期间新的指令排队等待
+        self._context_condition: Optional[asyncio.Condition] = None
+        self._active_commands = 0
+        self._recycling = False
+        # 每个浏览器进程最多创建的上下文数量，0 表示不限制
+        self.max_context_reuse = 0
+        self.contexts_served = 0
+        # 每个标签页最近一次的快照，DOM版本未变化时直接复用
+        self.snapshots: Dict[Page, Dict[str, Any]] = {}
+
+    # 事件监听
+    def add_event_listener(self, event_name: str, callback: Callable):
+        if event_name in self.event_listeners:
+            self.event_listeners[event_name].append(callback)
+            return True
+        return False
+
+    def remove_event_listener(self, event_name: str, callback: Callable):
+        if event_name in self.event_listeners and callback in self.event_listeners[event_name]:
+            self.event_listeners[event_name].remove(callback)
+            return True
+        return False
+
+    def _trigger_event(self, event_name: str, *args, **kwargs):
+        self._trigger_event_called = True
+
+        if event_name in self.event_listeners:
+            for callback in self.event_listeners[event_name]:
+                try:
+                    result = callback(*args, **kwargs)
+                    if inspect.isawaitable(result):
+                        asyncio.ensure_future(result)
+                except Exception as e:
+                    print(f"事件回调执行出错: {str(e)}")
+
+    async def start_browser(self, browser_type=None, **kwargs):
+        bool_params = ["headless", "ignore_https_errors", "java_script_enabled"]
+
+        for param in bool_params:
+            if param in kwargs and isinstance(kwargs[param], str):
+                kwargs[param] = kwargs[param].lower() in ("true", "1", "yes")
+
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self.running:
+                return "浏览器已经在运行"
+
+            if self._closing is not None:
+                await self._closing
+                self._closing = None
+
+            if browser_type:
+                self.browser_type = browser_type
+
+            apply_start_options(self, kwargs, START_OPTION_GROUPS)
+
+            self._trigger_event_called = False
+
+            try:
+                self.playwright = await async_playwright().start()
+                self.contexts_served = 0
+                await self._launch_browser()
+                await self._open_context()
+                self.running = True
+            except Exception:
+                await self._close_playwright()
+                raise
+
+            return f"已启动 {self.browser_type} 浏览器"
+
+    async def _launch_browser(self):
+        if self.browser_type == "firefox":
+            browser_instance = self.playwright.firefox
+        elif self.browser_type == "webkit":
+            browser_instance = self.playwright.webkit
+        else:
+            browser_instance = self.playwright.chromium
+
+        self.browser = await browser_instance.launch(**self.browser_options)
+        self.browser.on("disconnected", lambda browser: self._on_browser_disconnected(browser))
+
+    async def _open_context(self):
+        self.context = await self.browser.new_context(**self.context_options, **self._har_record_options())
+        await self.context.add_init_script(script=SB_HELPERS_SCRIPT)
+        for script in resolve_init_scripts(self.script_options):
+            await self.context.add_init_script(script=script)
+        await self._setup_http_cache()
+        await self._setup_har_replay()
+        await self._setup_network()
+        self.contexts_served += 1
+        self.snapshots = {}
+        self.page = await self.context.new_page()
+        self.pages = [self.page]
+        self.current_page_index = 0
+        self.page_ids = {}
+        self.page_id_counter = itertools.count(1)
+        self._register_page(self.page)
+
+        self._setup_page_listeners(self.page)
+        await self.page.goto("about:blank")
+
+    def _har_record_options(self) -> Dict[str, Any]:
+        if not self.har_options["record_har"]:
+            return {}
+
+        options = {"record_har_path": self.har_options["record_har"], "record_har_mode": "full"}
+        if self.har_options["har_url_filter"]:
+            options["record_har_url_filter"] = self.har_options["har_url_filter"]
+        return options
+
+    async def _setup_har_replay(self):
+        path = self.har_options["replay_har"]
+        if not path:
+            return
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"HAR文件不存在: {path}")
+        if self.har_options["har_not_found"] not in ("abort", "fallback"):
+            raise ValueError(f"har_not_found 只能是 abort 或 fallback: {self.har_options['har_not_found']}")
+
+        # 在HTTP缓存之后、网络拦截规则之前注册：HAR中没有的请求在 fallback 模式下才交给缓存和网络
+        await self.context.route_from_har(path, url=self.har_options["har_url_filter"] or None,
+                                          not_found=self.har_options["har_not_found"])
+
+    async def _setup_http_cache(self):
+        options = self.http_cache_options
+        if not parse_bool(options["http_cache"]):
+            return
+
+        max_size = int(options["http_cache_size_mb"]) * 1024 * 1024
+        if (self.http_cache is None or self.http_cache.directory != options["http_cache_dir"]
+                or self.http_cache.mode != options["http_cache_mode"]):
+            self.http_cache = HttpCache(options["http_cache_dir"], max_size, options["http_cache_mode"])
+        self.http_cache.max_size = max_size
+
+        # 先于网络拦截规则注册，Playwright 优先调用后注册的路由，被拦截的请求不会进入缓存
+        await self.context.route("**/*", self._handle_cache_route)
+
+    async def _handle_cache_route(self, route: Route):
+        request = route.request
+        # 缓存的 sqlite 索引和响应文件读写在线程中执行，不阻塞服务器的事件循环
+        steps = self.http_cache.route_steps(request.method, request.url, request.headers)
+        action, argument = await asyncio.to_thread(next, steps)
+
+        while action == "fetch":
+            try:
+                # 不跟随重定向，3xx 响应按原样缓存和返回，由浏览器自己跳转
+                response = await route.fetch(headers=argument, max_redirects=0)
+                result = (response.status, response.headers, await response.body(),
+                          has_credentials(await request.all_headers()))
+            except Exception as e:
+                result = e
+            action, argument = await asyncio.to_thread(steps.send, result)
+
+        if action == "fulfill":
+            await route.fulfill(**argument)
+        else:
+            await route.fallback()
+
+    async def _setup_network(self):
+        self.network = NetworkInterceptor(**self.network_options)
+        self.network_routed = False
+        self.context.on("response", self._on_response)
+        await self._apply_network_rules()
+
+    async def _apply_network_rules(self):
+        # 注册路由后每个请求都要多一次往返，只在有拦截规则时注册
+        if self.network.blocking and not self.network_routed:
+            await self.context.route("**/*", self._handle_route)
+            self.network_routed = True
+        elif not self.network.blocking and self.network_routed:
+            await self.context.unroute("**/*", self._handle_route)
+            self.network_routed = False
+
+    async def _handle_route(self, route: Route):
+        request = route.request
+        if self.network.should_block(request.url, request.resource_type):
+            self.network.blocked_count += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    async def _on_response(self, response: Response):
+        request = response.request
+        if not self.network.should_record(request.resource_type):
+            return
+
+        body, error = None, NOT_CAPTURED
+        if self.network.capture_responses:
+            try:
+                body, error = await response.body(), None
+            except Exception as e:
+                error = str(e)
+
+        self.network.add_response(response.url, response.status, request.method, request.resource_type,
+                                  response.headers.get("content-type", ""), body,
+                                  self._page_id_of(response.frame.page), error)
+
+    def _get_context_condition(self) -> asyncio.Condition:
+        if self._context_condition is None:
+            self._context_condition = asyncio.Condition()
+        return self._context_condition
+
+    @contextlib.asynccontextmanager
+    async def _using_context(self):
+        condition = self._get_context_condition()
+        async with condition:
+            await condition.wait_for(lambda: not self._recycling)
+            self._active_commands += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self._active_commands -= 1
+                condition.notify_all()
+
+    async def recycle_context(self, **kwargs) -> str:
+        self._require_running()
+
+        condition = self._get_context_condition()
+        async with condition:
+            await condition.wait_for(lambda: not self._recycling and not self._active_commands)
+            self._recycling = True
+
+        try:
+            return await self._recycle_context(**kwargs)
+        finally:
+            async with condition:
+                self._recycling = False
+                condition.notify_all()
+
+    async def _recycle_context(self, **kwargs) -> str:
+        self._require_running()
+
+        apply_start_options(self, kwargs, RECYCLE_OPTION_GROUPS)
+
+        started = time.time()
+        relaunched = False
+
+        try:
+            if self.context:
+                await self.context.close()
+        except Exception:
+            pass
+
+        # 同一浏览器进程创建的上下文达到上限后重启浏览器，避免长期运行积累的内存和状态
+        if self.max_context_reuse and self.contexts_served >= self.max_context_reuse:
+            old_browser, self.browser = self.browser, None
+            try:
+                await old_browser.close()
+            except Exception:
+                pass
+            await self._launch_browser()
+            self.contexts_served = 0
+            relaunched = True
+
+        await self._open_context()
+        elapsed_ms = (time.time() - started) * 1000
+
+        return f"已回收浏览器上下文{'并重启浏览器' if relaunched else ''}，耗时 {elapsed_ms:.0f} 毫秒"
+
+    def _on_browser_disconnected(self, browser=None):
+        # 回收上下文时主动关闭的旧浏览器不视为浏览器被关闭
+        if not self.running or (browser is not None and browser is not self.browser):
+            return
+        print("检测到浏览器已被关闭")
+        self.running = False
+        # 与 stop_browser 一样关闭上下文并停止 playwright，否则下次启动时旧的驱动进程会一直遗留
+        self._closing = asyncio.ensure_future(self._close_playwright())
+        self._trigger_event("browser_closed")
+
+    def _setup_page_listeners(self, page: Page):
+        page.on("console", lambda msg: print(f"控制台 [{msg.type}]: {msg.text}"))
+        page.on("pageerror", lambda err: print(f"页面错误: {err}"))
+        page.on("dialog", lambda dialog: asyncio.ensure_future(dialog.accept()))
+        page.on("download", lambda download: print(f"下载文件: {download.suggested_filename}"))
+        page.on("filechooser", lambda chooser: print("文件选择器已打开"))
+
+    async def _close_playwright(self):
+        # 浏览器已断开时关闭上下文或浏览器会出错，逐个关闭，确保最后仍会停止 playwright 驱动进程
+        for close in (self.context and self.context.close, self.browser and self.browser.close,
+                      self.playwright and self.playwright.stop):
+            if close:
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+        self.context = None
+        self.browser = None
+        self.playwright = None
+        self.page = None
+        self.pages = []
+        self.page_ids = {}
+
+    async def stop_browser(self):
+        if not self.running:
+            return "浏览器未启动"
+
+        self.running = False
+        await self._close_playwright()
+
+        if not self._trigger_event_called:
+            self._trigger_event("browser_closed")
+
+        return "浏览器已停止"
+
+    def _require_running(self):
+        if not self.running:
+            raise RuntimeError("浏览器未启动")
+
+    async def run_batch(self, steps: List[Dict[str, Any]], stop_on_error: bool = True) -> List[Dict[str, Any]]:
+        self._require_running()
+        results = []
+
+        for step in steps:
+            method_name = step["method"]
+            entry = {"command": step.get("command", method_name)}
+            started = time.time()
+
+            try:
+                if method_name.startswith("_") or method_name == "run_batch":
+                    raise ValueError(f"不支持在批量指令中调用 {method_name}")
+                entry["status"] = "success"
+                entry["result"] = await getattr(self, method_name)(**step.get("params", {}))
+            except Exception as e:
+                entry["status"] = "error"
+                entry["message"] = str(e)
+
+            entry["elapsed_ms"] = round((time.time() - started) * 1000, 1)
+            results.append(entry)
+
+            if entry["status"] == "error" and stop_on_error:
+                break
+
+        return results
+
+    async def click(self, selector: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.click(selector)
+        return f"已点击元素: {selector}"
+
+    async def fill(self, selector: str, value: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.fill(selector, value)
+        return f"已在元素 {selector} 中填入值: {value}"
+
+    async def type_text(self, selector: str, text: str, delay: int = 0, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        delay_ms = int(delay) if delay else 0
+        await page.type(selector, text, delay=delay_ms)
+        return f"已在元素 {selector} 中输入文本: {text}"
+
+    async def hover(self, selector: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.hover(selector)
+        return f"已将鼠标悬停在元素: {selector}"
+
+    async def select_option(self, selector: str, value: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.select_option(selector, value=value)
+        return f"已在下拉菜单 {selector} 中选择选项: {value}"
+
+    async def check(self, selector: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.check(selector)
+        return f"已勾选复选框: {selector}"
+
+    async def uncheck(self, selector: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.uncheck(selector)
+        return f"已取消勾选复选框: {selector}"
+
+    async def upload_file(self, selector: str, path: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.set_input_files(selector, path)
+        return f"已上传文件 {path} 到元素: {selector}"
+
+    async def get_title(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return f"页面标题: {await page.title()}"
+
+    async def get_url(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return f"页面URL: {page.url}"
+
+    async def get_html(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return f"页面HTML: {await page.content()}"
+
+    async def get_html_content(self, page_id: str = None) -> bytes:
+        self._require_running()
+        page = self._get_page(page_id)
+        return (await page.content()).encode('utf-8')
+
+    async def get_text(self, selector: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return f"元素 {selector} 的文本内容: {await page.text_content(selector)}"
+
+    async def get_attribute(self, selector: str, name: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return f"元素 {selector} 的 {name} 属性值: {await page.get_attribute(selector, name)}"
+
+    async def get_elements(self, selector: str, structured: bool = False, offset: int = 0, limit: int = None,
+                           fields: Union[str, List[str]] = None, page_id: str = None) -> Union[str, Dict[str, Any]]:
+        self._require_running()
+        page = self._get_page(page_id)
+        options = element_query_options(structured, offset, limit, fields)
+        data = await self._sb_call_elements(page, selector, "elements", options)
+        return format_elements(selector, data, options)
+
+    async def extract(self, schema: Union[str, Dict[str, Any]], limit: int = None, page_id: str = None) -> Dict[str, Any]:
+        self._require_running()
+        page = self._get_page(page_id)
+        parsed = parse_extract_schema(schema, limit)
+        return format_extract_result(await self._sb_call(page, "extract", parsed))
+
+    async def get_snapshot(self, maxTokens: int = 1500, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return format_snapshot(await self._take_snapshot(page), int(maxTokens))
+
+    async def get_dom_diff(self, maxTokens: int = 1500, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        previous = self.snapshots.get(page)
+        return format_dom_diff(previous, await self._take_snapshot(page), int(maxTokens))
+
+    async def get_page_hash(self, page_id: str = None) -> str:
+        self._require_running()
+        return snapshot_hash(await self._take_snapshot(self._get_page(page_id), store=False))
+
+    async def _take_snapshot(self, page: Page, store: bool = True) -> Dict[str, Any]:
+        cached = self.snapshots.get(page)
+        options = {"knownDoc": cached["doc"], "knownVersion": cached["version"]} if cached else {}
+
+        snapshot = await page.evaluate(SNAPSHOT_TAKE, options)
+        if snapshot is None:
+            await page.evaluate(SB_HELPERS_SCRIPT)
+            await page.evaluate(SNAPSHOT_SCRIPT)
+            snapshot = await page.evaluate(SNAPSHOT_TAKE, options)
+
+        if snapshot.get("unchanged"):
+            return cached
+
+        # 只计算哈希时不更新记录的快照，否则 getDomDiff 的比较基准会被悄悄前移
+        if store:
+            self.snapshots[page] = snapshot
+        return snapshot
+
+    async def _sb_call(self, page: Page, name: str, *args) -> Any:
+        result = await page.evaluate(SB_CALL, [name, list(args)])
+        if result is None:
+            await page.evaluate(SB_HELPERS_SCRIPT)
+            result = await page.evaluate(SB_CALL, [name, list(args)])
+        return result.get("value")
+
+    async def _sb_call_elements(self, page: Page, selector: str, name: str, *args) -> Any:
+        result = await page.eval_on_selector_all(selector, SB_CALL_ELEMENTS, [name, list(args)])
+        if result is None:
+            await page.evaluate(SB_HELPERS_SCRIPT)
+            result = await page.eval_on_selector_all(selector, SB_CALL_ELEMENTS, [name, list(args)])
+        return result.get("value")
+
+    async def evaluate(self, expression: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return f"JavaScript执行结果: {await page.evaluate(expression)}"
+
+    async def add_script_tag(self, url: str = None, content: str = None, page_id: str = None) -> str:
+        if not url and not content:
+            return "错误: 必须提供url或content参数"
+
+        self._require_running()
+        page = self._get_page(page_id)
+        params = {}
+        if url:
+            params["url"] = url
+        if content:
+            params["content"] = content
+
+        await page.add_script_tag(**params)
+        return f"已添加脚本: {url if url else '内联脚本'}"
+
+    async def add_style_tag(self, url: str = None, content: str = None, page_id: str = None) -> str:
+        if not url and not content:
+            return "错误: 必须提供url或content参数"
+
+        self._require_running()
+        page = self._get_page(page_id)
+        params = {}
+        if url:
+            params["url"] = url
+        if content:
+            params["content"] = content
+
+        await page.add_style_tag(**params)
+        return f"已添加样式: {url if url else '内联样式'}"
+
+    async def get_response_body(self, url: str = None, maxLength: int = 20000, page_id: str = None) -> str:
+        self._require_running()
+        return format_response_body(self.network.find(url, page_id), url, int(maxLength))
+
+    async def get_responses(self, filter: str = None, limit: int = 50) -> str:
+        self._require_running()
+        return format_responses(self.network.list(filter, int(limit)), self.network.blocked_count)
+
+    async def set_network_rules(self, blockResources: str = None, blockTrackers: bool = None, blockUrls: str = None,
+                                captureResponses: bool = None) -> str:
+        self._require_running()
+        rules = {
+            "block_resources": blockResources,
+            "block_trackers": blockTrackers,
+            "block_urls": blockUrls,
+            "capture_responses": captureResponses,
+        }
+        rules = {key: value for key, value in rules.items() if value is not None}
+
+        self.network.configure(**rules)
+        await self._apply_network_rules()
+        return f"已更新网络规则: {self.network.describe()}"
+
+    async def get_http_cache_stats(self) -> Dict[str, Any]:
+        if self.http_cache is None:
+            return {"status": "warning", "message": "HTTP缓存未开启，启动浏览器时指定 http_cache=true 开启"}
+        return await asyncio.to_thread(self.http_cache.stats)
+
+    async def clear_http_cache(self) -> str:
+        if self.http_cache is None:
+            return "HTTP缓存未开启"
+        await asyncio.to_thread(self.http_cache.clear)
+        return "已清空HTTP缓存"
+
+    async def get_cookies(self) -> str:
+        self._require_running()
+        return format_cookies(await self.context.cookies())
+
+    async def get_local_storage(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        return format_storage(await self._sb_call(page, "storageEntries", "local"))
+
+    async def goto(self, url: str, waitUntil: str = "load", page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.goto(url, wait_until=waitUntil)
+        return f"已导航到: {page.url}"
+
+    async def reload(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.reload()
+        return f"已刷新页面: {page.url}"
+
+    async def go_back(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.go_back()
+        return f"已返回上一页: {page.url}"
+
+    async def go_forward(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.go_forward()
+        return f"已前进到下一页: {page.url}"
+
+    def _register_page(self, page: Page) -> str:
+        page_id = f"p{next(self.page_id_counter)}"
+        self.page_ids[page_id] = page
+        return page_id
+
+    def _get_page(self, page_id: str = None) -> Page:
+        if page_id is None or page_id == "":
+            return self.page
+
+        page = self.page_ids.get(str(page_id))
+        if page is None:
+            raise ValueError(f"未知的标签页ID: {page_id}")
+        return page
+
+    def _page_id_of(self, page: Page) -> Optional[str]:
+        for page_id, candidate in self.page_ids.items():
+            if candidate is page:
+                return page_id
+        return None
+
+    def _resolve_page_index(self, index: int = None, page_id: str = None) -> int:
+        if page_id:
+            return self.pages.index(self._get_page(page_id))
+        return self.current_page_index if index is None else int(index)
+
+    async def new_page(self) -> str:
+        self._require_running()
+        page = await self.context.new_page()
+        await page.goto("about:blank")
+        self._setup_page_listeners(page)
+        page_id = self._register_page(page)
+        self.pages.append(page)
+        self.current_page_index = len(self.pages) - 1
+        self.page = page
+
+        return f"已创建新标签页 {page_id}，当前共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}"
+
+    async def close_page(self, index: int = None, page_id: str = None) -> str:
+        self._require_running()
+
+        if len(self.pages) <= 1:
+            return "无法关闭，至少需要保留一个标签页"
+
+        idx = self._resolve_page_index(index, page_id)
+
+        if idx < 0 or idx >= len(self.pages):
+            return f"错误: 标签页索引 {idx} 超出范围 (0-{len(self.pages)-1})"
+
+        page_to_close = self.pages.pop(idx)
+        closed_id = self._page_id_of(page_to_close)
+        self.page_ids.pop(closed_id, None)
+        self.snapshots.pop(page_to_close, None)
+
+        if idx == self.current_page_index:
+            self.current_page_index = max(0, idx - 1)
+        elif idx < self.current_page_index:
+            self.current_page_index -= 1
+
+        self.page = self.pages[self.current_page_index]
+        await page_to_close.close()
+
+        return f"已关闭标签页 {idx} ({closed_id})，当前共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}"
+
+    async def switch_page(self, index: int = None, page_id: str = None) -> str:
+        self._require_running()
+
+        if index is None and not page_id:
+            return "错误: 必须提供index或page_id参数"
+
+        idx = self._resolve_page_index(index, page_id)
+
+        if idx < 0 or idx >= len(self.pages):
+            return f"错误: 标签页索引 {idx} 超出范围 (0-{len(self.pages)-1})"
+
+        self.current_page_index = idx
+        self.page = self.pages[idx]
+
+        return f"已切换到标签页 {idx} ({self._page_id_of(self.page)})，URL: {self.page.url}"
+
+    async def get_pages(self) -> str:
+        self._require_running()
+        result = f"共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}\n"
+
+        titles = await asyncio.gather(*(page.title() for page in self.pages))
+        for i, (page, title) in enumerate(zip(self.pages, titles)):
+            current = " (当前)" if i == self.current_page_index else ""
+            result += f"{i}. [{self._page_id_of(page)}] {title or '无标题'} - {page.url}{current}\n"
+
+        return result
+
+    async def goto_pages(self, targets: str, waitUntil: str = "load") -> str:
+        self._require_running()
+
+        try:
+            targets_dict = json.loads(targets) if isinstance(targets, str) else targets
+        except json.JSONDecodeError:
+            return "错误: targets参数不是有效的JSON格式"
+
+        if not isinstance(targets_dict, dict) or not targets_dict:
+            return "错误: targets参数必须是 {标签页ID: URL} 格式的JSON对象"
+
+        pages = {page_id: self._get_page(page_id) for page_id in targets_dict}
+        outcomes = await asyncio.gather(
+            *(pages[page_id].goto(url, wait_until=waitUntil) for page_id, url in targets_dict.items()),
+            return_exceptions=True
+        )
+
+        result = f"已在 {len(pages)} 个标签页中完成导航:\n"
+        for (page_id, page), outcome in zip(pages.items(), outcomes):
+            if isinstance(outcome, Exception):
+                result += f"{page_id}: 导航失败 - {str(outcome)}\n"
+            else:
+                result += f"{page_id}: {page.url}\n"
+
+        return result
+
+    async def screenshot(self, path: str = None, fullPage: bool = False, selector: str = None, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        options = {"full_page": bool(fullPage) if fullPage is not None else False}
+
+        if not path:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = f"screenshot_{timestamp}.png"
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)) if os.path.dirname(path) else ".", exist_ok=True)
+
+        if selector:
+            element = await page.query_selector(selector)
+            if not element:
+                return f"错误: 未找到元素 {selector}"
+            await element.screenshot(path=path)
+            return f"已截取元素 {selector} 的截图并保存到: {path}"
+        else:
+            await page.screenshot(path=path, **options)
+            return f"已截取{'整个' if options['full_page'] else '可视区域'}页面截图并保存到: {path}"
+
+    async def pdf(self, path: str = None, landscape: bool = False, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+
+        if not path:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = f"page_{timestamp}.pdf"
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)) if os.path.dirname(path) else ".", exist_ok=True)
+
+        try:
+            await page.pdf(path=path, landscape=bool(landscape) if landscape is not None else False)
+            return f"已将页面保存为PDF: {path}"
+        except Exception as e:
+            return f"保存PDF失败: {str(e)}（注意：PDF功能仅在Chromium的headless模式下可用）"
+
+    async def set_cookies(self, cookies: str) -> str:
+        self._require_running()
+
+        try:
+            cookies_list = json.loads(cookies)
+
+            if not isinstance(cookies_list, list):
+                return "错误: cookies参数必须是JSON格式的Cookie列表"
+
+            await self.context.add_cookies(cookies_list)
+            return f"已成功设置 {len(cookies_list)} 个Cookie"
+        except json.JSONDecodeError:
+            return "错误: cookies参数不是有效的JSON格式"
+        except Exception as e:
+            return f"设置Cookie失败: {str(e)}"
+
+    async def clear_cookies(self) -> str:
+        self._require_running()
+        await self.context.clear_cookies()
+        return "已清除所有Cookie"
+
+    async def set_local_storage_item(self, key: str, value: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await self._sb_call(page, "storageSet", "local", key, value)
+        return f"已设置localStorage项: {key} = {value}"
+
+    async def clear_local_storage(self, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await self._sb_call(page, "storageClear", "local")
+        return "已清除所有localStorage内容"
+
+    async def wait_for_url(self, url: str, timeout: int = 30000, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.wait_for_url(url, timeout=int(timeout))
+        return f"页面URL已变为: {page.url}"
+
+    async def wait_for_selector(self, selector: str, timeout: int = 30000, state: str = "visible", page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.wait_for_selector(selector, timeout=int(timeout), state=state)
+        return f"元素 {selector} 已" + {'visible': '可见', 'attached': '附加', 'detached': '分离', 'hidden': '隐藏'}[state]
+
+    async def wait_for_load_state(self, state: str = "load", page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.wait_for_load_state(state)
+        return f"页面已达到 {state} 加载状态"
+
+    async def press(self, selector: str, key: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.press(selector, key)
+        return f"已在元素 {selector} 上按下 {key} 键"
+
+    async def keyboard_press(self, key: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.keyboard.press(key)
+        return f"已按下 {key} 键"
+
+    async def keyboard_type(self, text: str, delay: int = 0, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        delay_ms = int(delay) if delay else 0
+        await page.keyboard.type(text, delay=delay_ms)
+        return f"已输入文本: {text}"
+
+    async def mouse_click(self, x: int, y: int, button: str = "left", page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.mouse.click(float(x), float(y), button=button)
+        return f"已在坐标 ({x}, {y}) 点击" + {'left': '左键', 'right': '右键', 'middle': '中键'}[button]
+
+    async def set_viewport_size(self, width: int, height: int, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.set_viewport_size({"width": int(width), "height": int(height)})
+        return f"已设置视口大小为 {width}x{height}"
+
+    async def set_extra_http_headers(self, headers: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+
+        try:
+            headers_dict = json.loads(headers)
+
+            if not isinstance(headers_dict, dict):
+                return "错误: headers参数必须是JSON格式的对象"
+
+            await page.set_extra_http_headers(headers_dict)
+            return f"已成功设置 {len(headers_dict)} 个HTTP请求头"
+        except json.JSONDecodeError:
+            return "错误: headers参数不是有效的JSON格式"
+        except Exception as e:
+            return f"设置HTTP请求头失败: {str(e)}"
+
+    async def set_geolocation(self, latitude: float, longitude: float) -> str:
+        self._require_running()
+        await self.context.grant_permissions(["geolocation"])
+        await self.context.set_geolocation({"latitude": float(latitude), "longitude": float(longitude)})
+        return f"已设置地理位置为: 纬度 {latitude}, 经度 {longitude}"
+
+    async def set_user_agent(self, userAgent: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+        await page.set_extra_http_headers({"User-Agent": userAgent})
+        return f"已设置用户代理为: {userAgent}"
+
+    async def run_js_file(self, path: str, page_id: str = None) -> str:
+        self._require_running()
+        page = self._get_page(page_id)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                js_code = file.read()
+
+            result = await page.evaluate(js_code)
+            return f"已执行JavaScript文件: {path}, 结果: {result}"
+        except FileNotFoundError:
+            return f"错误: 找不到文件 {path}"
+        except Exception as e:
+            return f"执行JavaScript文件时出错: {str(e)}"
+
+
+def _uses_context(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        async with self._using_context():
+            return await method(self, *args, **kwargs)
+    return wrapper
+
+
+# 除启动、停止和回收上下文外，所有公开的指令方法执行期间都持有当前上下文，回收上下文时不会被中途关闭
+for _name, _method in list(vars(AsyncBrowserController).items()):
+    if (inspect.iscoroutinefunction(_method) and not _name.startswith("_")
+            and _name not in ("start_browser", "stop_browser", "recycle_context")):
+        setattr(AsyncBrowserController, _name, _uses_context(_method))
@@ -3,13 +3,282 @@ import time
 import datetime
 import threading
 import queue
+import itertools
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Any, Optional, Union, Callable
 import json
 import re
 import urllib.parse
+import hashlib
+import copy
 from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext, ElementHandle, Response, Request, Route, ConsoleMessage, Dialog, Download, FileChooser, Frame, JSHandle, Locator, WebSocket, Playwright
 
+from network import NetworkInterceptor, format_response_body, format_responses, parse_bool, NOT_CAPTURED, parse_list
+from http_cache import HttpCache, CACHE_DIR as HTTP_CACHE_DIR, has_credentials
+# 快照的 token 预算与对话历史使用同一种估算方式，快照放入对话后两者的计数一致
+from conversation import estimate_tokens
+
 _browser_controller_instance = None
+_STOP_SIGNAL = object()
+
+def format_cookies(cookies: List[Dict]) -> str:
+    if not cookies:
+        return "没有Cookie"
+    
+    result = f"找到 {len(cookies)} 个Cookie:\n"
+    
+    for i, cookie in enumerate(cookies):
+        result += f"{i+1}. {cookie['name']} = {cookie['value']} (域: {cookie['domain']})\n"
+    
+    return result
+
+def format_storage(items: List) -> str:
+    if not items:
+        return "localStorage为空"
+    
+    result = f"找到 {len(items)} 个localStorage项:\n"
+    
+    for i, (key, value) in enumerate(items):
+        value_preview = value[:50] + "..." if len(value) > 50 else value
+        result += f"{i+1}. {key} = {value_preview}\n"
+    
+    return result
+
+ELEMENT_FIELDS = ["tag", "text", "attributes", "box", "visible"]
+
+def element_query_options(structured: bool = False, offset: int = 0, limit: int = None,
+                          fields: Union[str, List[str]] = None) -> Dict[str, Any]:
+    structured = structured if isinstance(structured, bool) else str(structured).lower() in ("true", "1", "yes")
+    
+    if not structured:
+        # 文本模式保持原有输出：前10个元素的标签和文本
+        return {"structured": False, "offset": 0, "limit": 10, "fields": ["tag", "text"]}
+    
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    
+    return {
+        "structured": True,
+        "offset": max(int(offset or 0), 0),
+        "limit": max(int(limit), 0) if limit not in (None, "") else 100,
+        "fields": fields or ELEMENT_FIELDS,
+    }
+
+def format_elements(selector: str, data: Dict[str, Any], options: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    count = data["total"]
+    
+    if options["structured"]:
+        return {
+            "status": "success",
+            "selector": selector,
+            "total": count,
+            "offset": options["offset"],
+            "limit": options["limit"],
+            "has_more": options["offset"] + len(data["items"]) < count,
+            "elements": data["items"],
+        }
+    
+    if count == 0:
+        return f"未找到匹配选择器 {selector} 的元素"
+    
+    result = f"找到 {count} 个匹配选择器 {selector} 的元素:\n"
+    
+    for i, item in enumerate(data["items"]):
+        text = item["text"]
+        text_preview = text[:50] + "..." if len(text) > 50 else text
+        result += f"{i+1}. <{item['tag']}> {text_preview}\n"
+    
+    if count > 10:
+        result += f"... 还有 {count - 10} 个元素未显示"
+    
+    return result
+
+EXTRACT_TYPES = ["text", "html", "number", "int", "bool"]
+
+def parse_extract_schema(schema: Union[str, Dict[str, Any]], limit: int = None) -> Dict[str, Any]:
+    if isinstance(schema, str):
+        schema = json.loads(schema)
+    
+    if not isinstance(schema, dict) or not isinstance(schema.get("fields"), dict) or not schema["fields"]:
+        raise ValueError("schema必须是包含非空fields对象的JSON")
+    
+    fields = {}
+    for name, field in schema["fields"].items():
+        # 字段可简写为选择器字符串，表示提取该元素的文本
+        if isinstance(field, str):
+            field = {"selector": field}
+        if not isinstance(field, dict):
+            raise ValueError(f"字段 {name} 的定义必须是选择器字符串或对象")
+        
+        field_type = field.get("type", "text")
+        if field_type not in EXTRACT_TYPES:
+            raise ValueError(f"字段 {name} 的类型 {field_type} 不受支持，可选: {', '.join(EXTRACT_TYPES)}")
+        
+        fields[name] = {
+            "selector": field.get("selector"),
+            "attribute": field.get("attribute"),
+            "type": field_type,
+            "all": bool(field.get("all", False)),
+        }
+    
+    limit = limit if limit not in (None, "") else schema.get("limit")
+    return {
+        "container": schema.get("container"),
+        "fields": fields,
+        "limit": int(limit) if limit not in (None, "") else 1000,
+    }
+
+def format_extract_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "total": data["total"],
+        "count": len(data["records"]),
+        "records": data["records"],
+    }
+
+# 只对单个会话生效的选项组：每次 start_browser/recycle_context 先恢复为默认值，再应用本次指定的选项，
+# 避免上一个会话的 HAR 回放、拦截规则等设置留在复用的浏览器工作线程上
+SESSION_OPTION_GROUPS = ("network_options", "http_cache_options", "har_options", "script_options")
+START_OPTION_GROUPS = ("browser_options", "context_options") + SESSION_OPTION_GROUPS
+RECYCLE_OPTION_GROUPS = ("context_options",) + SESSION_OPTION_GROUPS
+
+def session_option_defaults(controller) -> Dict[str, Dict[str, Any]]:
+    return {name: copy.deepcopy(getattr(controller, name)) for name in SESSION_OPTION_GROUPS}
+
+def apply_start_options(controller, options: Dict[str, Any], groups: tuple):
+    for name, defaults in controller.session_option_defaults.items():
+        setattr(controller, name, copy.deepcopy(defaults))
+
+    for key, value in options.items():
+        for name in groups:
+            group = getattr(controller, name)
+            if key in group:
+                group[key] = value
+                break
+
+def apply_controller_options(controller, options: Dict[str, Any]):
+    # 执行器为所有工作线程（含子进程中的控制器）指定的选项；字典类型的选项只更新指定的键，保留控制器中其余的默认值
+    for name, value in options.items():
+        current = getattr(controller, name, None)
+        if isinstance(current, dict) and isinstance(value, dict):
+            current.update(value)
+            # 会话级选项在每次启动时恢复为默认值，执行器指定的选项也要计入默认值
+            defaults = getattr(controller, "session_option_defaults", {})
+            if name in defaults:
+                defaults[name].update(value)
+        else:
+            setattr(controller, name, value)
+
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "script")
+
+def load_script(name: str) -> str:
+    with open(os.path.join(SCRIPT_DIR, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+# 快照脚本会监听整个文档的变化并为元素写入 data-sbid 属性，不预先注入页面，
+# 只在首次获取快照（以及页面跳转后再次获取）时安装，不使用快照的任务不受影响
+SNAPSHOT_SCRIPT = load_script("snapshot.js")
+SNAPSHOT_TAKE = "(options) => window.__sbSnapshot ? window.__sbSnapshot.take(options) : null"
+
+# 常用的页面操作（元素批量查询、结构化提取、存储读写、可见性判断）由 sb_helpers.js 安装的 window.__sb 提供，
+# 每次调用只发送固定的调用表达式、函数名和参数；页面中没有对应版本的 __sb 时返回 null，由调用方补充安装
+SB_HELPERS_SCRIPT = load_script("sb_helpers.js")
+SB_VERSION = int(re.search(r"var VERSION = (\d+);", SB_HELPERS_SCRIPT).group(1))
+SB_CALL = (f"([name, args]) => window.__sb && window.__sb.version >= {SB_VERSION} "
+           "? {value: window.__sb[name](...args)} : null")
+SB_CALL_ELEMENTS = (f"(elements, [name, args]) => window.__sb && window.__sb.version >= {SB_VERSION} "
+                    "? {value: window.__sb[name](elements, ...args)} : null")
+
+JQUERY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jquery", "3.7.1.min.js")
+
+# 可通过 add_init_script 注入每个页面的脚本：名称 -> {"hash": 内容哈希, "script": 包装后的脚本}
+# 同一脚本每次注入的内容完全相同，浏览器按内容缓存编译结果；包装代码把哈希记录在 window.__sbScripts 中，
+# 同一页面中重复执行时直接跳过
+INIT_SCRIPTS: Dict[str, Dict[str, str]] = {}
+
+def register_init_script(name: str, source: str) -> str:
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    INIT_SCRIPTS[name] = {
+        "hash": digest,
+        "script": (
+            "(function () {\n"
+            "var loaded = window.__sbScripts = window.__sbScripts || {};\n"
+            f"if (loaded['{digest}']) return;\n"
+            f"loaded['{digest}'] = {json.dumps(name)};\n"
+            f"{source}\n"
+            "})();"
+        ),
+    }
+    return digest
+
+def resolve_init_scripts(options: Dict[str, Any]) -> List[str]:
+    names = (["jquery"] if parse_bool(options["inject_jquery"]) else []) + parse_list(options["init_scripts"])
+    unknown = [name for name in names if name not in INIT_SCRIPTS]
+    if unknown:
+        raise ValueError(f"未注册的初始化脚本: {', '.join(unknown)}，可选: {', '.join(INIT_SCRIPTS)}")
+    return [INIT_SCRIPTS[name]["script"] for name in dict.fromkeys(names)]
+
+with open(JQUERY_PATH, 'r', encoding='utf-8') as file:
+    register_init_script("jquery", file.read())
+
+def format_snapshot(snapshot: Dict[str, Any], max_tokens: int) -> str:
+    lines = [f"页面快照 (版本 {snapshot['version']}): {snapshot['title'] or '无标题'} - {snapshot['url']}"]
+    used = estimate_tokens(lines[0])
+    nodes = snapshot["nodes"]
+    
+    for i, node in enumerate(nodes):
+        line = f"[{node['id']}] {node['line']}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            lines.append(f"... 已省略 {len(nodes) - i} 个节点（超出 {max_tokens} token 预算）")
+            break
+        lines.append(line)
+        used += cost
+    
+    return "\n".join(lines)
+
+def format_dom_diff(previous: Optional[Dict[str, Any]], current: Dict[str, Any], max_tokens: int) -> str:
+    if previous is None:
+        return "首次获取，返回完整快照:\n" + format_snapshot(current, max_tokens)
+    
+    if previous["doc"] != current["doc"]:
+        return "页面已加载新文档，返回完整快照:\n" + format_snapshot(current, max_tokens)
+    
+    if previous is current or previous["version"] == current["version"]:
+        return f"页面没有变化 (版本 {current['version']})"
+    
+    before = {node["id"]: node["line"] for node in previous["nodes"]}
+    after = {node["id"]: node["line"] for node in current["nodes"]}
+    
+    changes = []
+    for node in current["nodes"]:
+        if node["id"] not in before:
+            changes.append(f"+ [{node['id']}] {node['line']}")
+        elif before[node["id"]] != node["line"]:
+            changes.append(f"~ [{node['id']}] {node['line']}")
+    for node in previous["nodes"]:
+        if node["id"] not in after:
+            changes.append(f"- [{node['id']}] {node['line']}")
+    
+    lines = [f"页面变化 (版本 {previous['version']} -> {current['version']}): {current['title'] or '无标题'} - {current['url']}"]
+    if not changes:
+        lines.append("快照内容没有变化")
+    
+    used = estimate_tokens(lines[0])
+    for i, line in enumerate(changes):
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            lines.append(f"... 已省略 {len(changes) - i} 处变化（超出 {max_tokens} token 预算）")
+            break
+        lines.append(line)
+        used += cost
+    
+    return "\n".join(lines)
+
+def snapshot_hash(snapshot: Dict[str, Any]) -> str:
+    # 只取页面地址和快照内容，不含每次加载都会变化的文档ID和版本号，相同内容的页面得到相同的哈希
+    content = "\n".join([snapshot["url"], snapshot["title"] or ""] + [node["line"] for node in snapshot["nodes"]])
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
 
 class BrowserController:
     def __init__(self):
@@ -18,11 +287,13 @@ class BrowserController:
         self.context = None
         self.playwright = None
         self.command_queue = queue.Queue()
-        self.result_queue = queue.Queue()
+        self.command_timeout = None
         self.browser_thread = None
         self.running = False
         self.current_page_index = 0
         self.pages = []
+        self.page_ids: Dict[str, Page] = {}
+        self.page_id_counter = itertools.count(1)
         self.browser_type = "chromium"
         self.browser_options = {
             "headless": False,
@@ -33,10 +304,52 @@ class BrowserController:
             "ignore_https_errors": True,
             "java_script_enabled": True,
         }
+        # 每个上下文的网络拦截规则和响应记录设置，可在 start_browser 时指定
+        self.network_options = {
+            "block_resources": None,
+            "block_trackers": False,
+            "block_urls": None,
+            "capture_responses": False,
+            "max_captured_responses": 100,
+        }
+        self.network: Optional[NetworkInterceptor] = None
+        self.network_routed = False
+        # 磁盘HTTP缓存在上下文之间共享，开启后所有请求都先经过缓存
+        self.http_cache_options = {
+            "http_cache": False,
+            "http_cache_dir": HTTP_CACHE_DIR,
+            "http_cache_size_mb": 500,
+            "http_cache_mode": "normal",
+        }
+        self.http_cache: Optional[HttpCache] = None
+        # HAR 录制与回放：record_har 将上下文的所有请求在关闭时保存为HAR文件，
+        # replay_har 从HAR文件返回响应，未录制的请求按 har_not_found 中止(abort)或继续访问网络(fallback)
+        self.har_options = {
+            "record_har": None,
+            "replay_har": None,
+            "har_url_filter": None,
+            "har_not_found": "abort",
+        }
+        # 注入每个页面的初始化脚本：inject_jquery 注入 jquery/ 目录中的 jQuery，
+        # init_scripts 为 register_init_script 注册的脚本名称列表（逗号分隔）
+        self.script_options = {
+            "inject_jquery": False,
+            "init_scripts": None,
+        }
+        self.session_option_defaults = session_option_defaults(self)
         self.event_listeners = {
             "browser_closed": [],
         }
         self._trigger_event_called = False
+        self._ready_event = threading.Event()
+        self._startup_error = None
+        # 空闲时驱动Playwright事件分发的间隔，用于及时收到浏览器 disconnected 事件
+        self.event_pump_interval = 1.0
+        # 每个浏览器进程最多创建的上下文数量，0 表示不限制
+        self.max_context_reuse = 0
+        self.contexts_served = 0
+        # 每个标签页最近一次的快照，DOM版本未变化时直接复用
+        self.snapshots: Dict[Page, Dict[str, Any]] = {}
 
     # 事件监听
     def add_event_listener(self, event_name: str, callback: Callable):
@@ -74,70 +387,66 @@ class BrowserController:
         if browser_type:
             self.browser_type = browser_type
         
-        for key, value in kwargs.items():
-            if key in self.browser_options:
-                self.browser_options[key] = value
-            elif key in self.context_options:
-                self.context_options[key] = value
+        apply_start_options(self, kwargs, START_OPTION_GROUPS)
         
+        self.command_queue = queue.Queue()
+        self._ready_event.clear()
+        self._startup_error = None
+        self._trigger_event_called = False
         self.browser_thread = threading.Thread(target=self._browser_thread_func)
         self.running = True
         self.browser_thread.start()
         
-        timeout = 30
-        start_time = time.time()
+        if self._ready_event.wait(timeout=30) and self._startup_error is None:
+            return f"已启动 {self.browser_type} 浏览器"
         
-        while time.time() - start_time < timeout:
-            if self.browser and self.page:
-                return f"已启动 {self.browser_type} 浏览器"
-            time.sleep(0.1)
-        
-        self.running = False
+        self._stop_browser_thread()
         
         if self.browser_thread.is_alive():
             self.browser_thread.join(timeout=1)
         
+        if self._startup_error is not None:
+            raise self._startup_error
+        
         return "启动浏览器超时"
 
     def _browser_thread_func(self):
         try:
             self.playwright = sync_playwright().start()
-            
-            if self.browser_type == "firefox":
-                browser_instance = self.playwright.firefox
-            elif self.browser_type == "webkit":
-                browser_instance = self.playwright.webkit
-            else:
-                browser_instance = self.playwright.chromium
-            
-            self.browser = browser_instance.launch(**self.browser_options)
-            self.context = self.browser.new_context(**self.context_options)
-            self.page = self.context.new_page()
-            self.pages = [self.page]
-            self.current_page_index = 0
-            
-            self._setup_page_listeners(self.page)
-            self.page.goto("about:blank")
-            self.result_queue.put(True)
+            self.contexts_served = 0
+            self._launch_browser()
+            self._open_context()
+            self._ready_event.set()
             
             while self.running:
                 try:
-                    command, args, kwargs = self.command_queue.get(timeout=0.1)
-                    
-                    try:
-                        result = command(*args, **kwargs)
-                        self.result_queue.put(result)
-                    except Exception as e:
-                        self.result_queue.put(e)
+                    item = self.command_queue.get(timeout=self.event_pump_interval)
                 except queue.Empty:
-                    if self.browser and not self.browser.is_connected():
-                        print("检测到浏览器已被关闭")
-                        self.running = False
-                        self._trigger_event("browser_closed")
+                    self._pump_events()
+                    continue
+                
+                if item is _STOP_SIGNAL:
+                    break
+                
+                future, command, args, kwargs = item
+                
+                if not future.set_running_or_notify_cancel():
                     continue
+                
+                try:
+                    future.set_result(command(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
         except Exception as e:
-            self.result_queue.put(e)
+            if not self._ready_event.is_set():
+                self._startup_error = e
+            else:
+                print(f"浏览器线程异常退出: {str(e)}")
         finally:
+            self._ready_event.set()
+            if self.browser_thread is threading.current_thread():
+                self.running = False
+                self._cancel_pending_commands()
             try:
                 if self.context:
                     self.context.close()
@@ -151,6 +460,194 @@ class BrowserController:
             if not self._trigger_event_called:
                 self._trigger_event("browser_closed")
 
+    def _launch_browser(self):
+        if self.browser_type == "firefox":
+            browser_instance = self.playwright.firefox
+        elif self.browser_type == "webkit":
+            browser_instance = self.playwright.webkit
+        else:
+            browser_instance = self.playwright.chromium
+        
+        self.browser = browser_instance.launch(**self.browser_options)
+        self.browser.on("disconnected", lambda browser: self._on_browser_disconnected(browser))
+
+    def _open_context(self):
+        self.context = self.browser.new_context(**self.context_options, **self._har_record_options())
+        self.context.add_init_script(script=SB_HELPERS_SCRIPT)
+        for script in resolve_init_scripts(self.script_options):
+            self.context.add_init_script(script=script)
+        self._setup_http_cache()
+        self._setup_har_replay()
+        self._setup_network()
+        self.contexts_served += 1
+        self.snapshots = {}
+        self.page = self.context.new_page()
+        self.pages = [self.page]
+        self.current_page_index = 0
+        self.page_ids = {}
+        self.page_id_counter = itertools.count(1)
+        self._register_page(self.page)
+        
+        self._setup_page_listeners(self.page)
+        self.page.goto("about:blank")
+
+    def _har_record_options(self) -> Dict[str, Any]:
+        if not self.har_options["record_har"]:
+            return {}
+
+        options = {"record_har_path": self.har_options["record_har"], "record_har_mode": "full"}
+        if self.har_options["har_url_filter"]:
+            options["record_har_url_filter"] = self.har_options["har_url_filter"]
+        return options
+
+    def _setup_har_replay(self):
+        path = self.har_options["replay_har"]
+        if not path:
+            return
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"HAR文件不存在: {path}")
+        if self.har_options["har_not_found"] not in ("abort", "fallback"):
+            raise ValueError(f"har_not_found 只能是 abort 或 fallback: {self.har_options['har_not_found']}")
+
+        # 在HTTP缓存之后、网络拦截规则之前注册：HAR中没有的请求在 fallback 模式下才交给缓存和网络
+        self.context.route_from_har(path, url=self.har_options["har_url_filter"] or None,
+                                      not_found=self.har_options["har_not_found"])
+
+    def _setup_http_cache(self):
+        options = self.http_cache_options
+        if not parse_bool(options["http_cache"]):
+            return
+
+        max_size = int(options["http_cache_size_mb"]) * 1024 * 1024
+        if (self.http_cache is None or self.http_cache.directory != options["http_cache_dir"]
+                or self.http_cache.mode != options["http_cache_mode"]):
+            self.http_cache = HttpCache(options["http_cache_dir"], max_size, options["http_cache_mode"])
+        self.http_cache.max_size = max_size
+
+        # 先于网络拦截规则注册，Playwright 优先调用后注册的路由，被拦截的请求不会进入缓存
+        self.context.route("**/*", self._handle_cache_route)
+
+    def _handle_cache_route(self, route: Route):
+        request = route.request
+        steps = self.http_cache.route_steps(request.method, request.url, request.headers)
+        action, argument = next(steps)
+
+        while action == "fetch":
+            try:
+                # 不跟随重定向，3xx 响应按原样缓存和返回，由浏览器自己跳转
+                response = route.fetch(headers=argument, max_redirects=0)
+                result = (response.status, response.headers, response.body(), has_credentials(request.all_headers()))
+            except Exception as e:
+                result = e
+            action, argument = steps.send(result)
+
+        if action == "fulfill":
+            route.fulfill(**argument)
+        else:
+            route.fallback()
+
+    def _setup_network(self):
+        self.network = NetworkInterceptor(**self.network_options)
+        self.network_routed = False
+        self.context.on("response", self._on_response)
+        self._apply_network_rules()
+
+    def _apply_network_rules(self):
+        # 注册路由后每个请求都要多一次往返，只在有拦截规则时注册
+        if self.network.blocking and not self.network_routed:
+            self.context.route("**/*", self._handle_route)
+            self.network_routed = True
+        elif not self.network.blocking and self.network_routed:
+            self.context.unroute("**/*", self._handle_route)
+            self.network_routed = False
+
+    def _handle_route(self, route: Route):
+        request = route.request
+        if self.network.should_block(request.url, request.resource_type):
+            self.network.blocked_count += 1
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    def _on_response(self, response: Response):
+        request = response.request
+        if not self.network.should_record(request.resource_type):
+            return
+
+        body, error = None, NOT_CAPTURED
+        if self.network.capture_responses:
+            try:
+                body, error = response.body(), None
+            except Exception as e:
+                error = str(e)
+
+        self.network.add_response(response.url, response.status, request.method, request.resource_type,
+                                  response.headers.get("content-type", ""), body,
+                                  self._page_id_of(response.frame.page), error)
+
+    def recycle_context(self, **kwargs) -> str:
+        apply_start_options(self, kwargs, RECYCLE_OPTION_GROUPS)
+        
+        return self.execute_command(
+            lambda: self._recycle_context()
+        )
+
+    def _recycle_context(self) -> str:
+        started = time.time()
+        relaunched = False
+        
+        try:
+            if self.context:
+                self.context.close()
+        except Exception:
+            pass
+        
+        # 同一浏览器进程创建的上下文达到上限后重启浏览器，避免长期运行积累的内存和状态
+        if self.max_context_reuse and self.contexts_served >= self.max_context_reuse:
+            old_browser, self.browser = self.browser, None
+            try:
+                old_browser.close()
+            except Exception:
+                pass
+            self._launch_browser()
+            self.contexts_served = 0
+            relaunched = True
+        
+        self._open_context()
+        elapsed_ms = (time.time() - started) * 1000
+        
+        return f"已回收浏览器上下文{'并重启浏览器' if relaunched else ''}，耗时 {elapsed_ms:.0f} 毫秒"
+
+    def _cancel_pending_commands(self):
+        while True:
+            try:
+                item = self.command_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if item is not _STOP_SIGNAL and item[0].set_running_or_notify_cancel():
+                item[0].set_exception(RuntimeError("浏览器已停止，指令未执行"))
+
+    def _pump_events(self):
+        # 同步API只在调用Playwright时分发事件，空闲时发起一次廉价调用以处理积压的事件
+        try:
+            self.page.wait_for_timeout(1)
+        except Exception:
+            if self.browser and not self.browser.is_connected():
+                self._on_browser_disconnected()
+
+    def _on_browser_disconnected(self, browser=None):
+        # 回收上下文时主动关闭的旧浏览器不视为浏览器被关闭
+        if not self.running or (browser is not None and browser is not self.browser):
+            return
+        print("检测到浏览器已被关闭")
+        self._stop_browser_thread()
+
+    def _stop_browser_thread(self):
+        self.running = False
+        self.command_queue.put(_STOP_SIGNAL)
+
     def _setup_page_listeners(self, page):
         page.on("console", lambda msg: print(f"控制台 [{msg.type}]: {msg.text}"))
         page.on("pageerror", lambda err: print(f"页面错误: {err}"))
@@ -162,7 +659,7 @@ class BrowserController:
         if not self.browser_thread or not self.browser_thread.is_alive():
             return "浏览器未启动"
         
-        self.running = False
+        self._stop_browser_thread()
         self.browser_thread.join(timeout=5)
         
         if self.browser_thread.is_alive():
@@ -170,120 +667,217 @@ class BrowserController:
         
         return "浏览器已停止"
 
-    def execute_command(self, command_func, *args, **kwargs):
+    def submit_command(self, command_func, *args, **kwargs) -> Future:
         if not self.running:
             raise RuntimeError("浏览器未启动")
         
-        self.command_queue.put((command_func, args, kwargs))
-        result = self.result_queue.get()
+        future = Future()
+        self.command_queue.put((future, command_func, args, kwargs))
         
-        if isinstance(result, Exception):
-            raise result
+        # 入队与浏览器线程退出存在竞争，若此时浏览器已停止则撤回该指令，避免调用方永久等待
+        if not self.running and future.cancel():
+            raise RuntimeError("浏览器未启动")
         
-        return result
+        return future
+
+    def execute_command(self, command_func, *args, timeout: float = None, **kwargs):
+        # 批量指令在浏览器线程中调用其他指令方法，此时直接执行，避免向自身排队造成死锁
+        if threading.current_thread() is self.browser_thread:
+            return command_func(*args, **kwargs)
+        
+        future = self.submit_command(command_func, *args, **kwargs)
+        timeout = self.command_timeout if timeout is None else timeout
+        
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise TimeoutError(f"指令在 {timeout} 秒内未开始执行，已取消")
+            raise TimeoutError(f"指令执行超过 {timeout} 秒，仍在浏览器线程中运行")
+
+    def run_batch(self, steps: List[Dict[str, Any]], stop_on_error: bool = True) -> List[Dict[str, Any]]:
+        return self.execute_command(
+            lambda: self._run_batch(steps, stop_on_error)
+        )
+
+    def _run_batch(self, steps: List[Dict[str, Any]], stop_on_error: bool = True) -> List[Dict[str, Any]]:
+        results = []
+        
+        for step in steps:
+            method_name = step["method"]
+            entry = {"command": step.get("command", method_name)}
+            started = time.time()
+            
+            try:
+                if method_name.startswith("_") or method_name == "run_batch":
+                    raise ValueError(f"不支持在批量指令中调用 {method_name}")
+                entry["status"] = "success"
+                entry["result"] = getattr(self, method_name)(**step.get("params", {}))
+            except Exception as e:
+                entry["status"] = "error"
+                entry["message"] = str(e)
+            
+            entry["elapsed_ms"] = round((time.time() - started) * 1000, 1)
+            results.append(entry)
+            
+            if entry["status"] == "error" and stop_on_error:
+                break
+        
+        return results
 
-    def click(self, selector: str) -> str:
+    def click(self, selector: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.click(selector), f"已点击元素: {selector}")[1]
+            lambda: (self._get_page(page_id).click(selector), f"已点击元素: {selector}")[1]
         )
 
-    def fill(self, selector: str, value: str) -> str:
+    def fill(self, selector: str, value: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.fill(selector, value), f"已在元素 {selector} 中填入值: {value}")[1]
+            lambda: (self._get_page(page_id).fill(selector, value), f"已在元素 {selector} 中填入值: {value}")[1]
         )
 
-    def type_text(self, selector: str, text: str, delay: int = 0) -> str:
+    def type_text(self, selector: str, text: str, delay: int = 0, page_id: str = None) -> str:
         delay_ms = int(delay) if delay else 0
         
         return self.execute_command(
-            lambda: (self.page.type(selector, text, delay=delay_ms), 
+            lambda: (self._get_page(page_id).type(selector, text, delay=delay_ms), 
                     f"已在元素 {selector} 中输入文本: {text}")[1]
         )
 
-    def hover(self, selector: str) -> str:
+    def hover(self, selector: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.hover(selector), f"已将鼠标悬停在元素: {selector}")[1]
+            lambda: (self._get_page(page_id).hover(selector), f"已将鼠标悬停在元素: {selector}")[1]
         )
 
-    def select_option(self, selector: str, value: str) -> str:
+    def select_option(self, selector: str, value: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.select_option(selector, value=value), 
+            lambda: (self._get_page(page_id).select_option(selector, value=value), 
                     f"已在下拉菜单 {selector} 中选择选项: {value}")[1]
         )
 
-    def check(self, selector: str) -> str:
+    def check(self, selector: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.check(selector), f"已勾选复选框: {selector}")[1]
+            lambda: (self._get_page(page_id).check(selector), f"已勾选复选框: {selector}")[1]
         )
 
-    def uncheck(self, selector: str) -> str:
+    def uncheck(self, selector: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.uncheck(selector), f"已取消勾选复选框: {selector}")[1]
+            lambda: (self._get_page(page_id).uncheck(selector), f"已取消勾选复选框: {selector}")[1]
         )
 
-    def upload_file(self, selector: str, path: str) -> str:
+    def upload_file(self, selector: str, path: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.set_input_files(selector, path), 
+            lambda: (self._get_page(page_id).set_input_files(selector, path), 
                     f"已上传文件 {path} 到元素: {selector}")[1]
         )
 
-    def get_title(self) -> str:
+    def get_title(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: f"页面标题: {self.page.title()}"
+            lambda: f"页面标题: {self._get_page(page_id).title()}"
         )
 
-    def get_url(self) -> str:
+    def get_url(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: f"页面URL: {self.page.url}"
+            lambda: f"页面URL: {self._get_page(page_id).url}"
         )
 
-    def get_html(self) -> str:
+    def get_html(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: f"页面HTML: {self.page.content()}"
+            lambda: f"页面HTML: {self._get_page(page_id).content()}"
         )
 
-    def get_text(self, selector: str) -> str:
+    def get_html_content(self, page_id: str = None) -> bytes:
+        # 返回UTF-8编码的原始HTML，供执行器分块流式发送；编码在调用方线程完成，不占用浏览器线程
         return self.execute_command(
-            lambda: f"元素 {selector} 的文本内容: {self.page.text_content(selector)}"
-        )
+            lambda: self._get_page(page_id).content()
+        ).encode('utf-8')
 
-    def get_attribute(self, selector: str, name: str) -> str:
+    def get_text(self, selector: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: f"元素 {selector} 的 {name} 属性值: {self.page.get_attribute(selector, name)}"
+            lambda: f"元素 {selector} 的文本内容: {self._get_page(page_id).text_content(selector)}"
         )
 
-    def get_elements(self, selector: str) -> str:
+    def get_attribute(self, selector: str, name: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: self._get_elements_info(selector)
+            lambda: f"元素 {selector} 的 {name} 属性值: {self._get_page(page_id).get_attribute(selector, name)}"
         )
 
-    def _get_elements_info(self, selector: str) -> str:
-        elements = self.page.query_selector_all(selector)
-        count = len(elements)
+    def get_elements(self, selector: str, structured: bool = False, offset: int = 0, limit: int = None,
+                     fields: Union[str, List[str]] = None, page_id: str = None) -> Union[str, Dict[str, Any]]:
+        options = element_query_options(structured, offset, limit, fields)
         
-        if count == 0:
-            return f"未找到匹配选择器 {selector} 的元素"
+        return self.execute_command(
+            lambda: self._get_elements_info(selector, options, page_id)
+        )
+
+    def _get_elements_info(self, selector: str, options: Dict[str, Any], page_id: str = None) -> Union[str, Dict[str, Any]]:
+        page = self._get_page(page_id)
+        data = self._sb_call_elements(page, selector, "elements", options)
+        return format_elements(selector, data, options)
+
+    def extract(self, schema: Union[str, Dict[str, Any]], limit: int = None, page_id: str = None) -> Dict[str, Any]:
+        parsed = parse_extract_schema(schema, limit)
         
-        result = f"找到 {count} 个匹配选择器 {selector} 的元素:\n"
+        return self.execute_command(
+            lambda: format_extract_result(self._sb_call(self._get_page(page_id), "extract", parsed))
+        )
+
+    def get_snapshot(self, maxTokens: int = 1500, page_id: str = None) -> str:
+        return self.execute_command(
+            lambda: format_snapshot(self._take_snapshot(self._get_page(page_id)), int(maxTokens))
+        )
+
+    def get_dom_diff(self, maxTokens: int = 1500, page_id: str = None) -> str:
+        return self.execute_command(
+            lambda: self._get_dom_diff(self._get_page(page_id), int(maxTokens))
+        )
+
+    def get_page_hash(self, page_id: str = None) -> str:
+        return self.execute_command(
+            lambda: snapshot_hash(self._take_snapshot(self._get_page(page_id), store=False))
+        )
+
+    def _get_dom_diff(self, page, max_tokens: int) -> str:
+        previous = self.snapshots.get(page)
+        return format_dom_diff(previous, self._take_snapshot(page), max_tokens)
+
+    def _take_snapshot(self, page, store: bool = True) -> Dict[str, Any]:
+        cached = self.snapshots.get(page)
+        options = {"knownDoc": cached["doc"], "knownVersion": cached["version"]} if cached else {}
         
-        for i, element in enumerate(elements[:10]):  # 限制显示前10个
-            tag_name = self.page.evaluate("el => el.tagName", element).lower()
-            text = self.page.evaluate("el => el.textContent", element)
-            text = text.strip() if text else ""
-            text_preview = text[:50] + "..." if len(text) > 50 else text
-            result += f"{i+1}. <{tag_name}> {text_preview}\n"
+        snapshot = page.evaluate(SNAPSHOT_TAKE, options)
+        if snapshot is None:
+            page.evaluate(SB_HELPERS_SCRIPT)
+            page.evaluate(SNAPSHOT_SCRIPT)
+            snapshot = page.evaluate(SNAPSHOT_TAKE, options)
         
-        if count > 10:
-            result += f"... 还有 {count - 10} 个元素未显示"
+        if snapshot.get("unchanged"):
+            return cached
         
-        return result
-
-    def evaluate(self, expression: str) -> str:
+        # 只计算哈希时不更新记录的快照，否则 getDomDiff 的比较基准会被悄悄前移
+        if store:
+            self.snapshots[page] = snapshot
+        return snapshot
+
+    def _sb_call(self, page, name: str, *args) -> Any:
+        result = page.evaluate(SB_CALL, [name, list(args)])
+        if result is None:
+            page.evaluate(SB_HELPERS_SCRIPT)
+            result = page.evaluate(SB_CALL, [name, list(args)])
+        return result.get("value")
+
+    def _sb_call_elements(self, page, selector: str, name: str, *args) -> Any:
+        result = page.eval_on_selector_all(selector, SB_CALL_ELEMENTS, [name, list(args)])
+        if result is None:
+            page.evaluate(SB_HELPERS_SCRIPT)
+            result = page.eval_on_selector_all(selector, SB_CALL_ELEMENTS, [name, list(args)])
+        return result.get("value")
+
+    def evaluate(self, expression: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: f"JavaScript执行结果: {self.page.evaluate(expression)}"
+            lambda: f"JavaScript执行结果: {self._get_page(page_id).evaluate(expression)}"
         )
 
-    def add_script_tag(self, url: str = None, content: str = None) -> str:
+    def add_script_tag(self, url: str = None, content: str = None, page_id: str = None) -> str:
         if not url and not content:
             return "错误: 必须提供url或content参数"
         
@@ -294,11 +888,11 @@ class BrowserController:
             params["content"] = content
         
         return self.execute_command(
-            lambda: (self.page.add_script_tag(**params), 
+            lambda: (self._get_page(page_id).add_script_tag(**params), 
                     f"已添加脚本: {url if url else '内联脚本'}" )[1]
         )
 
-    def add_style_tag(self, url: str = None, content: str = None) -> str:
+    def add_style_tag(self, url: str = None, content: str = None, page_id: str = None) -> str:
         if not url and not content:
             return "错误: 必须提供url或content参数"
         
@@ -309,69 +903,104 @@ class BrowserController:
             params["content"] = content
         
         return self.execute_command(
-            lambda: (self.page.add_style_tag(**params), 
+            lambda: (self._get_page(page_id).add_style_tag(**params), 
                     f"已添加样式: {url if url else '内联样式'}" )[1]
         )
 
-    def get_response_body(self) -> str:
+    def get_response_body(self, url: str = None, maxLength: int = 20000, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: "此功能需要在导航时设置拦截器，当前不支持直接获取"
+            lambda: format_response_body(self.network.find(url, page_id), url, int(maxLength))
         )
 
-    def get_cookies(self) -> str:
+    def get_responses(self, filter: str = None, limit: int = 50) -> str:
         return self.execute_command(
-            lambda: self._format_cookies(self.context.cookies())
+            lambda: format_responses(self.network.list(filter, int(limit)), self.network.blocked_count)
         )
 
-    def _format_cookies(self, cookies: List[Dict]) -> str:
-        if not cookies:
-            return "没有Cookie"
-        
-        result = f"找到 {len(cookies)} 个Cookie:\n"
-        
-        for i, cookie in enumerate(cookies):
-            result += f"{i+1}. {cookie['name']} = {cookie['value']} (域: {cookie['domain']})\n"
-        
-        return result
+    def set_network_rules(self, blockResources: str = None, blockTrackers: bool = None, blockUrls: str = None,
+                          captureResponses: bool = None) -> str:
+        rules = {
+            "block_resources": blockResources,
+            "block_trackers": blockTrackers,
+            "block_urls": blockUrls,
+            "capture_responses": captureResponses,
+        }
+        return self.execute_command(
+            lambda: self._set_network_rules({key: value for key, value in rules.items() if value is not None})
+        )
+
+    def _set_network_rules(self, rules: Dict[str, Any]) -> str:
+        self.network.configure(**rules)
+        self._apply_network_rules()
+        return f"已更新网络规则: {self.network.describe()}"
+
+    def get_http_cache_stats(self) -> Dict[str, Any]:
+        if self.http_cache is None:
+            return {"status": "warning", "message": "HTTP缓存未开启，启动浏览器时指定 http_cache=true 开启"}
+        return self.http_cache.stats()
 
-    def get_local_storage(self) -> str:
+    def clear_http_cache(self) -> str:
+        if self.http_cache is None:
+            return "HTTP缓存未开启"
+        self.http_cache.clear()
+        return "已清空HTTP缓存"
+
+    def get_cookies(self) -> str:
         return self.execute_command(
-            lambda: self._format_storage(self.page.evaluate("() => Object.entries(localStorage)"))
+            lambda: format_cookies(self.context.cookies())
         )
 
-    def _format_storage(self, items: List) -> str:
-        if not items:
-            return "localStorage为空"
-        
-        result = f"找到 {len(items)} 个localStorage项:\n"
-        
-        for i, (key, value) in enumerate(items):
-            value_preview = value[:50] + "..." if len(value) > 50 else value
-            result += f"{i+1}. {key} = {value_preview}\n"
-        
-        return result
+    def get_local_storage(self, page_id: str = None) -> str:
+        return self.execute_command(
+            lambda: format_storage(self._sb_call(self._get_page(page_id), "storageEntries", "local"))
+        )
 
-    def goto(self, url: str, waitUntil: str = "load") -> str:
+    def goto(self, url: str, waitUntil: str = "load", page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.goto(url, wait_until=waitUntil), 
-                    f"已导航到: {self.page.url}")[1]
+            lambda: (self._get_page(page_id).goto(url, wait_until=waitUntil), 
+                    f"已导航到: {self._get_page(page_id).url}")[1]
         )
 
-    def reload(self) -> str:
+    def reload(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.reload(), f"已刷新页面: {self.page.url}")[1]
+            lambda: (self._get_page(page_id).reload(), f"已刷新页面: {self._get_page(page_id).url}")[1]
         )
 
-    def go_back(self) -> str:
+    def go_back(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.go_back(), f"已返回上一页: {self.page.url}")[1]
+            lambda: (self._get_page(page_id).go_back(), f"已返回上一页: {self._get_page(page_id).url}")[1]
         )
 
-    def go_forward(self) -> str:
+    def go_forward(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.go_forward(), f"已前进到下一页: {self.page.url}")[1]
+            lambda: (self._get_page(page_id).go_forward(), f"已前进到下一页: {self._get_page(page_id).url}")[1]
         )
 
+    def _register_page(self, page) -> str:
+        page_id = f"p{next(self.page_id_counter)}"
+        self.page_ids[page_id] = page
+        return page_id
+
+    def _get_page(self, page_id: str = None):
+        if page_id is None or page_id == "":
+            return self.page
+        
+        page = self.page_ids.get(str(page_id))
+        if page is None:
+            raise ValueError(f"未知的标签页ID: {page_id}")
+        return page
+
+    def _page_id_of(self, page) -> Optional[str]:
+        for page_id, candidate in self.page_ids.items():
+            if candidate is page:
+                return page_id
+        return None
+
+    def _resolve_page_index(self, index: int = None, page_id: str = None) -> int:
+        if page_id:
+            return self.pages.index(self._get_page(page_id))
+        return self.current_page_index if index is None else int(index)
+
     def new_page(self) -> str:
         return self.execute_command(
             lambda: self._create_new_page()
@@ -381,29 +1010,33 @@ class BrowserController:
         page = self.context.new_page()
         page.goto("about:blank")
         self._setup_page_listeners(page)
+        page_id = self._register_page(page)
         self.pages.append(page)
         self.current_page_index = len(self.pages) - 1
         self.page = page
         
-        return f"已创建新标签页，当前共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}"
+        return f"已创建新标签页 {page_id}，当前共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}"
 
-    def close_page(self, index: int = None) -> str:
+    def close_page(self, index: int = None, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: self._close_page(index)
+            lambda: self._close_page(index, page_id)
         )
 
-    def _close_page(self, index: int = None) -> str:
+    def _close_page(self, index: int = None, page_id: str = None) -> str:
         if len(self.pages) <= 1:
             return "无法关闭，至少需要保留一个标签页"
         
-        idx = self.current_page_index if index is None else int(index)
+        idx = self._resolve_page_index(index, page_id)
         
         if idx < 0 or idx >= len(self.pages):
             return f"错误: 标签页索引 {idx} 超出范围 (0-{len(self.pages)-1})"
         
         page_to_close = self.pages[idx]
+        closed_id = self._page_id_of(page_to_close)
         page_to_close.close()
         self.pages.pop(idx)
+        self.page_ids.pop(closed_id, None)
+        self.snapshots.pop(page_to_close, None)
         
         if idx == self.current_page_index:
             self.current_page_index = max(0, idx - 1)
@@ -412,15 +1045,18 @@ class BrowserController:
         
         self.page = self.pages[self.current_page_index]
         
-        return f"已关闭标签页 {idx}，当前共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}"
+        return f"已关闭标签页 {idx} ({closed_id})，当前共有 {len(self.pages)} 个标签页，当前标签页索引: {self.current_page_index}"
 
-    def switch_page(self, index: int) -> str:
+    def switch_page(self, index: int = None, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: self._switch_page(index)
+            lambda: self._switch_page(index, page_id)
         )
 
-    def _switch_page(self, index: int) -> str:
-        idx = int(index)
+    def _switch_page(self, index: int = None, page_id: str = None) -> str:
+        if index is None and not page_id:
+            return "错误: 必须提供index或page_id参数"
+        
+        idx = self._resolve_page_index(index, page_id)
         
         if idx < 0 or idx >= len(self.pages):
             return f"错误: 标签页索引 {idx} 超出范围 (0-{len(self.pages)-1})"
@@ -428,7 +1064,7 @@ class BrowserController:
         self.current_page_index = idx
         self.page = self.pages[idx]
         
-        return f"已切换到标签页 {idx}，URL: {self.page.url}"
+        return f"已切换到标签页 {idx} ({self._page_id_of(self.page)})，URL: {self.page.url}"
 
     def get_pages(self) -> str:
         return self.execute_command(
@@ -442,16 +1078,48 @@ class BrowserController:
             title = page.title() or "无标题"
             url = page.url
             current = " (当前)" if i == self.current_page_index else ""
-            result += f"{i}. {title} - {url}{current}\n"
+            result += f"{i}. [{self._page_id_of(page)}] {title} - {url}{current}\n"
         
         return result
 
-    def screenshot(self, path: str = None, fullPage: bool = False, selector: str = None) -> str:
+    def goto_pages(self, targets: str, waitUntil: str = "load") -> str:
         return self.execute_command(
-            lambda: self._take_screenshot(path, fullPage, selector)
+            lambda: self._goto_pages(targets, waitUntil)
         )
 
-    def _take_screenshot(self, path: str = None, fullPage: bool = False, selector: str = None) -> str:
+    def _goto_pages(self, targets: str, waitUntil: str = "load") -> str:
+        try:
+            targets_dict = json.loads(targets) if isinstance(targets, str) else targets
+        except json.JSONDecodeError:
+            return "错误: targets参数不是有效的JSON格式"
+        
+        if not isinstance(targets_dict, dict) or not targets_dict:
+            return "错误: targets参数必须是 {标签页ID: URL} 格式的JSON对象"
+        
+        pages = {page_id: self._get_page(page_id) for page_id in targets_dict}
+        
+        # 先让所有标签页发起导航，再逐个等待加载完成，各标签页的加载过程可以重叠
+        for page_id, url in targets_dict.items():
+            pages[page_id].goto(url, wait_until="commit")
+        
+        result = f"已在 {len(pages)} 个标签页中完成导航:\n"
+        for page_id, page in pages.items():
+            try:
+                page.wait_for_load_state(waitUntil)
+                result += f"{page_id}: {page.url}\n"
+            except Exception as e:
+                result += f"{page_id}: 导航失败 - {str(e)}\n"
+        
+        return result
+
+    def screenshot(self, path: str = None, fullPage: bool = False, selector: str = None, page_id: str = None) -> str:
+        return self.execute_command(
+            lambda: self._take_screenshot(path, fullPage, selector, page_id)
+        )
+
+    def _take_screenshot(self, path: str = None, fullPage: bool = False, selector: str = None, page_id: str = None) -> str:
+        page = self._get_page(page_id)
+        
         options = {"full_page": bool(fullPage) if fullPage is not None else False}
         
         if not path:
@@ -461,21 +1129,23 @@ class BrowserController:
         os.makedirs(os.path.dirname(os.path.abspath(path)) if os.path.dirname(path) else ".", exist_ok=True)
         
         if selector:
-            element = self.page.query_selector(selector)
+            element = page.query_selector(selector)
             if not element:
                 return f"错误: 未找到元素 {selector}"
             element.screenshot(path=path)
             return f"已截取元素 {selector} 的截图并保存到: {path}"
         else:
-            self.page.screenshot(path=path, **options)
+            page.screenshot(path=path, **options)
             return f"已截取{'整个' if options['full_page'] else '可视区域'}页面截图并保存到: {path}"
 
-    def pdf(self, path: str = None, landscape: bool = False) -> str:
+    def pdf(self, path: str = None, landscape: bool = False, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: self._save_pdf(path, landscape)
+            lambda: self._save_pdf(path, landscape, page_id)
         )
 
-    def _save_pdf(self, path: str = None, landscape: bool = False) -> str:
+    def _save_pdf(self, path: str = None, landscape: bool = False, page_id: str = None) -> str:
+        page = self._get_page(page_id)
+        
         if not path:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             path = f"page_{timestamp}.pdf"
@@ -483,7 +1153,7 @@ class BrowserController:
         os.makedirs(os.path.dirname(os.path.abspath(path)) if os.path.dirname(path) else ".", exist_ok=True)
         
         try:
-            self.page.pdf(path=path, landscape=bool(landscape) if landscape is not None else False)
+            page.pdf(path=path, landscape=bool(landscape) if landscape is not None else False)
             return f"已将页面保存为PDF: {path}"
         except Exception as e:
             return f"保存PDF失败: {str(e)}（注意：PDF功能仅在Chromium的headless模式下可用）"
@@ -512,80 +1182,82 @@ class BrowserController:
             lambda: (self.context.clear_cookies(), "已清除所有Cookie")[1]
         )
 
-    def set_local_storage_item(self, key: str, value: str) -> str:
+    def set_local_storage_item(self, key: str, value: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.evaluate(f"localStorage.setItem('{key}', '{value}')"), 
+            lambda: (self._sb_call(self._get_page(page_id), "storageSet", "local", key, value), 
                     f"已设置localStorage项: {key} = {value}")[1]
         )
 
-    def clear_local_storage(self) -> str:
+    def clear_local_storage(self, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.evaluate("localStorage.clear()"), "已清除所有localStorage内容")[1]
+            lambda: (self._sb_call(self._get_page(page_id), "storageClear", "local"), "已清除所有localStorage内容")[1]
         )
 
-    def wait_for_url(self, url: str, timeout: int = 30000) -> str:
+    def wait_for_url(self, url: str, timeout: int = 30000, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.wait_for_url(url, timeout=timeout), 
-                    f"页面URL已变为: {self.page.url}")[1]
+            lambda: (self._get_page(page_id).wait_for_url(url, timeout=timeout), 
+                    f"页面URL已变为: {self._get_page(page_id).url}")[1]
         )
 
-    def wait_for_selector(self, selector: str, timeout: int = 30000, state: str = "visible") -> str:
+    def wait_for_selector(self, selector: str, timeout: int = 30000, state: str = "visible", page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.wait_for_selector(selector, timeout=timeout, state=state), 
+            lambda: (self._get_page(page_id).wait_for_selector(selector, timeout=timeout, state=state), 
                     f"元素 {selector} 已" + {'visible': '可见', 'attached': '附加', 'detached': '分离', 'hidden': '隐藏'}[state])[1]
         )
 
-    def wait_for_load_state(self, state: str = "load") -> str:
+    def wait_for_load_state(self, state: str = "load", page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.wait_for_load_state(state), 
+            lambda: (self._get_page(page_id).wait_for_load_state(state), 
                     f"页面已达到 {state} 加载状态")[1]
         )
 
-    def press(self, selector: str, key: str) -> str:
+    def press(self, selector: str, key: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.press(selector, key), 
+            lambda: (self._get_page(page_id).press(selector, key), 
                     f"已在元素 {selector} 上按下 {key} 键")[1]
         )
 
-    def keyboard_press(self, key: str) -> str:
+    def keyboard_press(self, key: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.keyboard.press(key), 
+            lambda: (self._get_page(page_id).keyboard.press(key), 
                     f"已按下 {key} 键")[1]
         )
 
-    def keyboard_type(self, text: str, delay: int = 0) -> str:
+    def keyboard_type(self, text: str, delay: int = 0, page_id: str = None) -> str:
         delay_ms = int(delay) if delay else 0
         
         return self.execute_command(
-            lambda: (self.page.keyboard.type(text, delay=delay_ms), 
+            lambda: (self._get_page(page_id).keyboard.type(text, delay=delay_ms), 
                     f"已输入文本: {text}")[1]
         )
 
-    def mouse_click(self, x: int, y: int, button: str = "left") -> str:
+    def mouse_click(self, x: int, y: int, button: str = "left", page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.mouse.click(x, y, button=button), 
+            lambda: (self._get_page(page_id).mouse.click(x, y, button=button), 
                     f"已在坐标 ({x}, {y}) 点击" + {'left': '左键', 'right': '右键', 'middle': '中键'}[button])[1]
         )
 
-    def set_viewport_size(self, width: int, height: int) -> str:
+    def set_viewport_size(self, width: int, height: int, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.set_viewport_size({"width": int(width), "height": int(height)}), 
+            lambda: (self._get_page(page_id).set_viewport_size({"width": int(width), "height": int(height)}), 
                     f"已设置视口大小为 {width}x{height}")[1]
         )
 
-    def set_extra_http_headers(self, headers: str) -> str:
+    def set_extra_http_headers(self, headers: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: self._set_extra_headers(headers)
+            lambda: self._set_extra_headers(headers, page_id)
         )
 
-    def _set_extra_headers(self, headers_str: str) -> str:
+    def _set_extra_headers(self, headers_str: str, page_id: str = None) -> str:
+        page = self._get_page(page_id)
+        
         try:
             headers_dict = json.loads(headers_str)
             
             if not isinstance(headers_dict, dict):
                 return "错误: headers参数必须是JSON格式的对象"
             
-            self.page.set_extra_http_headers(headers_dict)
+            page.set_extra_http_headers(headers_dict)
             return f"已成功设置 {len(headers_dict)} 个HTTP请求头"
         except json.JSONDecodeError:
             return "错误: headers参数不是有效的JSON格式"
@@ -599,23 +1271,25 @@ class BrowserController:
                     f"已设置地理位置为: 纬度 {latitude}, 经度 {longitude}")[2]
         )
 
-    def set_user_agent(self, userAgent: str) -> str:
+    def set_user_agent(self, userAgent: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: (self.page.set_extra_http_headers({"User-Agent": userAgent}), 
+            lambda: (self._get_page(page_id).set_extra_http_headers({"User-Agent": userAgent}), 
                     f"已设置用户代理为: {userAgent}")[1]
         )
 
-    def run_js_file(self, path: str) -> str:
+    def run_js_file(self, path: str, page_id: str = None) -> str:
         return self.execute_command(
-            lambda: self._run_js_file(path)
+            lambda: self._run_js_file(path, page_id)
         )
 
-    def _run_js_file(self, path: str) -> str:
+    def _run_js_file(self, path: str, page_id: str = None) -> str:
+        page = self._get_page(page_id)
+        
         try:
             with open(path, 'r', encoding='utf-8') as file:
                 js_code = file.read()
             
-            result = self.page.evaluate(js_code)
+            result = page.evaluate(js_code)
             return f"已执行JavaScript文件: {path}, 结果: {result}"
         except FileNotFoundError:
             return f"错误: 找不到文件 {path}"
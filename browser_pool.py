@@ -0,0 +1,86 @@
+import threading
+import time
+import uuid
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+DEFAULT_SESSION = "default"
+
+
+class PoolExhaustedError(RuntimeError):
+    pass
+
+
+class UnknownSessionError(RuntimeError):
+    pass
+
+
+class BrowserPool:
+    def __init__(self, size: int, controller_factory: Callable[[], Any]):
+        if size < 1:
+            raise ValueError("浏览器工作线程数量必须大于0")
+
+        self.workers: List[Any] = [controller_factory() for _ in range(size)]
+        self.sessions: Dict[str, int] = {}
+        self.last_used: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.workers)
+
+    def _idle_indexes(self) -> List[int]:
+        busy = set(self.sessions.values())
+        return [i for i in range(len(self.workers)) if i not in busy]
+
+    def acquire(self, session_id: str = None) -> Tuple[str, Any]:
+        with self.lock:
+            if session_id and session_id in self.sessions:
+                self.last_used[session_id] = time.time()
+                return session_id, self.workers[self.sessions[session_id]]
+
+            idle = self._idle_indexes()
+            if not idle:
+                raise PoolExhaustedError(f"没有空闲的浏览器工作线程 (共 {len(self.workers)} 个)")
+
+            # 优先分配浏览器已在运行的空闲工作线程，减少冷启动
+            idle.sort(key=lambda i: not getattr(self.workers[i], "running", False))
+            session_id = session_id or uuid.uuid4().hex[:12]
+            self.sessions[session_id] = idle[0]
+            self.last_used[session_id] = time.time()
+            return session_id, self.workers[idle[0]]
+
+    def get(self, session_id: str = None) -> Any:
+        # 只有默认会话在首次使用时自动分配工作线程，其他会话必须先通过 acquire (openSession) 分配，
+        # 避免拼写错误的会话ID占用空闲工作线程且不再释放
+        session_id = session_id or DEFAULT_SESSION
+        if session_id == DEFAULT_SESSION:
+            return self.acquire(session_id)[1]
+
+        with self.lock:
+            if session_id not in self.sessions:
+                raise UnknownSessionError(f"会话 {session_id} 不存在，请先调用 openSession 分配会话")
+            self.last_used[session_id] = time.time()
+            return self.workers[self.sessions[session_id]]
+
+    def release(self, session_id: str) -> Optional[Any]:
+        with self.lock:
+            index = self.sessions.pop(session_id, None)
+            self.last_used.pop(session_id, None)
+            return self.workers[index] if index is not None else None
+
+    def get_sessions_info(self) -> Dict[str, Any]:
+        with self.lock:
+            sessions = [
+                {
+                    "session": session_id,
+                    "worker": index,
+                    "running": bool(getattr(self.workers[index], "running", False)),
+                    "idle_seconds": round(time.time() - self.last_used.get(session_id, time.time()), 1),
+                }
+                for session_id, index in self.sessions.items()
+            ]
+            return {
+                "workers": len(self.workers),
+                "idle_workers": len(self._idle_indexes()),
+                "sessions": sessions,
+            }
@@ -0,0 +1,101 @@
+import re
+from typing import Dict, List, Any, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    # 粗略估算：中文字符约1个token，其他字符约4个字符1个token
+    cjk = len(re.findall(r'[\u4e00-\u9fff]', text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def summarize_text(text: str, max_chars: int = 200) -> str:
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"…（已省略 {len(text) - max_chars} 字）"
+
+
+class Conversation:
+    """
+    维护发送给模型的消息列表：
+    - 系统提示词固定在最前面且逐字节不变，已有的历史消息也只追加不修改，
+      使每一轮请求与上一轮共享尽可能长的前缀，Ollama 只需计算新增的部分
+    - 超出 token 预算时，把较早的指令执行结果替换为摘要；一次压缩到预算的 compact_ratio 以下，
+      避免每一轮都改动历史导致前缀缓存失效
+    """
+
+    def __init__(self, system_prompt: str, max_tokens: int = 6000, keep_recent: int = 6,
+                 compact_ratio: float = 0.6, summary_chars: int = 200):
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.system_tokens = estimate_tokens(system_prompt)
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.compact_ratio = compact_ratio
+        self.summary_chars = summary_chars
+        self.history: List[Dict[str, Any]] = []
+        self.compactions = 0
+        self.dropped_messages = 0
+
+    def add(self, role: str, content: str, summary_source: Optional[str] = None):
+        # summary_source 不为空的消息可以被压缩，压缩后只保留 summary_source 的摘要
+        self.history.append({
+            "role": role,
+            "content": content,
+            "tokens": estimate_tokens(content),
+            "summary_source": summary_source,
+        })
+
+    def add_user(self, content: str, summary_source: Optional[str] = None):
+        self.add("user", content, summary_source)
+
+    def add_assistant(self, content: str):
+        self.add("assistant", content)
+
+    def token_count(self) -> int:
+        return self.system_tokens + sum(message["tokens"] for message in self.history)
+
+    def messages(self) -> List[Dict[str, str]]:
+        if self.token_count() > self.max_tokens:
+            self._compact()
+
+        return [self.system_message] + [
+            {"role": message["role"], "content": message["content"]} for message in self.history
+        ]
+
+    def _compact(self):
+        target = int(self.max_tokens * self.compact_ratio)
+        total = self.token_count()
+        # 第一条消息是用户任务，最近的 keep_recent 条消息保持原样
+        candidates = range(1, max(1, len(self.history) - self.keep_recent))
+
+        for index in candidates:
+            if total <= target:
+                break
+
+            message = self.history[index]
+            if message["summary_source"] is None:
+                continue
+
+            summary = f"[较早的执行结果] {summarize_text(message['summary_source'], self.summary_chars)}"
+            total -= message["tokens"]
+            message["content"] = summary
+            message["tokens"] = estimate_tokens(summary)
+            message["summary_source"] = None
+            total += message["tokens"]
+
+        # 摘要后仍超出预算时，丢弃最早的对话轮次，并为随后插入的省略说明预留 token（按可能的最大条数估算）
+        dropped_before = self.dropped_messages
+        if total > target:
+            notice_tokens = estimate_tokens(f"（已省略较早的 {self.dropped_messages + len(self.history)} 条对话）")
+            while total + notice_tokens > target and len(self.history) > self.keep_recent + 1:
+                message = self.history.pop(1)
+                total -= message["tokens"]
+                if not message.get("notice"):
+                    self.dropped_messages += 1
+
+        if self.dropped_messages != dropped_before:
+            notice = f"（已省略较早的 {self.dropped_messages} 条对话）"
+            self.history.insert(1, {"role": "user", "content": notice, "tokens": estimate_tokens(notice),
+                                    "summary_source": None, "notice": True})
+
+        self.compactions += 1
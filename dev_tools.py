@@ -8,6 +8,8 @@ import json
 import re
 import socket
 import queue
+import itertools
+from protocol import request as executor_request
 
 class DevToolsUI:
     def __init__(self, root):
@@ -25,6 +27,7 @@ class DevToolsUI:
         self.connection_lock = threading.Lock()
         self.command_queue = queue.Queue()
         self.response_queue = queue.Queue()
+        self.request_ids = itertools.count(1)
         
         self.setup_ui()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -107,6 +110,10 @@ class DevToolsUI:
                     self.connected = False
                     self.response_queue.put(("connection_status", "disconnected"))
 
+    def _request(self, command):
+        result = executor_request(self.socket, command, request_id=next(self.request_ids))
+        return json.dumps(result, ensure_ascii=False)
+
     def socket_communication_thread(self):
         last_heartbeat_time = 0
         heartbeat_interval = 10
@@ -127,8 +134,7 @@ class DevToolsUI:
                             continue
                             
                         try:
-                            self.socket.sendall(command.encode('utf-8'))
-                            response = self.socket.recv(4096).decode('utf-8')
+                            response = self._request(command)
                             callback(response)
                         except socket.timeout:
                             self.response_queue.put(("error", "接收响应超时"))
@@ -147,8 +153,7 @@ class DevToolsUI:
                         with self.connection_lock:
                             if self.connected:
                                 try:
-                                    self.socket.sendall("status".encode('utf-8'))
-                                    response = self.socket.recv(4096).decode('utf-8')
+                                    response = self._request("status")
                                     
                                     try:
                                         status_data = json.loads(response)
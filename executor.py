@@ -1,4 +1,5 @@
 import socket
+import asyncio
 import threading
 import json
 import urllib.parse
@@ -7,6 +8,10 @@ import sys
 import os
 import logging
 import argparse
+import traceback
+import inspect
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Tuple, Optional
 
 log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
@@ -26,8 +31,50 @@ logger = logging.getLogger("CommandExecutor")
 logger.setLevel(logging.DEBUG)
 logger.critical("============ 执行器启动 ============")
 
+from protocol import (send_frame, recv_frame, read_frame_async, write_frame, is_framed_prefix, ProtocolError,
+                      iter_stream_frames, parse_stream_options, parse_stream_range, STREAM_CHUNK_SIZE)
+
+from browser_pool import BrowserPool, DEFAULT_SESSION
+
+# 流式请求出错时只发送一个携带错误信息的帧
+DEFAULT_FRAME_OPTIONS = ("identity", STREAM_CHUNK_SIZE)
+COMMANDS_DOC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands.md")
+JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+
+
+def load_command_descriptions(path: str = COMMANDS_DOC) -> Dict[str, str]:
+    # 从命令文档中读取每条指令"功能"说明的第一句，作为指令描述
+    descriptions = {}
+    command = None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return descriptions
+
+    for line in lines:
+        match = re.match(r"\*\*指令写法\*\*: `(\w+)", line)
+        if match:
+            command = match.group(1)
+        elif command and line.startswith("**功能**:"):
+            descriptions[command] = re.split(r"[。；]", line.split(":", 1)[1].strip())[0][:80]
+            command = None
+
+    return descriptions
+
+
+def parameter_schema(parameter: inspect.Parameter) -> Dict[str, Any]:
+    annotation = parameter.annotation
+    if annotation is inspect.Parameter.empty and parameter.default not in (inspect.Parameter.empty, None):
+        annotation = type(parameter.default)
+
+    # List[str]、Dict[str, Any] 等泛型取其原始类型，Union 等无法确定的类型按字符串处理
+    annotation = getattr(annotation, "__origin__", annotation)
+    return {"type": JSON_TYPES.get(annotation, "string")}
+
 try:
-    from browser import BrowserController
+    from browser import BrowserController, apply_controller_options
     logger.info("成功导入BrowserController")
 except ImportError as e:
     logger.error(f"导入BrowserController失败: {str(e)}")
@@ -38,13 +85,19 @@ except ImportError as e:
             self.browser = None
             self.page = None
             self.running = False
+            self.browser_type = "chromium"
         
         def start_browser(self, browser_type=None, headless=False, 
-                         ignore_https_errors=True, java_script_enabled=True):
+                         ignore_https_errors=True, java_script_enabled=True, **kwargs):
             logger.info(f"模拟启动浏览器: {browser_type}, headless={headless}")
             self.running = True
+            self.browser_type = browser_type or self.browser_type
             return f"已启动 {browser_type} 浏览器"
         
+        def recycle_context(self, **kwargs):
+            logger.info("模拟回收浏览器上下文")
+            return "已回收浏览器上下文"
+        
         def stop_browser(self):
             logger.info("模拟停止浏览器")
             self.running = False
@@ -58,6 +111,22 @@ except ImportError as e:
             logger.info("模拟获取标题")
             return "页面标题"
         
+        def get_html_content(self, page_id=None):
+            logger.info("模拟获取页面HTML")
+            return "<html><body>模拟页面</body></html>".encode('utf-8')
+        
+        def run_batch(self, steps, stop_on_error=True):
+            results = []
+            for step in steps:
+                try:
+                    result = getattr(self, step["method"])(**step.get("params", {}))
+                    results.append({"command": step["command"], "status": "success", "result": result, "elapsed_ms": 0})
+                except Exception as e:
+                    results.append({"command": step["command"], "status": "error", "message": str(e), "elapsed_ms": 0})
+                    if stop_on_error:
+                        break
+            return results
+        
         def get_browser_info(self):
             return {
                 "browser_type": "chromium",
@@ -65,26 +134,117 @@ except ImportError as e:
                 "pages_count": 1
             }
 
+    def apply_controller_options(controller, options):
+        # 模拟的控制器没有选项字典，直接设置属性
+        for name, value in options.items():
+            setattr(controller, name, value)
+
 class CommandExecutor:
-    def __init__(self, host='127.0.0.1', port=9876):
+    def __init__(self, host='127.0.0.1', port=9876, backlog=128, max_connections=256, workers=1,
+                 worker_mode='thread', controller='sync', prewarm=None, prewarm_headless=True,
+                 context_reuse_limit=0, http_cache=None, http_cache_size_mb=500, inject_jquery=False):
         self.host = host
         self.port = port
-        self.browser_controller = BrowserController()
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.active_connections = 0
+        self.connection_lock = threading.Lock()
+        self.worker_mode = worker_mode
+        self.controller = controller
+        self.prewarm = prewarm
+        self.prewarm_headless = prewarm_headless
+        self.context_reuse_limit = context_reuse_limit
+        # 所有浏览器默认开启的磁盘HTTP缓存模式（normal 或 offline），None 表示由 startBrowser 参数决定
+        self.http_cache = http_cache
+        self.http_cache_size_mb = http_cache_size_mb
+        # 所有浏览器上下文都通过初始化脚本注入本地的 jQuery
+        self.inject_jquery = inject_jquery
+        self.controller_loop = None
+        self.controller_loop_lock = threading.Lock()
+        self.pool = BrowserPool(workers, self._create_controller)
+        self.browser_controller = self.pool.workers[0]
+        self.browser_methods = {}
+        self.stream_methods = {}
+        self.started_sessions = set()
+        # 每个工作线程当前运行的浏览器 (类型, 是否无头)，以及上一个会话结束时已回收出全新上下文的工作线程
+        self.worker_modes = {}
+        self.fresh_contexts = set()
+        # 正在执行 startBrowser 的会话，同一会话并发的启动请求只执行一次
+        self.starting_sessions = set()
+        # 多个连接线程（异步模式下为 run_in_executor 的线程）同时读写以上会话状态
+        self.session_state_lock = threading.Lock()
         self.server_socket = None
+        self.async_server = None
+        self.loop = None
         self.running = False
-        self.browser_started = False
+        self.request_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="request")
         self.command_map = {
             "startBrowser": self.start_browser,
             "stopBrowser": self.stop_browser,
             "status": self.get_status,
+            "openSession": self.open_session,
+            "closeSession": self.close_session,
+            "getSessions": self.get_sessions,
+            "batch": self.run_batch,
+            "listCommands": self.list_commands,
+            "getCommandSchema": self.get_command_schema,
         }
         self._add_browser_methods()
     
+    def _controller_options(self) -> Dict[str, Any]:
+        options = {"max_context_reuse": self.context_reuse_limit}
+        if self.http_cache:
+            options["http_cache_options"] = {
+                "http_cache": True,
+                "http_cache_mode": self.http_cache,
+                "http_cache_size_mb": self.http_cache_size_mb,
+            }
+        if self.inject_jquery:
+            options["script_options"] = {"inject_jquery": True}
+        return options
+    
+    def _create_controller(self):
+        if self.controller == 'async':
+            from async_browser import AsyncBrowserController
+            controller = AsyncBrowserController()
+        elif self.worker_mode == 'process':
+            from process_worker import ProcessBrowserWorker
+            return ProcessBrowserWorker(controller_options=self._controller_options())
+        else:
+            controller = BrowserController()
+        
+        apply_controller_options(controller, self._controller_options())
+        return controller
+    
+    def prewarm_browsers(self):
+        # 预先启动所有工作线程的浏览器，会话开始时只需创建新的浏览器上下文
+        if not self.prewarm:
+            return
+            
+        def warm(index, controller):
+            try:
+                self.await_result(controller.start_browser(browser_type=self.prewarm,
+                                                           headless=self.prewarm_headless))
+                with self.session_state_lock:
+                    self.worker_modes[controller] = (self.prewarm, self.prewarm_headless)
+                    self.fresh_contexts.add(controller)
+                logger.info(f"浏览器工作线程 {index} 已预热")
+            except Exception as e:
+                logger.error(f"预热浏览器工作线程 {index} 失败: {str(e)}")
+        
+        futures = [self.request_pool.submit(warm, i, c) for i, c in enumerate(self.pool.workers)]
+        for future in futures:
+            future.result()
+    
     def _add_browser_methods(self):
         self._try_add_method("click")
         self._try_add_method("fill")
         self._try_add_method("type", "type_text")
+        self._try_add_method("press")
+        self._try_add_method("keyboardPress", "keyboard_press")
+        self._try_add_method("keyboardType", "keyboard_type")
         self._try_add_method("hover")
+        self._try_add_method("mouseClick", "mouse_click")
         self._try_add_method("select", "select_option")
         self._try_add_method("check")
         self._try_add_method("uncheck")
@@ -92,13 +252,22 @@ class CommandExecutor:
         self._try_add_method("getTitle", "get_title")
         self._try_add_method("getUrl", "get_url")
         self._try_add_method("getHtml", "get_html")
+        self._try_add_stream_method("getHtml", "get_html_content")
         self._try_add_method("getText", "get_text")
         self._try_add_method("getAttribute", "get_attribute")
         self._try_add_method("getElements", "get_elements")
+        self._try_add_method("extract")
+        self._try_add_method("getSnapshot", "get_snapshot")
+        self._try_add_method("getDomDiff", "get_dom_diff")
+        self._try_add_method("getPageHash", "get_page_hash")
         self._try_add_method("evaluate")
         self._try_add_method("addScriptTag", "add_script_tag")
         self._try_add_method("addStyleTag", "add_style_tag")
         self._try_add_method("getResponseBody", "get_response_body")
+        self._try_add_method("getResponses", "get_responses")
+        self._try_add_method("setNetworkRules", "set_network_rules")
+        self._try_add_method("getHttpCacheStats", "get_http_cache_stats")
+        self._try_add_method("clearHttpCache", "clear_http_cache")
         self._try_add_method("getCookies", "get_cookies")
         self._try_add_method("getLocalStorage", "get_local_storage")
         self._try_add_method("goto")
@@ -109,6 +278,7 @@ class CommandExecutor:
         self._try_add_method("closePage", "close_page")
         self._try_add_method("switchPage", "switch_page")
         self._try_add_method("getPages", "get_pages")
+        self._try_add_method("gotoPages", "goto_pages")
         self._try_add_method("screenshot")
         self._try_add_method("pdf")
         self._try_add_method("setCookies", "set_cookies")
@@ -116,8 +286,11 @@ class CommandExecutor:
         self._try_add_method("setLocalStorageItem", "set_local_storage_item")
         self._try_add_method("removeLocalStorageItem", "remove_local_storage_item")
         self._try_add_method("clearLocalStorage", "clear_local_storage")
+        self._try_add_method("waitForUrl", "wait_for_url")
+        self._try_add_method("waitForSelector", "wait_for_selector")
+        self._try_add_method("waitForLoadState", "wait_for_load_state")
         
-        logger.info(f"已添加 {len(self.command_map) - 3} 个浏览器控制方法到命令映射表")
+        logger.info(f"已添加 {len(self.browser_methods)} 个浏览器控制方法到命令映射表")
     
     def _try_add_method(self, command_name, method_name=None):
         if method_name is None:
@@ -125,10 +298,19 @@ class CommandExecutor:
             
         if hasattr(self.browser_controller, method_name):
             self.command_map[command_name] = getattr(self.browser_controller, method_name)
+            self.browser_methods[command_name] = method_name
             logger.debug(f"已添加命令 {command_name} -> {method_name}")
         else:
             logger.warning(f"浏览器控制器中不存在方法 {method_name}，跳过添加命令 {command_name}")
     
+    def _try_add_stream_method(self, command_name, method_name):
+        # 流式版本的指令返回原始字节，仅在分帧协议请求设置 stream=true 时使用
+        if hasattr(self.browser_controller, method_name):
+            self.stream_methods[command_name] = method_name
+            logger.debug(f"已添加流式命令 {command_name} -> {method_name}")
+        else:
+            logger.warning(f"浏览器控制器中不存在方法 {method_name}，指令 {command_name} 不支持流式传输")
+    
     def parse_command(self, command_str: str) -> Tuple[str, Dict[str, Any]]:
         logger.debug(f"解析命令字符串: {command_str}")
         parts = command_str.split('?', 1)
@@ -159,127 +341,495 @@ class CommandExecutor:
         except ValueError:
             return value
     
-    def execute_command(self, client_socket, client_address, command_str):
-        try:
-            command, params = self.parse_command(command_str)
-            logger.info(f"解析命令: {command}, 参数: {params}")
+    def _resolve_command(self, command: str, params: Dict[str, Any] = None):
+        params = dict(params or {})
+        
+        if '?' in command:
+            command, query_params = self.parse_command(command)
+            query_params.update(params)
+            params = query_params
+            
+        logger.info(f"解析命令: {command}, 参数: {params}")
+        session = params.pop("session", None) or DEFAULT_SESSION
+        
+        if command in self.browser_methods:
+            controller = self.pool.get(session)
+            command_func = getattr(controller, self.browser_methods[command])
+        else:
             command_func = self.get_command_function(command)
+            params["session"] = session
+            
+        return command, command_func, params
+    
+    def _unknown_command(self, command: str) -> Dict[str, Any]:
+        logger.warning(f"未知命令: {command}")
+        return {
+            "status": "error",
+            "message": f"未知指令 '{command}'"
+        }
+    
+    def _command_error(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"执行命令时出错: {str(e)}")
+        logger.error(traceback.format_exc())
+        
+        return {
+            "status": "error",
+            "message": f"执行命令时出错: {str(e)}"
+        }
+    
+    def run_command(self, command: str, params: Dict[str, Any] = None) -> Any:
+        try:
+            command, command_func, params = self._resolve_command(command, params)
             
-            if command_func:
+            if not command_func:
+                return self._unknown_command(command)
+                
+            logger.info(f"执行命令函数: {command_func.__name__}")
+            result = self.await_result(command_func(**params))
+            logger.info(f"命令执行结果: {result}")
+            
+            return self.build_response(result)
+            
+        except Exception as e:
+            return self._command_error(e)
+    
+    async def run_command_async(self, command: str, params: Dict[str, Any] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        
+        try:
+            command_name, command_func, resolved_params = self._resolve_command(command, params)
+        except Exception as e:
+            return self._command_error(e)
+            
+        # 异步控制器的方法直接在当前事件循环中执行，无需线程切换
+        if command_func and inspect.iscoroutinefunction(command_func) and self.loop is loop:
+            try:
                 logger.info(f"执行命令函数: {command_func.__name__}")
-                result = command_func(params)
+                result = await command_func(**resolved_params)
                 logger.info(f"命令执行结果: {result}")
+                return self.build_response(result)
+            except Exception as e:
+                return self._command_error(e)
                 
-                if isinstance(result, dict):
-                    result_str = json.dumps(result, ensure_ascii=False)
-                elif isinstance(result, (list, tuple)):
-                    result_str = json.dumps(result, ensure_ascii=False)
-                else:
-                    result_str = str(result)
-                
-                if (isinstance(result_str, str) and 
-                    result_str.startswith('[') and result_str.endswith(']')):
-                    response = result_str
-                else:
-                    if isinstance(result, dict) and "status" in result:
-                        response = result_str
-                    else:
-                        response = json.dumps({
-                            "status": "success",
-                            "message": result_str
-                        }, ensure_ascii=False)
-            else:
-                logger.warning(f"未知命令: {command}")
-                response = json.dumps({
-                    "status": "error",
-                    "message": f"未知指令 '{command}'"
-                }, ensure_ascii=False)
-                
-            client_socket.sendall(response.encode('utf-8'))
-            logger.info(f"已发送响应到客户端 {client_address}: {response}")
+        return await loop.run_in_executor(self.request_pool, self.run_command, command, params)
+    
+    def _resolve_stream_command(self, command: str, params: Dict[str, Any] = None, stream_options: Dict[str, Any] = None):
+        params = dict(params or {})
+        stream_options = stream_options or {}
+        
+        if '?' in command:
+            command, query_params = self.parse_command(command)
+            query_params.update(params)
+            params = query_params
             
-        except Exception as e:
-            logger.error(f"执行命令时出错: {str(e)}")
-            logger.error(traceback.format_exc())
+        session = params.pop("session", None) or DEFAULT_SESSION
+        offset, max_size = parse_stream_range(params.pop("offset", None), params.pop("max_size", None))
+        encoding, chunk_size = parse_stream_options(stream_options.get("encoding"), stream_options.get("chunk_size"))
+        
+        if command not in self.stream_methods:
+            raise ValueError(f"指令 '{command}' 不支持流式传输")
             
-            error_response = json.dumps({
-                "status": "error",
-                "message": f"执行命令时出错: {str(e)}"
-            }, ensure_ascii=False)
+        command_func = getattr(self.pool.get(session), self.stream_methods[command])
+        return command_func, params, offset, max_size, (encoding, chunk_size)
+    
+    def _slice_stream_data(self, data: bytes, offset: int, max_size: int = None):
+        total_size = len(data)
+        offset = min(offset, total_size)
+        end = total_size if max_size is None else min(total_size, offset + max_size)
+        
+        # memoryview 切片不复制数据
+        return {
+            "status": "success",
+            "offset": offset,
+            "size": end - offset,
+            "total_size": total_size
+        }, memoryview(data)[offset:end]
+    
+    def run_stream_command(self, command: str, params: Dict[str, Any] = None, stream_options: Dict[str, Any] = None):
+        # 返回 (result, data, (encoding, chunk_size))；参数校验失败时返回普通的错误响应和空数据
+        try:
+            command_func, params, offset, max_size, frame_options = self._resolve_stream_command(
+                command, params, stream_options)
+            data = self.await_result(command_func(**params))
+            return self._slice_stream_data(data, offset, max_size) + (frame_options,)
+        except Exception as e:
+            return self._command_error(e), b"", DEFAULT_FRAME_OPTIONS
+    
+    async def run_stream_command_async(self, command: str, params: Dict[str, Any] = None,
+                                       stream_options: Dict[str, Any] = None):
+        loop = asyncio.get_running_loop()
+        
+        try:
+            command_func, resolved_params, offset, max_size, frame_options = self._resolve_stream_command(
+                command, params, stream_options)
+        except Exception as e:
+            return self._command_error(e), b"", DEFAULT_FRAME_OPTIONS
             
+        if inspect.iscoroutinefunction(command_func) and self.loop is loop:
             try:
-                client_socket.sendall(error_response.encode('utf-8'))
-                logger.info(f"已发送响应到客户端 {client_address}: {error_response}")
-            except:
-                logger.error(f"发送错误响应失败")
+                data = await command_func(**resolved_params)
+            except Exception as e:
+                return self._command_error(e), b"", DEFAULT_FRAME_OPTIONS
+            return self._slice_stream_data(data, offset, max_size) + (frame_options,)
+            
+        return await loop.run_in_executor(self.request_pool, self.run_stream_command, command, params, stream_options)
+    
+    def _stream_frames(self, request, result, data, frame_options):
+        encoding, chunk_size = frame_options
+        return iter_stream_frames(request.get("id"), result, data, encoding, chunk_size)
+    
+    def await_result(self, result: Any) -> Any:
+        if not inspect.isawaitable(result):
+            return result
+            
+        return asyncio.run_coroutine_threadsafe(result, self._get_controller_loop()).result()
+    
+    def _get_controller_loop(self):
+        if self.loop is not None and self.loop.is_running():
+            return self.loop
+            
+        with self.controller_loop_lock:
+            if self.controller_loop is None:
+                self.controller_loop = asyncio.new_event_loop()
+                threading.Thread(target=self.controller_loop.run_forever, daemon=True,
+                                 name="controller-loop").start()
+                                 
+        return self.controller_loop
+    
+    def build_response(self, result: Any) -> Any:
+        if isinstance(result, (list, tuple)):
+            return list(result)
+            
+        if isinstance(result, dict):
+            if "status" in result:
+                return result
+            result_str = json.dumps(result, ensure_ascii=False)
+        else:
+            result_str = str(result)
+            
+        return {
+            "status": "success",
+            "message": result_str
+        }
+    
+    def execute_command(self, client_socket, client_address, command_str):
+        response = json.dumps(self.run_command(command_str), ensure_ascii=False)
+        
+        try:
+            client_socket.sendall(response.encode('utf-8'))
+            logger.info(f"已发送响应到客户端 {client_address}: {response}")
+        except Exception as e:
+            logger.error(f"发送响应到客户端 {client_address} 失败: {str(e)}")
+    
+    def execute_request(self, client_socket, client_address, send_lock, request):
+        request_id = request.get("id")
+        command = request.get("command", "")
+        params = request.get("params") or {}
+        
+        if not isinstance(params, dict):
+            result = {"status": "error", "message": "params必须是JSON对象"}
+        else:
+            if request.get("session"):
+                params.setdefault("session", request["session"])
+            if request.get("stream"):
+                self.execute_stream_request(client_socket, client_address, send_lock, request, params)
+                return
+            result = self.run_command(command, params)
+            
+        try:
+            with send_lock:
+                send_frame(client_socket, {"id": request_id, "result": result})
+            logger.info(f"已发送响应到客户端 {client_address}: id={request_id}")
+        except Exception as e:
+            logger.error(f"发送响应到客户端 {client_address} 失败: id={request_id}, {str(e)}")
+    
+    def execute_stream_request(self, client_socket, client_address, send_lock, request, params):
+        request_id = request.get("id")
+        result, data, frame_options = self.run_stream_command(request.get("command", ""), params, request)
+        
+        try:
+            # 每个分块单独加锁发送，其他请求的响应可以穿插在分块之间
+            for header, body in self._stream_frames(request, result, data, frame_options):
+                with send_lock:
+                    send_frame(client_socket, header, body)
+            logger.info(f"已发送流式响应到客户端 {client_address}: id={request_id}, {len(data)} 字节")
+        except Exception as e:
+            logger.error(f"发送流式响应到客户端 {client_address} 失败: id={request_id}, {str(e)}")
     
-    def start_browser(self, browser_type: str = "chromium", headless: bool = False, 
-                     ignore_https_errors: bool = True, java_script_enabled: bool = True, **kwargs) -> str:
+    def start_browser(self, browser_type: str = "chromium", headless: bool = None, 
+                     ignore_https_errors: bool = True, java_script_enabled: bool = True,
+                     session: str = DEFAULT_SESSION, **kwargs) -> str:
         try:
-            logger.info(f"启动浏览器参数: browser_type={browser_type}, headless={headless}, "
+            logger.info(f"启动浏览器参数: session={session}, browser_type={browser_type}, headless={headless}, "
                         f"ignore_https_errors={ignore_https_errors}, java_script_enabled={java_script_enabled}")
             logger.info("调用browser_controller.start_browser...")
             
-            result = self.browser_controller.start_browser(
-                browser_type=browser_type,
-                headless=headless,
-                ignore_https_errors=ignore_https_errors,
-                java_script_enabled=java_script_enabled
+            # headless 未指定时可复用任意模式的预热浏览器，冷启动时与预热的浏览器相同，未预热时默认有界面
+            if isinstance(headless, str):
+                headless = headless.lower() in ("true", "1", "yes")
+            ignore_https_errors, java_script_enabled = (
+                value if isinstance(value, bool) else str(value).lower() in ("true", "1", "yes")
+                for value in (ignore_https_errors, java_script_enabled)
             )
+            controller = self.pool.get(session)
+            
+            # 检查与标记在同一把锁内完成，同一会话并发的 startBrowser 只有一个会执行启动
+            with self.session_state_lock:
+                if session in self.starting_sessions or (
+                        session in self.started_sessions and getattr(controller, "running", False)):
+                    return {
+                        "status": "warning",
+                        "message": "该会话的浏览器已经在运行或正在启动，如需更换浏览器请先调用 stopBrowser",
+                        "session": session
+                    }
+                self.starting_sessions.add(session)
+                fresh = controller in self.fresh_contexts
+                self.fresh_contexts.discard(controller)
+            
+            try:
+                result = self._start_session_browser(controller, browser_type, headless, fresh,
+                                                     ignore_https_errors, java_script_enabled, **kwargs)
+                with self.session_state_lock:
+                    self.started_sessions.add(session)
+            finally:
+                with self.session_state_lock:
+                    self.starting_sessions.discard(session)
             
-            self.browser_started = True
             logger.info(f"浏览器启动成功: {browser_type}, 结果: {result}")
             
-            return json.dumps({
+            return {
                 "status": "success",
-                "message": f"已成功启动{browser_type}浏览器"
-            })
+                "message": f"已成功启动{browser_type}浏览器",
+                "session": session
+            }
             
         except Exception as e:
             logger.exception(f"启动浏览器失败: {str(e)}")
-            return json.dumps({
+            return {
                 "status": "error",
                 "message": f"启动浏览器失败: {str(e)}"
-            })
+            }
+    
+    def _start_session_browser(self, controller, browser_type: str, headless: Optional[bool], fresh: bool,
+                               ignore_https_errors: bool, java_script_enabled: bool, **kwargs):
+        if self._is_warm(controller, browser_type, headless):
+            if fresh and not kwargs and ignore_https_errors and java_script_enabled:
+                # 上一个会话结束时已回收出全新的上下文，直接使用，避免每个会话创建两次上下文
+                result = "使用已回收的浏览器上下文"
+            else:
+                # 复用已预热的浏览器，只创建新的上下文（独立的Cookie和存储）
+                result = self.await_result(controller.recycle_context(
+                    ignore_https_errors=ignore_https_errors,
+                    java_script_enabled=java_script_enabled,
+                    **kwargs
+                ))
+        else:
+            if getattr(controller, "running", False):
+                # 工作线程上运行着类型或模式不同的浏览器（例如预热的浏览器），先停止再按请求启动
+                logger.info(f"停止工作线程上的 {getattr(controller, 'browser_type', '')} 浏览器，改为启动 {browser_type}")
+                self.await_result(controller.stop_browser())
+            if headless is None:
+                headless = self.prewarm_headless if self.prewarm else False
+            result = self.await_result(controller.start_browser(
+                browser_type=browser_type,
+                headless=headless,
+                ignore_https_errors=ignore_https_errors,
+                java_script_enabled=java_script_enabled,
+                **kwargs
+            ))
+            if not getattr(controller, "running", False):
+                raise RuntimeError(result)
+            with self.session_state_lock:
+                self.worker_modes[controller] = (browser_type, headless)
+        
+        return result
     
-    def stop_browser(self, **kwargs) -> str:
+    def stop_browser(self, session: str = DEFAULT_SESSION, **kwargs) -> str:
         try:
-            if not self.browser_started:
-                logger.warning("浏览器未启动，无需停止")
-                return json.dumps({
-                    "status": "warning",
-                    "message": "浏览器未启动，无需停止"
-                })
+            with self.session_state_lock:
+                if session not in self.started_sessions:
+                    logger.warning("浏览器未启动，无需停止")
+                    return {
+                        "status": "warning",
+                        "message": "浏览器未启动，无需停止"
+                    }
+                self.started_sessions.discard(session)
                 
-            logger.info("停止浏览器...")
-            result = self.browser_controller.stop_browser()
-            self.browser_started = False
-            logger.info("浏览器已停止")
+            controller = self.pool.get(session)
+            
+            if self.prewarm and getattr(controller, "running", False):
+                # 预热模式下保留浏览器进程，只回收上下文以清除会话数据；
+                # 回收出的上下文使用默认设置，下一个会话不指定额外选项时可直接使用
+                result = self.await_result(controller.recycle_context(ignore_https_errors=True,
+                                                                      java_script_enabled=True))
+                with self.session_state_lock:
+                    self.fresh_contexts.add(controller)
+                logger.info(f"浏览器上下文已回收: {result}")
+            else:
+                logger.info("停止浏览器...")
+                result = self.await_result(controller.stop_browser())
+                logger.info("浏览器已停止")
             
-            return json.dumps({
+            return {
                 "status": "success",
                 "message": "浏览器已成功停止"
-            })
+            }
             
         except Exception as e:
             logger.exception(f"停止浏览器失败: {str(e)}")
-            return json.dumps({
+            return {
                 "status": "error",
                 "message": f"停止浏览器失败: {str(e)}"
+            }
+    
+    def _is_warm(self, controller, browser_type: str, headless: bool = None) -> bool:
+        # 浏览器类型和有无界面都符合请求时才能直接复用
+        with self.session_state_lock:
+            mode = self.worker_modes.get(controller)
+        return (bool(self.prewarm) and getattr(controller, "running", False) and mode is not None
+                and mode[0] == browser_type and (headless is None or headless == mode[1]))
+    
+    def open_session(self, session: str = DEFAULT_SESSION, **kwargs):
+        session_id, _ = self.pool.acquire(None if session == DEFAULT_SESSION else session)
+        logger.info(f"已分配会话: {session_id}")
+        return {
+            "status": "success",
+            "message": f"已分配会话 {session_id}",
+            "session": session_id
+        }
+    
+    def close_session(self, session: str = DEFAULT_SESSION, **kwargs):
+        if session not in self.pool.sessions:
+            return {
+                "status": "warning",
+                "message": f"会话 {session} 不存在"
+            }
+            
+        if session in self.started_sessions:
+            self.stop_browser(session=session)
+        self.pool.release(session)
+        logger.info(f"已释放会话: {session}")
+        
+        return {
+            "status": "success",
+            "message": f"已关闭会话 {session}"
+        }
+    
+    def run_batch(self, steps: Any = None, stopOnError: bool = True, session: str = DEFAULT_SESSION, **kwargs):
+        # 一次请求按顺序执行多条浏览器指令，整批指令只经过一次浏览器线程调度
+        try:
+            if isinstance(steps, str):
+                steps = json.loads(steps)
+            if not isinstance(steps, list) or not steps:
+                return {
+                    "status": "error",
+                    "message": "steps参数必须是非空的指令列表"
+                }
+                
+            resolved_steps = []
+            for step in steps:
+                if isinstance(step, str):
+                    command, params = self.parse_command(step)
+                else:
+                    command, params = step.get("command"), dict(step.get("params") or {})
+                    
+                if command not in self.browser_methods:
+                    return self._unknown_command(command)
+                    
+                params.pop("session", None)
+                resolved_steps.append({
+                    "command": command,
+                    "method": self.browser_methods[command],
+                    "params": params
+                })
+                
+            stop_on_error = stopOnError if isinstance(stopOnError, bool) else str(stopOnError).lower() in ("true", "1", "yes")
+            controller = self.pool.get(session)
+            started = time.time()
+            results = self.await_result(controller.run_batch(resolved_steps, stop_on_error))
+            failed = sum(1 for entry in results if entry["status"] != "success")
+            
+            return {
+                "status": "success" if failed == 0 else "error",
+                "message": f"已执行 {len(results)}/{len(resolved_steps)} 条指令，失败 {failed} 条",
+                "results": results,
+                "elapsed_ms": round((time.time() - started) * 1000, 1)
+            }
+        except json.JSONDecodeError:
+            return {
+                "status": "error",
+                "message": "steps参数不是有效的JSON格式"
+            }
+        except Exception as e:
+            return self._command_error(e)
+    
+    def list_commands(self, **kwargs):
+        return {
+            "status": "success",
+            "commands": sorted(self.command_map)
+        }
+    
+    def get_command_schema(self, commands: Any = None, **kwargs):
+        # 按 Ollama 工具调用的格式生成浏览器指令的参数说明，参数来自控制器方法的签名
+        if isinstance(commands, str):
+            commands = [name.strip() for name in commands.split(",") if name.strip()]
+        names = commands or sorted(self.browser_methods)
+        descriptions = load_command_descriptions()
+        tools = []
+
+        for name in names:
+            if name in self.browser_methods:
+                method = getattr(BrowserController, self.browser_methods[name], None) or self.command_map[name]
+            elif name in self.command_map:
+                method = self.command_map[name]
+            else:
+                return self._unknown_command(name)
+
+            properties = {}
+            required = []
+            for parameter in inspect.signature(method).parameters.values():
+                if parameter.name in ("self", "session") or parameter.kind in (
+                        inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                    continue
+                properties[parameter.name] = parameter_schema(parameter)
+                if parameter.default is inspect.Parameter.empty:
+                    required.append(parameter.name)
+
+            tools.append({
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": descriptions.get(name, name),
+                    "parameters": {"type": "object", "properties": properties, "required": required}
+                }
             })
+
+        return {
+            "status": "success",
+            "tools": tools
+        }
     
-    def get_status(self, params=None):
+    def get_sessions(self, **kwargs):
+        info = self.pool.get_sessions_info()
+        info["status"] = "success"
+        return info
+    
+    def get_status(self, session: str = DEFAULT_SESSION, **kwargs):
         try:
+            browser_started = session in self.started_sessions
             status = {
                 "status": "success",
                 "server": "running",
-                "browser_started": self.browser_started,
+                "session": session,
+                "browser_started": browser_started,
+                "workers": self.pool.size,
                 "timestamp": time.time()
             }
             
             try:
-                if self.browser_started and hasattr(self.browser_controller, "browser") and self.browser_controller.browser:
-                    status["browser_type"] = getattr(self.browser_controller, "browser_type", "unknown")
+                controller = self.pool.get(session) if browser_started else None
+                if controller is not None and getattr(controller, "browser", None):
+                    status["browser_type"] = getattr(controller, "browser_type", "unknown")
                     status["browser_running"] = True
                 else:
                     status["browser_running"] = False
@@ -310,8 +860,9 @@ class CommandExecutor:
                 self.server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
                 
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
+            self.server_socket.listen(self.backlog)
             self.running = True
+            self.prewarm_browsers()
             
             logger.info(f"服务器已启动，监听 {self.host}:{self.port}")
             
@@ -320,14 +871,13 @@ class CommandExecutor:
                     client_socket, client_address = self.server_socket.accept()
                     logger.info(f"接受客户端连接: {client_address}")
                     
-                    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                    if hasattr(socket, 'TCP_KEEPIDLE'):
-                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
-                    if hasattr(socket, 'TCP_KEEPINTVL'):
-                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
-                    if hasattr(socket, 'TCP_KEEPCNT'):
-                        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+                    if not self._acquire_connection_slot():
+                        logger.warning(f"连接数已达上限 {self.max_connections}，拒绝客户端 {client_address}")
+                        client_socket.close()
+                        continue
                         
+                    self._configure_client_socket(client_socket)
+                    
                     client_thread = threading.Thread(
                         target=self.handle_client,
                         args=(client_socket, client_address)
@@ -347,10 +897,220 @@ class CommandExecutor:
                 self.server_socket.close()
             logger.info("服务器已关闭")
     
+    def start_async_server(self):
+        try:
+            asyncio.run(self._serve_async())
+        except Exception as e:
+            logger.error(f"启动异步服务器时出错: {str(e)}")
+        finally:
+            logger.info("异步服务器已关闭")
+    
+    async def _serve_async(self):
+        self.loop = asyncio.get_running_loop()
+        self.async_server = await asyncio.start_server(
+            self.handle_client_async,
+            self.host,
+            self.port,
+            backlog=self.backlog,
+            reuse_address=True
+        )
+        self.running = True
+        # 在服务器事件循环运行后预热，异步控制器的浏览器需要绑定到该事件循环
+        await self.loop.run_in_executor(self.request_pool, self.prewarm_browsers)
+        
+        logger.info(f"异步服务器已启动，监听 {self.host}:{self.port}，"
+                    f"backlog={self.backlog}，最大连接数={self.max_connections}")
+        
+        async with self.async_server:
+            try:
+                await self.async_server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+    
+    async def handle_client_async(self, reader, writer):
+        client_address = writer.get_extra_info("peername")
+        
+        if not self._acquire_connection_slot():
+            logger.warning(f"连接数已达上限 {self.max_connections}，拒绝客户端 {client_address}")
+            writer.close()
+            return
+            
+        logger.info(f"接受客户端连接: {client_address}")
+        client_socket = writer.get_extra_info("socket")
+        if client_socket is not None:
+            self._configure_client_socket(client_socket)
+            
+        try:
+            first_byte = await reader.read(1)
+            
+            if not first_byte:
+                logger.info(f"客户端 {client_address} 断开连接")
+            elif is_framed_prefix(first_byte):
+                logger.info(f"客户端 {client_address} 使用分帧协议")
+                await self._serve_framed_async(reader, writer, client_address, first_byte)
+            else:
+                await self._serve_legacy_async(reader, writer, client_address, first_byte)
+                
+        except ProtocolError as e:
+            logger.error(f"客户端 {client_address} 协议错误: {str(e)}")
+        except (ConnectionResetError, BrokenPipeError):
+            logger.info(f"客户端 {client_address} 重置连接")
+        except Exception as e:
+            logger.error(f"处理客户端 {client_address} 请求时出错: {str(e)}")
+        finally:
+            self._release_connection_slot()
+            writer.close()
+            logger.info(f"客户端 {client_address} 连接已关闭")
+    
+    async def _serve_legacy_async(self, reader, writer, client_address, data):
+        loop = asyncio.get_running_loop()
+        data += await reader.read(4095)
+        
+        while data and self.running:
+            command_str = data.decode('utf-8')
+            logger.info(f"收到来自 {client_address} 的命令: {command_str}")
+            
+            result = await self.run_command_async(command_str)
+            response = json.dumps(result, ensure_ascii=False)
+            writer.write(response.encode('utf-8'))
+            await writer.drain()
+            logger.info(f"已发送响应到客户端 {client_address}: {response}")
+            
+            data = await reader.read(4096)
+            
+        logger.info(f"客户端 {client_address} 断开连接")
+    
+    async def _serve_framed_async(self, reader, writer, client_address, prefix):
+        write_lock = asyncio.Lock()
+        ordered_queues = {}
+        pending_tasks = set()
+        
+        async def process(request):
+            request_id = request.get("id")
+            params = request.get("params") or {}
+            
+            if not isinstance(params, dict):
+                result = {"status": "error", "message": "params必须是JSON对象"}
+            else:
+                if request.get("session"):
+                    params.setdefault("session", request["session"])
+                if request.get("stream"):
+                    await process_stream(request, params)
+                    return
+                result = await self.run_command_async(request.get("command", ""), params)
+                
+            async with write_lock:
+                write_frame(writer, {"id": request_id, "result": result})
+                await writer.drain()
+            logger.info(f"已发送响应到客户端 {client_address}: id={request_id}")
+        
+        async def process_stream(request, params):
+            result, data, frame_options = await self.run_stream_command_async(request.get("command", ""), params, request)
+            
+            for header, body in self._stream_frames(request, result, data, frame_options):
+                async with write_lock:
+                    write_frame(writer, header, body)
+                    await writer.drain()
+            logger.info(f"已发送流式响应到客户端 {client_address}: id={request.get('id')}, {len(data)} 字节")
+        
+        async def process_safely(request):
+            # 单个请求出错只向该请求返回错误，不能让按顺序执行的工作任务退出，否则同一会话后续的请求都无法执行
+            try:
+                await process(request)
+            except Exception as e:
+                result = self._command_error(e)
+                try:
+                    async with write_lock:
+                        write_frame(writer, {"id": request.get("id"), "result": result})
+                        await writer.drain()
+                except Exception as send_error:
+                    logger.error(f"发送响应到客户端 {client_address} 失败: id={request.get('id')}, {str(send_error)}")
+        
+        async def ordered_worker(queue):
+            while True:
+                request = await queue.get()
+                if request is None:
+                    break
+                await process_safely(request)
+        
+        def spawn(coro):
+            task = asyncio.create_task(coro)
+            pending_tasks.add(task)
+            task.add_done_callback(pending_tasks.discard)
+        
+        try:
+            while self.running:
+                frame = await read_frame_async(reader, prefix)
+                prefix = b""
+                
+                if frame is None:
+                    logger.info(f"客户端 {client_address} 断开连接")
+                    break
+                    
+                request, _ = frame
+                logger.info(f"收到来自 {client_address} 的请求: {request}")
+                
+                if request.get("ordered", True):
+                    order_key = self._request_order_key(request)
+                    if order_key not in ordered_queues:
+                        ordered_queues[order_key] = asyncio.Queue()
+                        spawn(ordered_worker(ordered_queues[order_key]))
+                    ordered_queues[order_key].put_nowait(request)
+                else:
+                    spawn(process_safely(request))
+        finally:
+            for queue in ordered_queues.values():
+                queue.put_nowait(None)
+            await asyncio.gather(*pending_tasks, return_exceptions=True)
+    
+    def _request_session(self, request) -> str:
+        params = request.get("params")
+        if isinstance(params, dict) and params.get("session"):
+            return params["session"]
+        return request.get("session") or DEFAULT_SESSION
+    
+    def _request_order_key(self, request) -> tuple:
+        # 指定了 page_id 的请求只与同一标签页上的请求保持顺序，不同标签页之间可并发执行
+        params = request.get("params")
+        page_id = params.get("page_id") if isinstance(params, dict) else None
+        return self._request_session(request), page_id or ""
+    
+    def _acquire_connection_slot(self) -> bool:
+        with self.connection_lock:
+            if self.active_connections >= self.max_connections:
+                return False
+            self.active_connections += 1
+            return True
+    
+    def _release_connection_slot(self):
+        with self.connection_lock:
+            self.active_connections -= 1
+    
+    def _configure_client_socket(self, client_socket):
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
+        if hasattr(socket, 'TCP_KEEPINTVL'):
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+        if hasattr(socket, 'TCP_KEEPCNT'):
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+    
+    def shutdown_workers(self):
+        for worker in self.pool.workers:
+            try:
+                if hasattr(worker, "shutdown"):
+                    worker.shutdown()
+                elif getattr(worker, "running", False):
+                    self.await_result(worker.stop_browser())
+            except Exception as e:
+                logger.error(f"关闭浏览器工作线程时出错: {str(e)}")
+    
     def stop_server(self):
         self.running = False
         if self.server_socket:
             self.server_socket.close()
+        if self.async_server and self.loop:
+            self.loop.call_soon_threadsafe(self.async_server.close)
         logger.info("服务器已停止")
     
     def handle_client(self, client_socket, client_address):
@@ -359,6 +1119,17 @@ class CommandExecutor:
             
             while self.running:
                 try:
+                    first_byte = client_socket.recv(1, socket.MSG_PEEK)
+                    
+                    if not first_byte:
+                        logger.info(f"客户端 {client_address} 断开连接")
+                        break
+                        
+                    if is_framed_prefix(first_byte):
+                        logger.info(f"客户端 {client_address} 使用分帧协议")
+                        self.handle_framed_client(client_socket, client_address)
+                        break
+                        
                     data = client_socket.recv(4096)
                     
                     if not data:
@@ -380,12 +1151,47 @@ class CommandExecutor:
                     break
                     
         finally:
+            self._release_connection_slot()
             try:
                 client_socket.close()
                 logger.info(f"客户端 {client_address} 连接已关闭")
             except:
                 pass
     
+    def handle_framed_client(self, client_socket, client_address):
+        send_lock = threading.Lock()
+        ordered_executors = {}
+        client_socket.settimeout(None)
+        
+        try:
+            while self.running:
+                frame = recv_frame(client_socket)
+                
+                if frame is None:
+                    logger.info(f"客户端 {client_address} 断开连接")
+                    break
+                    
+                request, _ = frame
+                logger.info(f"收到来自 {client_address} 的请求: {request}")
+                
+                # 同一会话同一标签页的请求默认按到达顺序执行，不同会话/标签页之间以及 ordered=false 的请求可并发执行并乱序返回
+                if request.get("ordered", True):
+                    order_key = self._request_order_key(request)
+                    if order_key not in ordered_executors:
+                        ordered_executors[order_key] = ThreadPoolExecutor(max_workers=1)
+                    executor = ordered_executors[order_key]
+                else:
+                    executor = self.request_pool
+                executor.submit(self.execute_request, client_socket, client_address, send_lock, request)
+                
+        except ProtocolError as e:
+            logger.error(f"客户端 {client_address} 协议错误: {str(e)}")
+        except ConnectionResetError:
+            logger.info(f"客户端 {client_address} 重置连接")
+        finally:
+            for executor in ordered_executors.values():
+                executor.shutdown(wait=True)
+    
     def get_command_function(self, command_name):
         if command_name in self.command_map:
             return self.command_map[command_name]
@@ -395,18 +1201,49 @@ def main():
     parser = argparse.ArgumentParser(description='命令执行器服务')
     parser.add_argument('--host', default='127.0.0.1', help='监听地址')
     parser.add_argument('--port', type=int, default=9876, help='监听端口')
+    parser.add_argument('--server-mode', choices=['thread', 'asyncio'], default='thread',
+                        help='服务器模式: thread(每连接一个线程) 或 asyncio(单事件循环多路复用)')
+    parser.add_argument('--backlog', type=int, default=128, help='监听队列长度')
+    parser.add_argument('--max-connections', type=int, default=256, help='最大并发连接数')
+    parser.add_argument('--workers', type=int, default=1, help='浏览器工作线程数量，每个会话独占一个浏览器')
+    parser.add_argument('--worker-mode', choices=['thread', 'process'], default='thread',
+                        help='浏览器工作方式: thread(执行器进程内线程) 或 process(独立子进程，崩溃后自动重启)')
+    parser.add_argument('--controller', choices=['sync', 'async'], default='sync',
+                        help='浏览器控制器: sync(同步API+浏览器线程) 或 async(playwright.async_api，配合asyncio服务器模式效果最佳)')
+    parser.add_argument('--prewarm', choices=['chromium', 'firefox', 'webkit'], default=None,
+                        help='启动时预热所有工作线程的浏览器，会话开始/结束时只创建/回收浏览器上下文')
+    parser.add_argument('--prewarm-headed', action='store_true', help='预热的浏览器以有界面模式运行')
+    parser.add_argument('--context-reuse-limit', type=int, default=0,
+                        help='每个浏览器进程最多创建的上下文数量，达到后重启浏览器，0 表示不限制')
+    parser.add_argument('--http-cache', choices=['normal', 'offline'], default=None,
+                        help='为所有浏览器开启磁盘HTTP缓存: normal(遵循Cache-Control) 或 offline(有缓存即使用)')
+    parser.add_argument('--http-cache-size-mb', type=int, default=500, help='HTTP缓存的最大容量（MB）')
+    parser.add_argument('--inject-jquery', action='store_true',
+                        help='在每个页面的脚本执行前注入本地的 jQuery 3.7.1，不再从CDN加载')
     
     args = parser.parse_args()
-    executor = CommandExecutor(host=args.host, port=args.port)
+    executor = CommandExecutor(host=args.host, port=args.port,
+                               backlog=args.backlog, max_connections=args.max_connections,
+                               workers=args.workers, worker_mode=args.worker_mode,
+                               controller=args.controller, prewarm=args.prewarm,
+                               prewarm_headless=not args.prewarm_headed,
+                               context_reuse_limit=args.context_reuse_limit,
+                               http_cache=args.http_cache, http_cache_size_mb=args.http_cache_size_mb,
+                               inject_jquery=args.inject_jquery)
     
     try:
-        executor.start_server()
+        if args.server_mode == 'asyncio':
+            executor.start_async_server()
+        else:
+            executor.start_server()
     except KeyboardInterrupt:
         logger.info("收到键盘中断，正在停止服务器...")
         executor.stop_server()
     except Exception as e:
         logger.error(f"服务器运行时出错: {str(e)}")
         executor.stop_server()
+    finally:
+        executor.shutdown_workers()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
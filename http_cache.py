@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import email.utils
+from typing import Dict, List, Any, Optional, Generator
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "http_cache")
+CACHEABLE_STATUS = (200, 203, 300, 301, 308, 404, 410)
+# 缓存保存的是解码后的响应内容，这些与传输编码相关的头部不能原样返回给浏览器
+TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive")
+# Set-Cookie 只对当次响应有效，不保存到缓存中
+DROPPED_HEADERS = TRANSFER_HEADERS + ("set-cookie",)
+CREDENTIAL_HEADERS = {"cookie", "authorization"}
+# 只有 Last-Modified 而没有明确过期时间的响应，按距离上次修改时间的 10% 估算有效期，最长一天
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_AGE = 24 * 3600
+
+
+def has_credentials(headers: Dict[str, str]) -> bool:
+    return any(name.lower() in CREDENTIAL_HEADERS for name in headers)
+
+
+def passthrough_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() not in TRANSFER_HEADERS}
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> float:
+    directives = parse_cache_control(headers.get("cache-control", ""))
+
+    if "max-age" in directives:
+        try:
+            return float(directives["max-age"])
+        except (TypeError, ValueError):
+            return 0
+
+    date = parse_http_date(headers.get("date")) or now
+    expires = parse_http_date(headers.get("expires"))
+    if expires is not None:
+        return max(0.0, expires - date)
+
+    last_modified = parse_http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_AGE, max(0.0, (date - last_modified) * HEURISTIC_FRACTION))
+
+    return 0
+
+
+class HttpCache:
+    """
+    浏览器请求的磁盘缓存：
+    - 以 请求方法 + URL + Vary 指定的请求头 为键，响应内容保存为单独的文件，索引保存在 sqlite 中
+    - normal 模式遵循 Cache-Control/Expires，过期的条目带上 ETag/Last-Modified 重新验证；
+      offline 模式只要有缓存就直接使用，只有未缓存的请求才访问网络
+    - 缓存总大小超过 max_size 时按最近使用时间淘汰
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = 500 * 1024 * 1024, mode: str = "normal"):
+        if mode not in ("normal", "offline"):
+            raise ValueError(f"未知的缓存模式: {mode}，可选: normal, offline")
+
+        self.directory = directory
+        self.max_size = max_size
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, base TEXT, vary TEXT, url TEXT, status INTEGER, headers TEXT, "
+            "size INTEGER, stored REAL, expires REAL, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_base ON entries (base)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def _base_key(method: str, url: str) -> str:
+        return f"{method.upper()} {url.split('#', 1)[0]}"
+
+    @staticmethod
+    def _variant_key(base: str, vary: List[str], request_headers: Dict[str, str]) -> str:
+        values = [f"{name}={request_headers.get(name, '')}" for name in vary]
+        return hashlib.sha256("\n".join([base] + values).encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def is_cacheable_request(self, method: str, url: str) -> bool:
+        return method.upper() == "GET" and url.startswith(("http://", "https://"))
+
+    def lookup(self, method: str, url: str, request_headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        base = self._base_key(method, url)
+        request_headers = {name.lower(): value for name, value in request_headers.items()}
+
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT key, vary, status, headers, expires FROM entries WHERE base = ?", (base,)
+            ).fetchall()
+
+        for key, vary, status, headers, expires in rows:
+            if self._variant_key(base, json.loads(vary), request_headers) == key:
+                return {"key": key, "status": status, "headers": json.loads(headers), "expires": expires}
+
+        return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return self.mode == "offline" or entry["expires"] > time.time()
+
+    def read_body(self, entry: Dict[str, Any]) -> Optional[bytes]:
+        try:
+            with open(self._body_path(entry["key"]), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+
+        with self.lock:
+            self.db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), entry["key"]))
+            self.db.commit()
+        self.hits += 1
+        return body
+
+    def validators(self, entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if entry["headers"].get("etag"):
+            headers["if-none-match"] = entry["headers"]["etag"]
+        if entry["headers"].get("last-modified"):
+            headers["if-modified-since"] = entry["headers"]["last-modified"]
+        return headers
+
+    def refresh(self, entry: Dict[str, Any], response_headers: Dict[str, str]):
+        # 304 响应表示缓存的内容仍然有效，按新的响应头更新有效期
+        headers = dict(entry["headers"])
+        headers.update({name.lower(): value for name, value in response_headers.items()
+                        if name.lower() not in DROPPED_HEADERS})
+        now = time.time()
+        entry["headers"] = headers
+        entry["expires"] = now + freshness_lifetime(headers, now)
+
+        with self.lock:
+            self.db.execute(
+                "UPDATE entries SET headers = ?, expires = ?, last_used = ? WHERE key = ?",
+                (json.dumps(headers), entry["expires"], now, entry["key"])
+            )
+            self.db.commit()
+        self.revalidated += 1
+
+    def store(self, method: str, url: str, request_headers: Dict[str, str], status: int,
+              response_headers: Dict[str, str], body: bytes, credentialed: bool = False) -> bool:
+        headers = {name.lower(): value for name, value in response_headers.items()}
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        vary = [name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()]
+
+        if (status not in CACHEABLE_STATUS or "no-store" in directives or "*" in vary
+                or not self.is_cacheable_request(method, url) or len(body) > self.max_size // 10):
+            return False
+
+        # 缓存在所有会话之间共享，私有响应和携带身份信息的请求不能保存，否则会破坏会话之间的隔离
+        if "private" in directives or credentialed or has_credentials(request_headers):
+            return False
+
+        now = time.time()
+        # 没有验证信息又没有有效期的响应无法判断是否过期，只在 offline 模式下保存
+        lifetime = 0 if "no-cache" in directives else freshness_lifetime(headers, now)
+        if lifetime <= 0 and self.mode == "normal" and not ("etag" in headers or "last-modified" in headers):
+            return False
+
+        base = self._base_key(method, url)
+        key = self._variant_key(base, vary, {name.lower(): value for name, value in request_headers.items()})
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+
+        stored_headers = {name: value for name, value in headers.items() if name not in DROPPED_HEADERS}
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, base, vary, url, status, headers, size, stored, expires, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, base, json.dumps(vary), url, status, json.dumps(stored_headers), len(body), now, now + lifetime, now)
+            )
+            self._evict()
+            self.db.commit()
+        return True
+
+    def route_steps(self, method: str, url: str, request_headers: Dict[str, str]) -> Generator:
+        """
+        缓存路由的处理流程，与 Playwright 的同步/异步接口无关，由控制器逐步驱动：
+        - 产出 ("fetch", 请求头) 时，调用方以 max_redirects=0 访问网络，把
+          (status, 响应头, body, 请求是否携带Cookie/Authorization) 或异常 send 回来
+        - 产出 ("fulfill", 响应参数) 或 ("fallback", None) 时，调用方执行对应的路由操作后结束
+        """
+        if not self.is_cacheable_request(method, url):
+            yield "fallback", None
+            return
+
+        entry = self.lookup(method, url, request_headers)
+        body = self.read_body(entry) if entry and self.is_fresh(entry) else None
+        if body is not None:
+            yield "fulfill", {"status": entry["status"], "headers": entry["headers"], "body": body}
+            return
+
+        result = yield "fetch", dict(request_headers, **self.validators(entry)) if entry else None
+        if entry and not isinstance(result, Exception) and result[0] == 304:
+            self.refresh(entry, result[1])
+            body = self.read_body(entry)
+            if body is not None:
+                yield "fulfill", {"status": entry["status"], "headers": entry["headers"], "body": body}
+                return
+            result = yield "fetch", None
+
+        if isinstance(result, Exception):
+            # 网络请求失败时使用已过期的缓存；没有缓存时交给浏览器正常访问网络，由浏览器自己报告错误
+            body = self.read_body(entry) if entry else None
+            if body is None:
+                yield "fallback", None
+            else:
+                yield "fulfill", {"status": entry["status"], "headers": entry["headers"], "body": body}
+            return
+
+        status, response_headers, body, credentialed = result
+        self.misses += 1
+        self.store(method, url, request_headers, status, response_headers, body, credentialed)
+        yield "fulfill", {"status": status, "headers": passthrough_headers(response_headers), "body": body}
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            total -= size
+            if total <= self.max_size:
+                break
+
+    def clear(self):
+        with self.lock:
+            for (key,) in self.db.execute("SELECT key FROM entries").fetchall():
+                try:
+                    os.remove(self._body_path(key))
+                except OSError:
+                    pass
+            self.db.execute("DELETE FROM entries")
+            self.db.commit()
+        self.hits = self.misses = self.revalidated = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        total = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
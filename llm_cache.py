@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "llm_cache.db")
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[List[str]]:
+    # 合并空白字符，只有空格和换行不同的提示词视为同一个提示词
+    return [[message["role"], " ".join(message["content"].split())] for message in messages]
+
+
+class LLMCache:
+    """
+    模型回复的磁盘缓存，键为 模型名 + 规范化后的提示词 + 页面状态哈希：
+    - 超过 ttl 秒的条目视为过期
+    - 条目数超过 max_entries 时按最近使用时间淘汰
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = 5000, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL, hits INTEGER DEFAULT 0)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], page_state: str = "") -> str:
+        payload = json.dumps([model, normalize_messages(messages), page_state or ""], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self.lock:
+            row = self.db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.db.commit()
+                self.misses += 1
+                return None
+
+            self.db.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model, response, now, now)
+            )
+            self._evict(now)
+            self.db.commit()
+
+    def _evict(self, now: float):
+        self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+
+        count = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate(), 3)}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
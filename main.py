@@ -15,12 +15,13 @@ print(f"Python版本: {platform.python_version()}")
 print(f"操作系统: {platform.system()} {platform.release()}")
 
 from browser import get_browser_controller
+from protocol import request as executor_request
 
 class SuperBrowserApp:
     def __init__(self, root):
         self.root = root
         self.root.title("超级浏览器")
-        self.root.geometry("360x260")
+        self.root.geometry("360x310")
         self.root.configure(bg="#f0f0f0")
         self.root.resizable(False, False)
         
@@ -33,6 +34,7 @@ class SuperBrowserApp:
         
         self.browser_type = tk.StringVar(value="chromium")
         self.model_name = tk.StringVar()
+        self.task_text = tk.StringVar()
         self.dev_mode = tk.BooleanVar(value=False)
         
         self.talk_process = None
@@ -83,27 +85,7 @@ class SuperBrowserApp:
             )
             
             self.log_message(f"Executor进程已启动，PID: {self.executor_process.pid}")
-            
-            def read_output(stream, prefix):
-                try:
-                    for line in stream:
-                        self.log_message(f"{prefix}: {line.strip()}")
-                except Exception as e:
-                    self.log_message(f"读取{prefix}时出错: {str(e)}")
-                    
-            stdout_thread = threading.Thread(
-                target=read_output, 
-                args=(self.executor_process.stdout, "Executor输出")
-            )
-            stderr_thread = threading.Thread(
-                target=read_output, 
-                args=(self.executor_process.stderr, "Executor错误")
-            )
-            
-            stdout_thread.daemon = True
-            stderr_thread.daemon = True
-            stdout_thread.start()
-            stderr_thread.start()
+            self.read_process_output(self.executor_process, "Executor")
             
             self.log_message("等待Executor启动...")
             time.sleep(2)
@@ -132,6 +114,18 @@ class SuperBrowserApp:
             self.log_message(f"启动Executor时出错: {str(e)}")
             return False
 
+    def read_process_output(self, process, name):
+        # 持续读取子进程的输出写入日志，避免管道缓冲区写满后子进程阻塞
+        def read_output(stream, prefix):
+            try:
+                for line in stream:
+                    self.log_message(f"{prefix}: {line.strip()}")
+            except Exception as e:
+                self.log_message(f"读取{prefix}时出错: {str(e)}")
+                
+        for stream, prefix in ((process.stdout, f"{name}输出"), (process.stderr, f"{name}错误")):
+            threading.Thread(target=read_output, args=(stream, prefix), daemon=True).start()
+
     def check_executor_running(self):
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -214,6 +208,17 @@ class SuperBrowserApp:
         self.start_button = tk.Button(button_frame, text="启动浏览器", command=self.start_browser, bg="#2196F3", fg="white", height=2)
         self.start_button.pack(fill=tk.X)
         
+        task_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        task_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        tk.Label(task_frame, text="任务:", bg="#f0f0f0").pack(side=tk.LEFT, padx=(0, 5))
+        self.task_entry = tk.Entry(task_frame, textvariable=self.task_text, state="disabled")
+        self.task_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.task_entry.bind("<Return>", lambda event: self.send_task())
+        
+        self.task_button = tk.Button(task_frame, text="执行", command=self.send_task, bg="#e0e0e0", width=8, state="disabled")
+        self.task_button.pack(side=tk.RIGHT, padx=(5, 0))
+        
         status_frame = tk.Frame(main_frame, bg="#f0f0f0")
         status_frame.pack(fill=tk.X, padx=5, pady=(10, 5))
         
@@ -356,10 +361,9 @@ class SuperBrowserApp:
                     s.settimeout(30)
                     self.log_message("正在连接到executor服务器...")
                     s.connect(('127.0.0.1', 9876))
-                    self.log_message("已连接到executor服务器，发送命令...")
-                    s.sendall(command.encode('utf-8'))
-                    self.log_message("命令已发送，等待响应...")
-                    response = s.recv(4096).decode('utf-8')
+                    self.log_message("已连接到executor服务器，发送命令并等待响应...")
+                    result = executor_request(s, command)
+                    response = json.dumps(result, ensure_ascii=False)
                     self.log_message(f"收到启动浏览器响应: {response}")
             except socket.timeout:
                 raise Exception("连接executor服务器超时，请检查服务器是否正常运行")
@@ -431,19 +435,48 @@ class SuperBrowserApp:
                 self.log_message(f"错误: 找不到talk.py文件: {talk_path}")
                 return
                 
+            # talk.py 从标准输入逐行读取任务；-u 和 PYTHONIOENCODING 保证流式回复及时输出且中文不乱码
             self.talk_process = subprocess.Popen(
-                [sys.executable, talk_path, "--model", model],
+                [sys.executable, "-u", talk_path, "--model", model],
+                stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                env=dict(os.environ, PYTHONIOENCODING="utf-8"),
                 creationflags=subprocess.CREATE_NO_WINDOW
             )
             
             self.log_message(f"已启动talk.py进程，使用模型: {model}")
+            self.read_process_output(self.talk_process, "talk.py")
+            self.root.after(0, self.set_task_controls_state, "normal")
             
         except Exception as e:
             self.log_message(f"启动talk.py时出错: {str(e)}")
 
+    def set_task_controls_state(self, state):
+        self.task_entry.config(state=state)
+        self.task_button.config(state=state)
+
+    def send_task(self):
+        task = self.task_text.get().strip()
+        if not task:
+            return
+            
+        if not self.talk_process or self.talk_process.poll() is not None:
+            self.log_message("talk.py进程未运行，无法执行任务")
+            return
+            
+        try:
+            self.talk_process.stdin.write(task.replace("\n", " ") + "\n")
+            self.talk_process.stdin.flush()
+            self.task_text.set("")
+            self.log_message(f"已发送任务: {task}")
+        except Exception as e:
+            self.log_message(f"发送任务时出错: {str(e)}")
+
     def start_dev_tools(self):
         try:
             dev_tools_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dev_tools.py")
@@ -501,8 +534,10 @@ class SuperBrowserApp:
 
     def stop_talk_process(self):
         if self.talk_process:
+            self.set_task_controls_state("disabled")
             try:
                 self.log_message("正在停止talk.py进程...")
+                self.talk_process.stdin.close()
                 self.talk_process.terminate()
                 
                 try:
@@ -556,8 +591,7 @@ class SuperBrowserApp:
                     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                         s.settimeout(5)
                         s.connect(('127.0.0.1', 9876))
-                        s.sendall("stopBrowser".encode('utf-8'))
-                        response = s.recv(4096).decode('utf-8')
+                        response = executor_request(s, "stopBrowser")
                         self.log_message(f"停止浏览器响应: {response}")
                 except Exception as e:
                     self.log_message(f"停止浏览器时出错: {str(e)}")
@@ -0,0 +1,171 @@
+import re
+import time
+import fnmatch
+import urllib.parse
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+# 常见的统计和广告域名，开启 block_trackers 时拦截这些域名及其子域名的请求
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "googlesyndication.com",
+    "doubleclick.net", "connect.facebook.net", "hm.baidu.com", "cpro.baidustatic.com", "pos.baidu.com",
+    "cnzz.com", "umeng.com", "hotjar.com", "mixpanel.com", "segment.io", "scorecardresearch.com",
+)
+RESOURCE_TYPES = (
+    "document", "stylesheet", "image", "media", "font", "script", "texttrack",
+    "xhr", "fetch", "eventsource", "websocket", "manifest", "other",
+)
+CAPTURE_TYPES = ("document", "xhr", "fetch")
+NOT_CAPTURED = "未记录响应内容，可通过 setNetworkRules?captureResponses=true 开启"
+
+
+def parse_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        if value.strip().lower() == "none":
+            return []
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
+
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+class NetworkInterceptor:
+    """
+    每个浏览器上下文的网络规则和响应记录：
+    - 按资源类型、统计域名和URL通配符拦截请求，只有配置了拦截规则时控制器才注册路由
+    - 主文档和 XHR/fetch 响应的状态和地址保存在固定长度的环形缓冲区中，旧的记录自动丢弃；
+      读取响应内容需要额外的一次往返，只有开启 capture_responses 时才同时保存内容
+    """
+
+    def __init__(self, block_resources: Any = None, block_trackers: Any = False, block_urls: Any = None,
+                 capture_responses: Any = False, max_captured_responses: int = 100,
+                 max_body_size: int = 2 * 1024 * 1024):
+        self.block_resources: List[str] = []
+        self.block_trackers = False
+        self.block_urls: List[str] = []
+        self.capture_responses = False
+        self.max_body_size = max_body_size
+        self.responses: deque = deque(maxlen=int(max_captured_responses))
+        self.blocked_count = 0
+        self.configure(block_resources=block_resources, block_trackers=block_trackers,
+                       block_urls=block_urls, capture_responses=capture_responses)
+
+    def configure(self, block_resources: Any = None, block_trackers: Any = None, block_urls: Any = None,
+                  capture_responses: Any = None):
+        if block_resources is not None:
+            types = parse_list(block_resources)
+            unknown = [t for t in types if t not in RESOURCE_TYPES]
+            if unknown:
+                raise ValueError(f"未知的资源类型: {', '.join(unknown)}，可选: {', '.join(RESOURCE_TYPES)}")
+            self.block_resources = types
+        if block_trackers is not None:
+            self.block_trackers = parse_bool(block_trackers)
+        if block_urls is not None:
+            self.block_urls = parse_list(block_urls)
+        if capture_responses is not None:
+            self.capture_responses = parse_bool(capture_responses)
+
+    @property
+    def blocking(self) -> bool:
+        return bool(self.block_resources or self.block_trackers or self.block_urls)
+
+    def describe(self) -> str:
+        rules = []
+        if self.block_resources:
+            rules.append(f"资源类型: {', '.join(self.block_resources)}")
+        if self.block_trackers:
+            rules.append("统计和广告域名")
+        if self.block_urls:
+            rules.append(f"URL: {', '.join(self.block_urls)}")
+        return "拦截 " + "; ".join(rules) if rules else "未设置拦截规则"
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.block_resources:
+            return True
+
+        if self.block_trackers:
+            host = urllib.parse.urlsplit(url).hostname or ""
+            if any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS):
+                return True
+
+        return any(fnmatch.fnmatch(url, pattern) for pattern in self.block_urls)
+
+    def should_record(self, resource_type: str) -> bool:
+        return resource_type in CAPTURE_TYPES
+
+    def add_response(self, url: str, status: int, method: str, resource_type: str, content_type: str,
+                     body: Optional[bytes], page_id: str = None, error: str = None):
+        truncated = body is not None and len(body) > self.max_body_size
+        self.responses.append({
+            "url": url,
+            "status": status,
+            "method": method,
+            "resource_type": resource_type,
+            "content_type": content_type,
+            "size": len(body) if body is not None else 0,
+            "body": body[:self.max_body_size] if truncated else body,
+            "truncated": truncated,
+            "page_id": page_id,
+            "error": error,
+            "time": time.time(),
+        })
+
+    def find(self, url: str = None, page_id: str = None) -> Optional[Dict[str, Any]]:
+        # 优先完全匹配，其次是包含该字符串的URL；未指定URL时返回最近的主文档响应
+        candidates = [
+            entry for entry in reversed(self.responses)
+            if page_id is None or entry["page_id"] == page_id
+        ]
+
+        if not url:
+            return next((entry for entry in candidates if entry["resource_type"] == "document"), None)
+
+        return (next((entry for entry in candidates if entry["url"] == url), None)
+                or next((entry for entry in candidates if url in entry["url"]), None))
+
+    def list(self, filter: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        entries = [entry for entry in self.responses if not filter or filter in entry["url"]]
+        return entries[-int(limit):] if limit else entries
+
+    def clear(self):
+        self.responses.clear()
+        self.blocked_count = 0
+
+
+def decode_body(entry: Dict[str, Any]) -> str:
+    match = re.search(r"charset=([\w-]+)", entry["content_type"] or "", re.I)
+    try:
+        return entry["body"].decode(match.group(1) if match else "utf-8", errors="replace")
+    except LookupError:
+        return entry["body"].decode("utf-8", errors="replace")
+
+
+def format_response_body(entry: Optional[Dict[str, Any]], url: str = None, max_length: int = 20000) -> str:
+    if entry is None:
+        return f"未找到匹配的响应: {url}" if url else "还没有记录到主文档响应"
+
+    if entry["body"] is None:
+        return f"无法获取响应内容 ({entry['status']} {entry['url']}): {entry['error'] or '响应没有内容'}"
+
+    text = decode_body(entry)
+    header = f"响应 {entry['status']} {entry['method']} {entry['url']} ({entry['content_type'] or '未知类型'}, {entry['size']} 字节)"
+    if len(text) > max_length:
+        text = text[:max_length] + f"\n... 已省略 {len(text) - max_length} 个字符"
+    elif entry["truncated"]:
+        text += "\n... 响应超过记录上限，已截断"
+
+    return f"{header}:\n{text}"
+
+
+def format_responses(entries: List[Dict[str, Any]], blocked_count: int = 0) -> str:
+    lines = [f"已记录 {len(entries)} 个响应，已拦截 {blocked_count} 个请求:"]
+    for entry in entries:
+        page = f"[{entry['page_id']}] " if entry["page_id"] else ""
+        lines.append(f"{page}{entry['status']} {entry['method']} {entry['resource_type']} {entry['url']} ({entry['size']} 字节)")
+    return "\n".join(lines)
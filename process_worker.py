@@ -0,0 +1,264 @@
+import multiprocessing
+import threading
+import itertools
+import logging
+import signal
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import wait
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger("ProcessBrowserWorker")
+
+
+class WorkerCrashedError(RuntimeError):
+    pass
+
+
+class RemoteCallError(RuntimeError):
+    pass
+
+
+# IPC 消息格式（均为元组，经 Pipe 以 pickle 传输）:
+#   父进程 -> 子进程: (call_id, 方法名, args, kwargs)，None 表示退出
+#   子进程 -> 父进程: ("ready", 方法名列表) / ("result", call_id, 是否成功, 结果或错误信息) / ("event", 事件名)
+def _worker_main(conn, max_concurrent_calls, controller_options=None):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from browser import BrowserController, apply_controller_options
+
+    controller = BrowserController()
+    apply_controller_options(controller, controller_options or {})
+    send_lock = threading.Lock()
+    call_pool = ThreadPoolExecutor(max_workers=max_concurrent_calls)
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def handle(call_id, method_name, args, kwargs):
+        try:
+            result = getattr(controller, method_name)(*args, **kwargs)
+            send(("result", call_id, True, result))
+        except Exception as e:
+            send(("result", call_id, False, f"{type(e).__name__}: {str(e)}"))
+
+    controller.add_event_listener("browser_closed", lambda: send(("event", "browser_closed")))
+
+    methods = [
+        name for name in dir(controller)
+        if not name.startswith("_") and callable(getattr(controller, name))
+    ]
+    send(("ready", methods))
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            if message is None:
+                break
+
+            call_pool.submit(handle, *message)
+    finally:
+        try:
+            controller.stop_browser()
+        except Exception:
+            pass
+        call_pool.shutdown(wait=False)
+
+
+class ProcessBrowserWorker:
+    def __init__(self, max_restarts: int = 5, restart_window: float = 60,
+                 start_timeout: float = 30, max_concurrent_calls: int = 8,
+                 controller_options: Dict[str, Any] = None):
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.start_timeout = start_timeout
+        self.max_concurrent_calls = max_concurrent_calls
+        self.controller_options = controller_options or {}
+        self.running = False
+        self.browser_type = "chromium"
+        self.last_start_kwargs: Optional[Dict[str, Any]] = None
+        self.remote_methods: List[str] = []
+        self.process = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.call_ids = itertools.count(1)
+        self.restart_times: List[float] = []
+        self.closing = False
+        self.failed = False
+        self._spawn()
+
+    @property
+    def browser(self):
+        return self.process.pid if self.running and self.process else None
+
+    def _spawn(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(child_conn, self.max_concurrent_calls, self.controller_options),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+        if not parent_conn.poll(self.start_timeout):
+            self.process.kill()
+            raise WorkerCrashedError("浏览器工作进程启动超时")
+
+        message = parent_conn.recv()
+        if message[0] != "ready":
+            raise WorkerCrashedError(f"浏览器工作进程握手失败: {message}")
+
+        self.remote_methods = message[1]
+        logger.info(f"浏览器工作进程已启动，PID: {self.process.pid}")
+
+        threading.Thread(target=self._supervise, args=(self.process, parent_conn), daemon=True).start()
+
+    def _supervise(self, process, conn):
+        while True:
+            ready = wait([conn, process.sentinel])
+
+            if conn in ready:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                self._handle_message(message)
+                continue
+
+            break
+
+        process.join(timeout=1)
+        conn.close()
+
+        if self.closing:
+            return
+
+        logger.error(f"浏览器工作进程意外退出，PID: {process.pid}，退出码: {process.exitcode}")
+        self._fail_pending(WorkerCrashedError(f"浏览器工作进程已崩溃 (退出码: {process.exitcode})"))
+        self._restart()
+
+    def _handle_message(self, message):
+        kind = message[0]
+
+        if kind == "result":
+            _, call_id, ok, payload = message
+            with self.pending_lock:
+                future = self.pending.pop(call_id, None)
+            if future is None or future.done():
+                return
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RemoteCallError(payload))
+        elif kind == "event" and message[1] == "browser_closed":
+            self.running = False
+
+    def _restart(self):
+        now = time.time()
+        self.restart_times = [t for t in self.restart_times if now - t < self.restart_window]
+
+        if len(self.restart_times) >= self.max_restarts:
+            logger.error(f"浏览器工作进程在 {self.restart_window} 秒内重启超过 {self.max_restarts} 次，停止重启")
+            self.failed = True
+            self.running = False
+            return
+
+        self.restart_times.append(now)
+        was_running = self.running
+        self.running = False
+
+        try:
+            self._spawn()
+        except Exception as e:
+            logger.error(f"重启浏览器工作进程失败: {str(e)}")
+            self.failed = True
+            return
+
+        if was_running and self.last_start_kwargs is not None:
+            logger.info("正在恢复崩溃前的浏览器...")
+            try:
+                self.start_browser(**self.last_start_kwargs)
+            except Exception as e:
+                logger.error(f"恢复浏览器失败: {str(e)}")
+
+    def _fail_pending(self, error: Exception):
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def submit(self, method_name: str, *args, **kwargs) -> Future:
+        future = Future()
+
+        if self.failed:
+            future.set_exception(WorkerCrashedError("浏览器工作进程已失效"))
+            return future
+
+        call_id = next(self.call_ids)
+        with self.pending_lock:
+            self.pending[call_id] = future
+
+        try:
+            with self.send_lock:
+                self.conn.send((call_id, method_name, args, kwargs))
+        except (OSError, EOFError) as e:
+            with self.pending_lock:
+                self.pending.pop(call_id, None)
+            future.set_exception(WorkerCrashedError(f"无法发送到浏览器工作进程: {str(e)}"))
+
+        return future
+
+    def call(self, method_name: str, *args, timeout: float = None, **kwargs):
+        return self.submit(method_name, *args, **kwargs).result(timeout=timeout)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.__dict__.get("remote_methods", ()):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    def start_browser(self, browser_type=None, **kwargs):
+        result = self.call("start_browser", browser_type=browser_type, **kwargs)
+
+        if isinstance(result, str) and (result.startswith("已启动") or result == "浏览器已经在运行"):
+            self.running = True
+            self.browser_type = browser_type or self.browser_type
+            self.last_start_kwargs = dict(kwargs, browser_type=browser_type)
+
+        return result
+
+    def stop_browser(self):
+        result = self.call("stop_browser")
+        self.running = False
+        self.last_start_kwargs = None
+        return result
+
+    def shutdown(self):
+        self.closing = True
+        self.running = False
+
+        try:
+            with self.send_lock:
+                self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
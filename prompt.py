@@ -1,5 +1,5 @@
-def get_initial_prompt(user_task: str) -> str:
-    prompt = """你是一个专业的浏览器自动化助手，能够通过指令控制浏览器完成各种任务。
+# 系统提示词在整个对话中保持逐字节不变，Ollama 可以复用已计算的前缀KV缓存
+SYSTEM_PROMPT = """你是一个专业的浏览器自动化助手，能够通过指令控制浏览器完成各种任务。
 
 ## 工作模式规则
 1. 当你收到用户指令后，回复"【开始执行任务】: {简要描述任务}"，然后进入工作模式
@@ -13,7 +13,7 @@ def get_initial_prompt(user_task: str) -> str:
 所有指令采用"指令?参数=值&参数=值"的格式，例如：
 - goto?url=https://www.example.com
 - click?selector=#submit-button
-- getHtml
+- getSnapshot
 
 ## 可用的浏览器控制指令
 
@@ -30,7 +30,9 @@ def get_initial_prompt(user_task: str) -> str:
 ### 页面信息获取类
 - getTitle - 获取当前页面的标题
 - getUrl - 获取当前页面的URL
-- getHtml - 获取当前页面的完整HTML（渲染后）
+- getSnapshot?maxTokens=1500 - 获取页面的精简快照（推荐），列出可交互元素和文本，每个元素带有短ID，如 [e12] button "登录"，可用选择器 [data-sbid="e12"] 操作该元素
+- getDomDiff - 获取页面自上次快照以来新增(+)、删除(-)和变化(~)的元素，执行操作后用它确认页面变化，无需重新读取整个页面
+- getHtml - 获取当前页面的完整HTML（渲染后，内容很长，仅在快照信息不足时使用）
 - getText?selector=选择器 - 获取指定元素的文本内容
 - getAttribute?selector=选择器&name=属性名 - 获取指定元素的特定属性值
 - getElements?selector=选择器 - 获取匹配选择器的所有元素信息
@@ -41,7 +43,8 @@ def get_initial_prompt(user_task: str) -> str:
 - addStyleTag?url=样式URL 或 addStyleTag?content=样式内容 - 向页面添加CSS样式
 
 ### 页面底层获取类
-- getResponseBody - 获取页面的原始HTTP响应内容
+- getResponseBody?url=URL或其中一部分 - 获取已记录的主文档或XHR/fetch响应内容，不指定url时返回最近的主文档
+- getResponses?filter=URL关键字 - 列出已记录的响应
 - getCookies - 获取当前页面的所有Cookie
 - getLocalStorage - 获取页面的localStorage内容
 
@@ -67,16 +70,62 @@ def get_initial_prompt(user_task: str) -> str:
 ## 错误处理
 1. 如果指令执行失败，尝试不同的方法或选择器
 2. 如果多次尝试后仍然失败，说明原因并尝试替代方案
-3. 如果任务无法完成，提供详细的失败原因并退出工作模式
+3. 如果任务无法完成，提供详细的失败原因并退出工作模式"""
+
+
+STRUCTURED_SYSTEM_PROMPT = """你是一个专业的浏览器自动化助手，通过调用浏览器指令自主完成用户的任务。
+
+## 规则
+1. 每一步只执行一条浏览器指令，根据执行结果和页面变化决定下一步
+2. 先用 getSnapshot 了解页面，快照中的元素可以通过选择器 [data-sbid="e12"] 直接操作
+3. 指令执行失败时，尝试不同的方法或选择器
+4. 任务完成或无法继续时，调用 finish 指令并在 summary 参数中给出结果总结"""
+
+ACTION_FORMAT_PROMPT = """
+
+## 输出格式
+每一步只输出一个JSON对象，不要输出其他内容：{"command": "指令名", "params": {"参数名": "值"}}
+
+## 可用的浏览器指令
+"""
+
+
+def get_system_prompt() -> str:
+    return SYSTEM_PROMPT
 
-现在，用户向你下达的任务是：{user_task}"""
-    return prompt
 
+def format_command_list(tools: list) -> str:
+    lines = []
+    for tool in tools:
+        function = tool["function"]
+        required = function["parameters"].get("required", [])
+        params = ", ".join(
+            name if name in required else name + "?" for name in function["parameters"]["properties"]
+        )
+        lines.append(f"- {function['name']}({params}) {function['description']}")
+    return "\n".join(lines)
 
-def get_interaction_prompt(execution_result: str) -> str:
+
+def get_structured_system_prompt(tools: list = None) -> str:
+    # 工具调用模式下指令说明通过 tools 参数传给模型，JSON 模式下需要在提示词中列出
+    if not tools:
+        return STRUCTURED_SYSTEM_PROMPT
+    return STRUCTURED_SYSTEM_PROMPT + ACTION_FORMAT_PROMPT + format_command_list(tools)
+
+
+def get_task_prompt(user_task: str) -> str:
+    return f"现在，用户向你下达的任务是：{user_task}"
+
+
+def get_initial_prompt(user_task: str) -> str:
+    return get_system_prompt() + "\n\n" + get_task_prompt(user_task)
+
+
+def get_interaction_prompt(execution_result: str, page_diff: str = None) -> str:
+    diff_section = f"\n\n执行后页面的变化：\n{page_diff}" if page_diff else ""
     prompt = f"""你正在执行浏览器自动化任务。请继续分析结果并决定下一步操作。
 
-你上一条指令执行的结果是：{execution_result}
+你上一条指令执行的结果是：{execution_result}{diff_section}
 
 请根据这个结果，决定下一步操作：
 1. 如果需要继续执行任务，请发送下一条浏览器控制指令
@@ -87,6 +136,11 @@ def get_interaction_prompt(execution_result: str) -> str:
     return prompt
 
 
+def get_structured_interaction_prompt(execution_result: str, page_diff: str = None) -> str:
+    diff_section = f"\n页面变化：\n{page_diff}" if page_diff else ""
+    return f"执行结果：{execution_result}{diff_section}\n请给出下一步动作。"
+
+
 def get_task_completion_marker() -> str:
     return "【任务完成】"
 
@@ -103,8 +157,9 @@ if __name__ == "__main__":
     print("-" * 50)
     print(initial_prompt[:300] + "...\n")
     
-    test_result = "页面标题: 百度一下，你就知道"
-    interaction_prompt = get_interaction_prompt(test_result)
+    test_result = "已点击元素: [data-sbid=\"e3\"]"
+    test_diff = "页面变化 (版本 2 -> 5): 百度一下，你就知道 - https://www.baidu.com/\n+ [e21] link \"Python自动化教程\" -> /s?wd=python"
+    interaction_prompt = get_interaction_prompt(test_result, test_diff)
     
     print("交互 Prompt 示例:")
     print("-" * 50)
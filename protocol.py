@@ -0,0 +1,393 @@
+import asyncio
+import socket
+import struct
+import json
+import threading
+import itertools
+import zlib
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Tuple, Iterator, List
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 帧格式: [头部长度:4字节][消息体长度:4字节][JSON头部][二进制消息体]
+# 头部长度小于16MB，因此帧的首字节恒为0x00，可与旧版纯文本指令区分
+FRAME_PREFIX = struct.Struct(">II")
+MAX_HEADER_SIZE = 16 * 1024 * 1024 - 1
+MAX_BODY_SIZE = 256 * 1024 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+KNOWN_ENCODINGS = ("identity", "zstd", "zlib")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def is_framed_prefix(first_byte: bytes) -> bool:
+    return first_byte[:1] == b"\x00"
+
+
+def encode_header(header: Dict[str, Any]) -> bytes:
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    if len(header_bytes) > MAX_HEADER_SIZE:
+        raise ProtocolError(f"帧头部过大: {len(header_bytes)} 字节")
+    return header_bytes
+
+
+def decode_header(header_bytes: bytes) -> Dict[str, Any]:
+    try:
+        header = json.loads(header_bytes.decode('utf-8')) if header_bytes else {}
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ProtocolError(f"帧头部不是有效的JSON: {str(e)}")
+
+    if not isinstance(header, dict):
+        raise ProtocolError("帧头部必须是JSON对象")
+
+    return header
+
+
+def unpack_prefix(prefix: bytes) -> Tuple[int, int]:
+    header_size, body_size = FRAME_PREFIX.unpack(prefix)
+    if header_size > MAX_HEADER_SIZE or body_size > MAX_BODY_SIZE:
+        raise ProtocolError(f"帧长度非法: 头部 {header_size} 字节, 消息体 {body_size} 字节")
+    return header_size, body_size
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], body: bytes = b"") -> None:
+    header_bytes = encode_header(header)
+    sock.sendall(FRAME_PREFIX.pack(len(header_bytes), len(body)) + header_bytes)
+    if body:
+        sock.sendall(body)
+
+
+def recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            if received == 0:
+                return None
+            raise ProtocolError(f"连接在帧中途关闭 (已接收 {received}/{size} 字节)")
+        received += n
+
+    return bytes(buffer)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    prefix = recv_exact(sock, FRAME_PREFIX.size)
+    if prefix is None:
+        return None
+
+    header_size, body_size = unpack_prefix(prefix)
+
+    header_bytes = recv_exact(sock, header_size) if header_size else b""
+    if header_bytes is None:
+        raise ProtocolError("连接在帧头部之前关闭")
+    body = recv_exact(sock, body_size) if body_size else b""
+    if body is None:
+        raise ProtocolError("连接在帧消息体之前关闭")
+
+    return decode_header(header_bytes), body
+
+
+def supported_encodings() -> List[str]:
+    encodings = ["identity", "zlib"]
+    if zstandard is not None:
+        encodings.insert(1, "zstd")
+    return encodings
+
+
+def negotiate_encoding(requested: Any) -> str:
+    # requested 为按优先级排列的编码列表或逗号分隔字符串，选择第一个本端支持的编码
+    if not requested:
+        return "identity"
+    if isinstance(requested, str):
+        requested = [item.strip() for item in requested.split(",")]
+
+    supported = supported_encodings()
+    for encoding in requested:
+        if encoding in supported:
+            return encoding
+    return "identity"
+
+
+def _parse_integer(name: str, value: Any, minimum: int) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"{name}必须是不小于{minimum}的整数: {value}")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}必须是不小于{minimum}的整数: {value}")
+    if number < minimum:
+        raise ValueError(f"{name}必须是不小于{minimum}的整数: {value}")
+    return number
+
+
+def parse_stream_options(encoding: Any = None, chunk_size: Any = None) -> Tuple[str, int]:
+    # 校验请求头中的 encoding 和 chunk_size，返回协商后的编码和分块大小
+    if encoding is not None and not isinstance(encoding, (str, list)):
+        raise ValueError("encoding必须是编码名称或编码列表")
+    names = [item.strip() for item in encoding.split(",")] if isinstance(encoding, str) else list(encoding or [])
+    unknown = [str(name) for name in names if name and name not in KNOWN_ENCODINGS]
+    if unknown:
+        raise ValueError(f"不支持的编码: {', '.join(unknown)}，可选: {', '.join(KNOWN_ENCODINGS)}")
+
+    chunk_size = STREAM_CHUNK_SIZE if chunk_size in (None, "") else _parse_integer("chunk_size", chunk_size, 1)
+    return negotiate_encoding(names), chunk_size
+
+
+def parse_stream_range(offset: Any = None, max_size: Any = None) -> Tuple[int, Optional[int]]:
+    # 校验指令参数中的 offset 和 max_size，max_size 未指定时读取到数据末尾
+    offset = 0 if offset in (None, "") else _parse_integer("offset", offset, 0)
+    max_size = None if max_size in (None, "") else _parse_integer("max_size", max_size, 0)
+    return offset, max_size
+
+
+def _make_compressor(encoding: str):
+    if encoding == "zlib":
+        return zlib.compressobj()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compressobj()
+    return None
+
+
+def _make_decompressor(encoding: str):
+    if encoding == "zlib":
+        return zlib.decompressobj()
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ProtocolError("收到zstd编码的数据，但未安装zstandard")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if encoding not in (None, "identity"):
+        raise ProtocolError(f"不支持的编码: {encoding}")
+    return None
+
+
+def iter_stream_frames(request_id: Any, result: Dict[str, Any], data: bytes, encoding: str = "identity",
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Tuple[Dict[str, Any], Any]]:
+    # 将 data 拆分为多个共享同一请求ID的帧，逐块压缩，避免构造完整的压缩副本
+    # 最后一帧 more=false 并携带 result
+    compressor = _make_compressor(encoding)
+    view = memoryview(data)
+    chunk_size = max(1, int(chunk_size))
+    index = 0
+    encoded_size = 0
+
+    for start in range(0, len(view), chunk_size):
+        piece = view[start:start + chunk_size]
+        body = compressor.compress(piece) if compressor else piece
+        if not len(body):
+            continue
+        encoded_size += len(body)
+        yield {"id": request_id, "chunk": index, "more": True, "encoding": encoding}, body
+        index += 1
+
+    tail = compressor.flush() if compressor else b""
+    encoded_size += len(tail)
+    final_result = dict(result, encoding=encoding, encoded_size=encoded_size, chunks=index + 1)
+    yield {"id": request_id, "chunk": index, "more": False, "encoding": encoding, "result": final_result}, tail
+
+
+class StreamAssembler:
+    """按请求ID重组分块响应，返回的 result 中 content 为解码后的完整数据"""
+
+    def __init__(self):
+        self.streams: Dict[Any, Tuple[Any, List[bytes]]] = {}
+
+    def feed(self, header: Dict[str, Any], body: bytes) -> Tuple[bool, Any]:
+        if "chunk" not in header:
+            # 流式响应发送中途出错时，服务器用普通响应帧返回错误，丢弃已收到的分块
+            self.discard(header.get("id"))
+            return True, header.get("result")
+
+        request_id = header.get("id")
+        if request_id not in self.streams:
+            self.streams[request_id] = (_make_decompressor(header.get("encoding")), [])
+        decompressor, parts = self.streams[request_id]
+
+        if body:
+            parts.append(decompressor.decompress(body) if decompressor else body)
+
+        if header.get("more"):
+            return False, None
+
+        del self.streams[request_id]
+        flush = getattr(decompressor, "flush", None)
+        if flush is not None:
+            parts.append(flush())
+
+        result = dict(header.get("result") or {})
+        result["content"] = b"".join(parts)
+        return True, result
+
+    def discard(self, request_id: Any):
+        self.streams.pop(request_id, None)
+
+
+def build_request(request_id: int, command: str, params: Dict[str, Any] = None, **options) -> Dict[str, Any]:
+    request = {"id": request_id, "command": command}
+    if params:
+        request["params"] = params
+    request.update(options)
+    return request
+
+
+def request(sock: socket.socket, command: str, params: Dict[str, Any] = None,
+            request_id: int = 1, **options) -> Any:
+    send_frame(sock, build_request(request_id, command, params, **options))
+    assembler = StreamAssembler()
+
+    while True:
+        frame = recv_frame(sock)
+        if frame is None:
+            raise ConnectionResetError("服务器关闭了连接")
+        header, body = frame
+        if header.get("id") == request_id:
+            done, result = assembler.feed(header, body)
+            if done:
+                return result
+
+
+class ExecutorClient:
+    def __init__(self, host='127.0.0.1', port=9876, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.socket = None
+        self.connected = False
+        self.send_lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.id_counter = itertools.count(1)
+        self.reader_thread = None
+        self.assembler = StreamAssembler()
+
+    def connect(self) -> bool:
+        if self.connected:
+            return True
+
+        self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.settimeout(None)
+        self.connected = True
+
+        self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self.reader_thread.start()
+        return True
+
+    def close(self):
+        self.connected = False
+        if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
+            self.socket = None
+        self._fail_pending(ConnectionResetError("客户端连接已关闭"))
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def submit(self, command: str, params: Dict[str, Any] = None, **options) -> Future:
+        if not self.connected:
+            self.connect()
+
+        request_id = next(self.id_counter)
+        future = Future()
+
+        with self.pending_lock:
+            self.pending[request_id] = future
+
+        try:
+            with self.send_lock:
+                send_frame(self.socket, build_request(request_id, command, params, **options))
+        except Exception as e:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+            future.set_exception(e)
+
+        return future
+
+    def send_command(self, command: str, params: Dict[str, Any] = None,
+                     timeout: float = None, **options) -> Any:
+        future = self.submit(command, params, **options)
+        return future.result(timeout=self.timeout if timeout is None else timeout)
+
+    def _reader_loop(self):
+        sock = self.socket
+
+        try:
+            while self.connected:
+                frame = recv_frame(sock)
+                if frame is None:
+                    break
+
+                header, body = frame
+                try:
+                    done, result = self.assembler.feed(header, body)
+                except Exception as e:
+                    self.assembler.discard(header.get("id"))
+                    done, result = True, e
+                if not done:
+                    continue
+
+                with self.pending_lock:
+                    future = self.pending.pop(header.get("id"), None)
+
+                if future is None or future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except (OSError, ProtocolError) as e:
+            self._fail_pending(e)
+        finally:
+            self.connected = False
+            self._fail_pending(ConnectionResetError("服务器关闭了连接"))
+
+    def _fail_pending(self, error: Exception):
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+
+async def read_frame_async(reader, prefix: bytes = b"") -> Optional[Tuple[Dict[str, Any], bytes]]:
+    try:
+        prefix += await reader.readexactly(FRAME_PREFIX.size - len(prefix))
+    except asyncio.IncompleteReadError as e:
+        if not prefix and not e.partial:
+            return None
+        raise ProtocolError("连接在帧前缀中途关闭")
+
+    header_size, body_size = unpack_prefix(prefix)
+
+    try:
+        header_bytes = await reader.readexactly(header_size)
+        body = await reader.readexactly(body_size)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("连接在帧中途关闭")
+
+    return decode_header(header_bytes), body
+
+
+def write_frame(writer, header: Dict[str, Any], body: bytes = b"") -> None:
+    header_bytes = encode_header(header)
+    writer.write(FRAME_PREFIX.pack(len(header_bytes), len(body)) + header_bytes)
+    if body:
+        writer.write(body)
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+from typing import Dict, List, Any, Optional, Callable
+
+from llm_cache import LLMCache, CACHE_PATH
+from prompt import get_task_completion_marker
+from protocol import ExecutorClient
+from talk import OllamaChat, BrowserAgent, OLLAMA_URL
+
+
+class SessionClient:
+    """把请求绑定到执行器的指定会话，多个助手可以共用同一个执行器连接"""
+
+    def __init__(self, client: ExecutorClient, session: str):
+        self.client = client
+        self.session = session
+
+    def submit(self, command: str, params: Dict[str, Any] = None, **options):
+        options.setdefault("session", self.session)
+        return self.client.submit(command, params, **options)
+
+    def send_command(self, command: str, params: Dict[str, Any] = None, timeout: float = None, **options):
+        options.setdefault("session", self.session)
+        return self.client.send_command(command, params, timeout=timeout, **options)
+
+
+class TaskScheduler:
+    """
+    从任务队列中取出任务，由多个助手并发执行：
+    - 每个助手在执行器上占用一个独立的会话，每个任务都使用新启动的浏览器
+    - 所有助手共享一个信号量，同时进行的模型请求数不超过 Ollama 的 OLLAMA_NUM_PARALLEL，
+      其余助手在等待模型时可以继续执行浏览器指令
+    """
+
+    def __init__(self, client: ExecutorClient, chat_factory: Callable[[threading.Semaphore], OllamaChat],
+                 agents: int = None, llm_parallel: int = None, browser_type: str = "chromium",
+                 headless: bool = True, agent_options: Dict[str, Any] = None):
+        self.client = client
+        self.chat_factory = chat_factory
+        self.agents = agents
+        self.llm_parallel = llm_parallel or int(os.environ.get("OLLAMA_NUM_PARALLEL", 4))
+        self.limiter = threading.BoundedSemaphore(self.llm_parallel)
+        self.browser_type = browser_type
+        self.headless = headless
+        self.agent_options = agent_options or {}
+        self.tasks: queue.Queue = queue.Queue()
+        self.results: List[Dict[str, Any]] = []
+        self.results_lock = threading.Lock()
+        self.commands: List[str] = []
+
+    def submit(self, task: str):
+        self.tasks.put(task)
+
+    def run(self, tasks: List[str] = None) -> List[Dict[str, Any]]:
+        for task in tasks or []:
+            self.submit(task)
+
+        result = self.client.send_command("listCommands")
+        self.commands = result.get("commands", []) if isinstance(result, dict) else []
+
+        # 未指定助手数量时，每个浏览器工作线程运行一个助手
+        agents = self.agents or self.client.send_command("getSessions").get("workers", 1)
+        agents = max(1, min(agents, self.tasks.qsize()))
+        print(f"使用 {agents} 个助手执行 {self.tasks.qsize()} 个任务，模型并发上限 {self.llm_parallel}", flush=True)
+
+        started = time.time()
+        threads = [
+            threading.Thread(target=self._agent_loop, args=(f"agent{i + 1}",), daemon=True)
+            for i in range(agents)
+        ]
+        for thread in threads:
+            self.tasks.put(None)
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.time() - started
+        completed = sum(1 for result in self.results if result["status"] == "completed")
+        print(f"共完成 {completed}/{len(self.results)} 个任务，耗时 {elapsed:.1f} 秒，"
+              f"约 {len(self.results) / elapsed * 3600:.0f} 个任务/小时", flush=True)
+        return self.results
+
+    def _agent_loop(self, name: str):
+        opened = self.client.send_command("openSession")
+        if opened.get("status") != "success":
+            # 没有可用会话的助手直接退出，剩余任务由其他助手处理
+            print(f"[{name}] 分配会话失败: {opened.get('message')}", flush=True)
+            return
+
+        session = opened["session"]
+        session_client = SessionClient(self.client, session)
+        chat = self.chat_factory(self.limiter)
+        agent = BrowserAgent(chat, session_client, name=name, stream_output=False, **self.agent_options)
+        agent.commands = self.commands
+        if agent.action_mode != "text":
+            agent.load_tools()
+
+        try:
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    break
+                self._run_task(agent, session_client, task)
+        finally:
+            chat.close()
+            self.client.send_command("closeSession", {"session": session})
+
+    def _run_task(self, agent: BrowserAgent, session_client: SessionClient, task: str):
+        started = time.time()
+        result = {"task": task, "agent": agent.name, "session": session_client.session}
+
+        try:
+            started_browser = session_client.send_command(
+                "startBrowser", {"browser_type": self.browser_type, "headless": self.headless}
+            )
+            if started_browser.get("status") == "error":
+                raise RuntimeError(started_browser.get("message"))
+            reply = agent.run_task(task)
+            result["status"] = "completed" if get_task_completion_marker() in reply else "unfinished"
+            result["reply"] = reply
+        except Exception as e:
+            result["status"] = "error"
+            result["message"] = str(e)
+        finally:
+            try:
+                session_client.send_command("stopBrowser")
+            except Exception:
+                pass
+
+        result["elapsed"] = round(time.time() - started, 2)
+        agent.log(f"任务结束 ({result['status']}, {result['elapsed']} 秒): {task}")
+
+        with self.results_lock:
+            self.results.append(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多任务浏览器自动化调度器')
+    parser.add_argument('--model', default='gemma3:1b', help='Ollama模型名称')
+    parser.add_argument('--tasks', help='任务文件，每行一个任务；不指定时从标准输入读取')
+    parser.add_argument('--host', default='127.0.0.1', help='执行器地址')
+    parser.add_argument('--port', type=int, default=9876, help='执行器端口')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help='Ollama服务地址')
+    parser.add_argument('--agents', type=int, default=None, help='并发助手数量，默认等于执行器的浏览器工作线程数')
+    parser.add_argument('--llm-parallel', type=int, default=None,
+                        help='同时进行的模型请求数，默认读取 OLLAMA_NUM_PARALLEL 环境变量')
+    parser.add_argument('--browser', choices=['chromium', 'firefox', 'webkit'], default='chromium', help='浏览器类型')
+    parser.add_argument('--headed', action='store_true', help='以有界面模式启动浏览器')
+    parser.add_argument('--max-steps', type=int, default=30, help='每个任务的最大步数')
+    parser.add_argument('--num-ctx', type=int, default=8192, help='模型上下文长度')
+    parser.add_argument('--action-mode', choices=['text', 'json', 'tools'], default='text', help='指令输出方式')
+    parser.add_argument('--no-cache', action='store_true', help='不使用模型回复缓存')
+    parser.add_argument('--cache-path', default=CACHE_PATH, help='模型回复缓存文件路径')
+
+    args = parser.parse_args()
+    source = open(args.tasks, encoding="utf-8") if args.tasks else sys.stdin
+    with source:
+        tasks = [line.strip() for line in source if line.strip()]
+
+    cache = None if args.no_cache else LLMCache(args.cache_path)
+    client = ExecutorClient(args.host, args.port, timeout=120)
+
+    def chat_factory(limiter):
+        return OllamaChat(args.model, base_url=args.ollama_url, num_ctx=args.num_ctx, limiter=limiter)
+
+    try:
+        client.connect()
+        scheduler = TaskScheduler(client, chat_factory, agents=args.agents, llm_parallel=args.llm_parallel,
+                                  browser_type=args.browser, headless=not args.headed,
+                                  agent_options={"max_steps": args.max_steps, "cache": cache,
+                                                 "action_mode": args.action_mode})
+        scheduler.run(tasks)
+    except KeyboardInterrupt:
+        print("\n已中断", flush=True)
+    finally:
+        client.close()
+        if cache is not None:
+            print(f"模型回复缓存: {cache.stats()}", flush=True)
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,9 @@
         };
         document.head.appendChild(script);
     } else {
+        // 通过 inject_jquery 注入的本地 jQuery 已在页面脚本之前加载，无需再访问CDN
         console.log('jQuery 已存在，版本: ' + jQuery.fn.jquery);
+        document.dispatchEvent(new CustomEvent('jQueryLoaded'));
     }
     window.isJQueryLoaded = function () {
         return typeof window.jQuery !== 'undefined';
@@ -0,0 +1,101 @@
+(function () {
+    // 版本号变化时覆盖页面中已安装的旧版本，Python 端按版本号判断是否需要补充安装
+    var VERSION = 2;
+    if (window.__sb && window.__sb.version >= VERSION) {
+        return;
+    }
+
+    function isVisible(el, rect) {
+        rect = rect || el.getBoundingClientRect();
+        var style = getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 &&
+            style.visibility !== 'hidden' && style.display !== 'none';
+    }
+
+    // 一次性提取所有匹配元素的信息，避免逐个元素往返调用
+    function elements(matched, options) {
+        var fields = options.fields;
+        var want = function (name) { return !fields || fields.indexOf(name) !== -1; };
+        var items = matched.slice(options.offset, options.offset + options.limit).map(function (el, i) {
+            var item = {index: options.offset + i};
+            if (want('tag')) item.tag = el.tagName.toLowerCase();
+            if (want('text')) item.text = (el.textContent || '').trim();
+            if (want('attributes')) {
+                item.attributes = {};
+                for (var j = 0; j < el.attributes.length; j++) {
+                    item.attributes[el.attributes[j].name] = el.attributes[j].value;
+                }
+            }
+            if (want('box') || want('visible')) {
+                var rect = el.getBoundingClientRect();
+                if (want('box')) item.box = {x: rect.x, y: rect.y, width: rect.width, height: rect.height};
+                if (want('visible')) item.visible = isVisible(el, rect);
+            }
+            return item;
+        });
+
+        return {total: matched.length, items: items};
+    }
+
+    function coerce(value, type) {
+        if (value === null || value === undefined) return null;
+        if (type === 'number' || type === 'int') {
+            var cleaned = String(value).replace(/[^0-9.\-]/g, '');
+            var number = type === 'int' ? parseInt(cleaned, 10) : parseFloat(cleaned);
+            return isNaN(number) ? null : number;
+        }
+        return value;
+    }
+
+    function readField(root, field) {
+        var targets = field.selector
+            ? (field.all ? Array.prototype.slice.call(root.querySelectorAll(field.selector)) : [root.querySelector(field.selector)])
+            : [root];
+
+        if (field.type === 'bool') return targets.length > 0 && targets[0] !== null;
+
+        var values = targets.filter(function (el) { return el; }).map(function (el) {
+            // 没有 container 时根节点是 document，它没有 getAttribute/innerHTML，改用 <html> 元素
+            if (el.nodeType === Node.DOCUMENT_NODE) el = el.documentElement;
+            var value;
+            if (field.attribute) value = el.getAttribute(field.attribute);
+            else if (field.type === 'html') value = el.innerHTML;
+            else value = (el.textContent || '').trim();
+            return coerce(value, field.type);
+        });
+
+        return field.all ? values : (values.length ? values[0] : null);
+    }
+
+    // 按模式在页面内一次性提取结构化记录
+    function extract(schema) {
+        var containers = schema.container
+            ? Array.prototype.slice.call(document.querySelectorAll(schema.container))
+            : [document];
+
+        return {
+            total: containers.length,
+            records: containers.slice(0, schema.limit).map(function (root) {
+                var record = {};
+                Object.keys(schema.fields).forEach(function (name) {
+                    record[name] = readField(root, schema.fields[name]);
+                });
+                return record;
+            })
+        };
+    }
+
+    function storageArea(area) {
+        return area === 'session' ? window.sessionStorage : window.localStorage;
+    }
+
+    window.__sb = {
+        version: VERSION,
+        isVisible: isVisible,
+        elements: elements,
+        extract: extract,
+        storageEntries: function (area) { return Object.entries(storageArea(area)); },
+        storageSet: function (area, key, value) { storageArea(area).setItem(key, value); },
+        storageClear: function (area) { storageArea(area).clear(); }
+    };
+})();
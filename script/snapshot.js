@@ -0,0 +1,153 @@
+(function () {
+    if (window.__sbSnapshot) {
+        return;
+    }
+
+    // 快照中的元素通过 data-sbid 属性获得稳定的短ID，可直接用作选择器: [data-sbid="e12"]
+    var ID_ATTR = 'data-sbid';
+    var INTERACTIVE = 'a[href],button,input,select,textarea,summary,[role=button],[role=link],[role=checkbox],' +
+        '[role=radio],[role=tab],[role=menuitem],[role=option],[onclick],[contenteditable=true]';
+    // 这些交互元素的文本作为自身标签，不再向下遍历
+    var LEAF_INTERACTIVE = 'a,button,select,textarea,[role=button],[role=link],[role=option]';
+    var SKIP_TAGS = {SCRIPT: 1, STYLE: 1, NOSCRIPT: 1, TEMPLATE: 1, SVG: 1, CANVAS: 1, IFRAME: 1, HEAD: 1};
+    var INLINE_TAGS = {B: 1, I: 1, EM: 1, STRONG: 1, SPAN: 1, SMALL: 1, CODE: 1, FONT: 1, SUP: 1, SUB: 1, MARK: 1, U: 1, ABBR: 1, TIME: 1};
+    var HEADING_TAGS = {H1: 1, H2: 1, H3: 1, H4: 1, H5: 1, H6: 1};
+
+    var state = {
+        doc: Math.random().toString(36).slice(2, 10),
+        version: 0,
+        nextId: 1
+    };
+
+    // DOM 每次变化都会递增版本号，快照在版本号不变时可直接复用缓存
+    var observer = new MutationObserver(function (mutations) {
+        for (var i = 0; i < mutations.length; i++) {
+            if (!(mutations[i].type === 'attributes' && mutations[i].attributeName === ID_ATTR)) {
+                state.version++;
+                return;
+            }
+        }
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+
+    // 表单输入只改变属性值而不产生 DOM 变化，单独监听
+    var bump = function () { state.version++; };
+    document.addEventListener('input', bump, true);
+    document.addEventListener('change', bump, true);
+
+    function clean(text, max) {
+        text = (text || '').replace(/\s+/g, ' ').trim();
+        return text.length > max ? text.slice(0, max) + '…' : text;
+    }
+
+    // 可见性判断使用 sb_helpers.js 提供的 window.__sb.isVisible，安装快照脚本前需先安装辅助函数库
+    var isVisible = window.__sb.isVisible;
+
+    function stableId(el) {
+        var id = el.getAttribute(ID_ATTR);
+        if (!id) {
+            id = 'e' + state.nextId++;
+            el.setAttribute(ID_ATTR, id);
+        }
+        return id;
+    }
+
+    function ownText(el) {
+        var text = '';
+        for (var i = 0; i < el.childNodes.length; i++) {
+            var child = el.childNodes[i];
+            if (child.nodeType === Node.TEXT_NODE) {
+                text += child.textContent + ' ';
+            } else if (child.nodeType === Node.ELEMENT_NODE && INLINE_TAGS[child.tagName] && !child.matches(INTERACTIVE)) {
+                text += ownText(child) + ' ';
+            }
+        }
+        return text;
+    }
+
+    function describe(el, max) {
+        var tag = el.tagName.toLowerCase();
+        var parts = [];
+
+        if (tag === 'a') {
+            parts.push('link');
+        } else if (tag === 'input') {
+            parts.push('input[' + (el.type || 'text') + ']');
+        } else {
+            parts.push(el.getAttribute('role') || tag);
+        }
+
+        if (tag === 'input' || tag === 'textarea' || tag === 'select') {
+            var name = el.getAttribute('name');
+            var placeholder = el.getAttribute('placeholder') || el.getAttribute('aria-label');
+            if (name) parts.push('name=' + name);
+            if (placeholder) parts.push('"' + clean(placeholder, max) + '"');
+
+            if (el.type === 'checkbox' || el.type === 'radio') {
+                parts.push(el.checked ? 'checked' : 'unchecked');
+            } else if (tag === 'select') {
+                var option = el.options[el.selectedIndex];
+                parts.push('value="' + clean(option ? option.text : '', max) + '"');
+            } else if (el.type !== 'password' && el.value) {
+                parts.push('value="' + clean(el.value, max) + '"');
+            }
+        } else {
+            var label = clean(el.getAttribute('aria-label') || el.innerText || el.getAttribute('title') || el.getAttribute('alt'), max);
+            if (label) parts.push('"' + label + '"');
+        }
+
+        if (tag === 'a') parts.push('-> ' + clean(el.getAttribute('href'), 80));
+        if (el.disabled) parts.push('disabled');
+
+        return parts.join(' ');
+    }
+
+    function walk(el, nodes, seen, max) {
+        if (SKIP_TAGS[el.tagName.toUpperCase()]) {
+            return;
+        }
+
+        if (el.matches(INTERACTIVE)) {
+            if (isVisible(el)) {
+                nodes.push({id: stableId(el), line: describe(el, max)});
+            }
+            if (el.matches(LEAF_INTERACTIVE)) {
+                return;
+            }
+        } else if (!INLINE_TAGS[el.tagName]) {
+            // 相同的文本只保留第一次出现
+            var text = clean(ownText(el), max);
+            if (text.length > 1 && !seen[text] && isVisible(el)) {
+                seen[text] = 1;
+                var kind = HEADING_TAGS[el.tagName] ? el.tagName.toLowerCase() : 'text';
+                nodes.push({id: stableId(el), line: kind + ': ' + text});
+            }
+        }
+
+        for (var i = 0; i < el.children.length; i++) {
+            walk(el.children[i], nodes, seen, max);
+        }
+    }
+
+    window.__sbSnapshot = {
+        take: function (options) {
+            options = options || {};
+            if (options.knownDoc === state.doc && options.knownVersion === state.version) {
+                return {doc: state.doc, version: state.version, unchanged: true};
+            }
+
+            var nodes = [];
+            if (document.body) {
+                walk(document.body, nodes, {}, options.maxTextLength || 80);
+            }
+
+            return {
+                doc: state.doc,
+                version: state.version,
+                title: document.title,
+                url: location.href,
+                nodes: nodes
+            };
+        }
+    };
+})();
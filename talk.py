@@ -0,0 +1,425 @@
+import argparse
+import json
+import re
+import sys
+import time
+import threading
+from contextlib import nullcontext
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from concurrent.futures import Future
+
+import requests
+
+from conversation import Conversation
+from llm_cache import LLMCache, CACHE_PATH
+from prompt import (get_system_prompt, get_structured_system_prompt, get_task_prompt, get_interaction_prompt,
+                    get_structured_interaction_prompt, get_task_completion_marker, get_task_start_marker)
+from protocol import ExecutorClient
+
+OLLAMA_URL = "http://localhost:11434"
+COMMAND_PATTERN = re.compile(r"\b([A-Za-z]+)(\?[^\s`'\"，。；]+)?")
+FINISH_COMMAND = "finish"
+FINISH_TOOL = {
+    "type": "function",
+    "function": {
+        "name": FINISH_COMMAND,
+        "description": "任务完成或无法继续时调用，给出结果总结",
+        "parameters": {"type": "object", "properties": {"summary": {"type": "string"}}, "required": ["summary"]}
+    }
+}
+
+
+class OllamaChat:
+    def __init__(self, model: str, base_url: str = OLLAMA_URL, keep_alive: str = "30m", timeout: float = 300,
+                 num_ctx: int = 8192, limiter: Optional[threading.Semaphore] = None):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        # 模型常驻内存且上下文长度固定时，Ollama 会复用与上一轮相同的提示词前缀的 KV 缓存
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        # 多个助手共用一个 Ollama 服务时，通过共享的信号量限制同时进行的请求数
+        self.limiter = limiter
+        self.timeout = timeout
+        # 复用同一个HTTP连接，避免每一步都重新建立连接
+        self.session = requests.Session()
+
+    def _payload(self, messages: List[Dict[str, str]], stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"num_ctx": self.num_ctx},
+        }
+
+    def chat(self, messages: List[Dict[str, str]], format: Any = None, tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # 结构化输出需要完整的JSON或工具调用，不使用流式接口
+        payload = self._payload(messages, stream=False)
+        if format is not None:
+            payload["format"] = format
+        if tools:
+            payload["tools"] = tools
+
+        with self.limiter or nullcontext():
+            response = self.session.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+
+        if data.get("error"):
+            raise RuntimeError(f"Ollama返回错误: {data['error']}")
+        return data.get("message", {})
+
+    def stream_chat(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        payload = self._payload(messages, stream=True)
+
+        with self.limiter or nullcontext(), \
+                self.session.post(f"{self.base_url}/api/chat", json=payload, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama返回错误: {chunk['error']}")
+
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    yield content
+
+                if chunk.get("done"):
+                    break
+
+    def close(self):
+        self.session.close()
+
+
+class CommandDetector:
+    """在流式输出中逐行检测浏览器指令，一行完整输出后立即返回其中的指令"""
+
+    def __init__(self, commands: List[str]):
+        self.commands = set(commands)
+        self.buffer = ""
+
+    def feed(self, text: str) -> Optional[str]:
+        self.buffer += text
+
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            command = self.match(line)
+            if command:
+                return command
+
+        return None
+
+    def finish(self) -> Optional[str]:
+        line, self.buffer = self.buffer, ""
+        return self.match(line)
+
+    def match(self, line: str) -> Optional[str]:
+        stripped = line.strip().strip("`*>-# ")
+
+        for m in COMMAND_PATTERN.finditer(line):
+            name, query = m.group(1), m.group(2)
+            if name not in self.commands:
+                continue
+
+            # 带参数的指令可以出现在句子中；不带参数的指令必须单独成行，避免把正文中的单词误判为指令
+            if query or stripped == name or stripped.endswith((":" + name, "：" + name, ": " + name)):
+                return name + (query or "")
+
+        return None
+
+
+class BrowserAgent:
+    def __init__(self, chat: OllamaChat, client: ExecutorClient, max_steps: int = 30,
+                 stop_after_command: bool = True, context_tokens: int = 6000, cache: Optional[LLMCache] = None,
+                 name: str = "", stream_output: bool = True, action_mode: str = "text"):
+        self.chat = chat
+        # text: 从模型的文本回复中识别指令；json: 模型按JSON模式输出动作；tools: 使用 Ollama 的工具调用
+        self.action_mode = action_mode
+        self.tools: List[Dict[str, Any]] = []
+        self.action_format: Optional[Dict[str, Any]] = None
+        # 多个助手同时运行时用 name 区分日志，并关闭逐字输出避免互相穿插
+        self.name = name
+        self.stream_output = stream_output
+        self.cache = cache
+        self.context_tokens = context_tokens
+        self.client = client
+        self.max_steps = max_steps
+        self.stop_after_command = stop_after_command
+        self.commands: List[str] = []
+
+    def log(self, message: str):
+        if self.name:
+            message = f"[{self.name}] {message.lstrip()}"
+        print(message, flush=True)
+
+    def echo(self, text: str):
+        if self.stream_output:
+            print(text, end="", flush=True)
+
+    def load_commands(self):
+        result = self.client.send_command("listCommands")
+        self.commands = result.get("commands", []) if isinstance(result, dict) else []
+        self.log(f"已加载 {len(self.commands)} 条浏览器指令")
+
+        if self.action_mode != "text":
+            self.load_tools()
+
+    def load_tools(self):
+        result = self.client.send_command("getCommandSchema")
+        self.tools = (result.get("tools", []) if isinstance(result, dict) else []) + [FINISH_TOOL]
+        self.action_format = {
+            "type": "object",
+            "properties": {
+                "command": {"type": "string", "enum": [tool["function"]["name"] for tool in self.tools]},
+                "params": {"type": "object"},
+            },
+            "required": ["command", "params"],
+        }
+
+    def system_prompt(self) -> str:
+        if self.action_mode == "text":
+            return get_system_prompt()
+        return get_structured_system_prompt(self.tools if self.action_mode == "json" else None)
+
+    def interaction_prompt(self, result: str, page_diff: Optional[str]) -> str:
+        if self.action_mode == "text":
+            return get_interaction_prompt(result, page_diff)
+        return get_structured_interaction_prompt(result, page_diff)
+
+    def run_task(self, task: str) -> str:
+        conversation = Conversation(self.system_prompt(), max_tokens=self.context_tokens)
+        conversation.add_user(get_task_prompt(task))
+        reply = ""
+
+        for step in range(1, self.max_steps + 1):
+            self.log(f"\n===== 第 {step} 步 =====")
+            reply, command, future = self.cached_step(conversation.messages())
+            conversation.add_assistant(reply)
+
+            if command is None:
+                summary = self.completion(reply)
+                if summary is not None:
+                    self.log("\n任务已完成")
+                    return summary
+
+                if self.action_mode == "text":
+                    conversation.add_user(
+                        f"没有检测到浏览器指令。请发送一条浏览器控制指令，或回复\"{get_task_completion_marker()}: {{结果总结}}\""
+                    )
+                else:
+                    conversation.add_user(f"没有有效的指令。请调用一条可用的浏览器指令，或调用 {FINISH_COMMAND} 结束任务")
+                continue
+
+            result = self.format_result(future.result())
+            self.log(f"\n[执行结果] {result[:500]}")
+            conversation.add_user(self.interaction_prompt(result, self.page_diff(command)), summary_source=result)
+
+            if conversation.compactions:
+                self.log(f"[上下文] 约 {conversation.token_count()} tokens，已压缩 {conversation.compactions} 次")
+
+        self.log(f"\n已达到最大步数 {self.max_steps}，停止执行")
+        return reply
+
+    def cached_step(self, messages: List[Dict[str, str]]) -> Tuple[str, Optional[str], Optional[Future]]:
+        if self.cache is None:
+            return self.decide(messages)
+
+        # 相同的提示词在不同页面状态下可能需要不同的决策，页面状态哈希也是缓存键的一部分
+        key = self.cache.make_key(self.chat.model, messages, self.page_state())
+        reply = self.cache.get(key)
+
+        if reply is None:
+            reply, command, future = self.decide(messages)
+            self.cache.put(key, self.chat.model, reply)
+            return reply, command, future
+
+        self.echo(reply)
+        self.log(f"\n[使用缓存的回复] 命中率 {self.cache.hit_rate():.0%}")
+
+        command, future = self.dispatch(reply)
+        return reply, command, future
+
+    def decide(self, messages: List[Dict[str, str]]) -> Tuple[str, Optional[str], Optional[Future]]:
+        if self.action_mode == "text":
+            return self.stream_step(messages)
+        return self.structured_step(messages)
+
+    def structured_step(self, messages: List[Dict[str, str]]) -> Tuple[str, Optional[str], Optional[Future]]:
+        started = time.time()
+
+        if self.action_mode == "tools":
+            message = self.chat.chat(messages, tools=self.tools)
+            calls = message.get("tool_calls") or []
+            if calls:
+                function = calls[0]["function"]
+                action = {"command": function["name"], "params": function.get("arguments") or {}}
+            else:
+                action = self.parse_action(message.get("content", ""))
+        else:
+            message = self.chat.chat(messages, format=self.action_format)
+            action = self.parse_action(message.get("content", ""))
+
+        # 动作统一保存为紧凑的JSON，作为对话历史和缓存的内容
+        reply = json.dumps(action, ensure_ascii=False, separators=(",", ":")) if action else message.get("content", "")
+
+        command, future = self.dispatch(reply)
+        if command:
+            self.log(f"[{time.time() - started:.2f}秒后发送指令] {reply}")
+        else:
+            self.log(f"[模型回复] {reply}")
+        return reply, command, future
+
+    def dispatch(self, reply: str) -> Tuple[Optional[str], Optional[Future]]:
+        if self.action_mode == "text":
+            detector = CommandDetector(self.commands)
+            command = detector.feed(reply) or detector.finish()
+            return command, self.client.submit(command) if command else None
+
+        action = self.parse_action(reply)
+        if action is None or action["command"] not in self.commands:
+            return None, None
+
+        params = {key: value for key, value in (action.get("params") or {}).items() if value is not None}
+        return action["command"], self.client.submit(action["command"], params)
+
+    def completion(self, reply: str) -> Optional[str]:
+        if get_task_completion_marker() in reply:
+            return reply
+
+        action = self.parse_action(reply) if self.action_mode != "text" else None
+        if action and action["command"] == FINISH_COMMAND:
+            return f"{get_task_completion_marker()}: {(action.get('params') or {}).get('summary', '')}"
+        return None
+
+    @staticmethod
+    def parse_action(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            action = json.loads(text)
+        except ValueError:
+            return None
+
+        if not isinstance(action, dict) or not isinstance(action.get("command"), str):
+            return None
+        if not isinstance(action.get("params"), dict):
+            action["params"] = {}
+        return action
+
+    def stream_step(self, messages: List[Dict[str, str]]) -> Tuple[str, Optional[str], Optional[Future]]:
+        detector = CommandDetector(self.commands)
+        parts = []
+        command = None
+        future = None
+        started = time.time()
+
+        for token in self.chat.stream_chat(messages):
+            parts.append(token)
+            self.echo(token)
+
+            if command is None:
+                command = detector.feed(token)
+                if command:
+                    # 指令行一旦完整就立即发送给执行器，不等待模型输出结束
+                    future = self.client.submit(command)
+                    self.log(f"\n[{time.time() - started:.2f}秒后发送指令] {command}")
+                    if self.stop_after_command:
+                        break
+
+        if command is None:
+            command = detector.finish()
+            if command:
+                future = self.client.submit(command)
+                self.log(f"\n[{time.time() - started:.2f}秒后发送指令] {command}")
+
+        reply = "".join(parts)
+        if get_task_start_marker() in reply:
+            self.log("\n[已进入工作模式]")
+
+        return reply, command, future
+
+    def page_diff(self, command: str) -> Optional[str]:
+        # 读取类指令不会改变页面，无需获取页面变化
+        if command.startswith("get") or "getDomDiff" not in self.commands:
+            return None
+
+        try:
+            return self.format_result(self.client.send_command("getDomDiff"))
+        except Exception as e:
+            self.log(f"获取页面变化失败: {str(e)}")
+            return None
+
+    def page_state(self) -> str:
+        if "getPageHash" not in self.commands:
+            return ""
+
+        try:
+            result = self.client.send_command("getPageHash")
+        except Exception as e:
+            self.log(f"获取页面状态失败: {str(e)}")
+            return ""
+
+        # 执行器把字符串结果包装为 {"status", "message"}
+        if isinstance(result, dict) and result.get("status") == "success":
+            return str(result.get("message", ""))
+        return ""
+
+    @staticmethod
+    def format_result(result: Any) -> str:
+        if isinstance(result, dict) and set(result) <= {"status", "message"}:
+            return str(result.get("message", ""))
+        return json.dumps(result, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浏览器自动化助手')
+    parser.add_argument('--model', default='gemma3:1b', help='Ollama模型名称')
+    parser.add_argument('--task', help='要执行的任务，不指定时从标准输入逐行读取任务')
+    parser.add_argument('--host', default='127.0.0.1', help='执行器地址')
+    parser.add_argument('--port', type=int, default=9876, help='执行器端口')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help='Ollama服务地址')
+    parser.add_argument('--max-steps', type=int, default=30, help='每个任务的最大步数')
+    parser.add_argument('--full-reply', action='store_true',
+                        help='检测到指令后继续接收模型的完整回复（默认检测到指令后立即停止生成）')
+    parser.add_argument('--num-ctx', type=int, default=8192, help='模型上下文长度，保持不变才能复用KV缓存')
+    parser.add_argument('--context-tokens', type=int, default=6000,
+                        help='对话历史的token预算，超出后压缩较早的执行结果')
+    parser.add_argument('--action-mode', choices=['text', 'json', 'tools'], default='text',
+                        help='指令输出方式: text(从文本中识别指令)、json(JSON模式输出动作) 或 tools(Ollama工具调用)')
+    parser.add_argument('--no-cache', action='store_true', help='不使用模型回复缓存')
+    parser.add_argument('--cache-path', default=CACHE_PATH, help='模型回复缓存文件路径')
+    parser.add_argument('--cache-ttl', type=float, default=7 * 24 * 3600, help='缓存的有效期（秒）')
+
+    args = parser.parse_args()
+    chat = OllamaChat(args.model, base_url=args.ollama_url, num_ctx=args.num_ctx)
+    client = ExecutorClient(args.host, args.port, timeout=120)
+    cache = None if args.no_cache else LLMCache(args.cache_path, ttl=args.cache_ttl)
+
+    try:
+        client.connect()
+        agent = BrowserAgent(chat, client, max_steps=args.max_steps, stop_after_command=not args.full_reply,
+                             context_tokens=args.context_tokens, cache=cache, action_mode=args.action_mode)
+        agent.load_commands()
+
+        if args.task:
+            agent.run_task(args.task)
+            return
+
+        for line in sys.stdin:
+            task = line.strip()
+            if task:
+                agent.run_task(task)
+    except KeyboardInterrupt:
+        print("\n已中断", flush=True)
+    finally:
+        client.close()
+        chat.close()
+        if cache is not None:
+            print(f"模型回复缓存: {cache.stats()}", flush=True)
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
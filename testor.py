@@ -57,6 +57,60 @@ def test_browser_start(browser_type="chromium", headless=False, debug=False):
             print("\n详细错误信息:")
             traceback.print_exc()
 
+def _summarize_latencies(name, samples):
+    samples = sorted(samples)
+    count = len(samples)
+    mean = sum(samples) / count
+    p50 = samples[count // 2]
+    p95 = samples[min(count - 1, int(count * 0.95))]
+    print(f"{name:<12} 次数: {count:<6} 平均: {mean:8.3f} ms  p50: {p50:8.3f} ms  "
+          f"p95: {p95:8.3f} ms  最大: {samples[-1]:8.3f} ms")
+
+def benchmark_latency(browser_type="chromium", headless=True, iterations=200):
+    print(f"=== 指令调度延迟基准测试 ===")
+    print(f"浏览器类型: {browser_type}, 无头模式: {headless}, 迭代次数: {iterations}")
+    
+    browser_controller = BrowserController()
+    
+    start = time.perf_counter()
+    result = browser_controller.start_browser(browser_type=browser_type, headless=headless)
+    print(f"启动浏览器: {(time.perf_counter() - start) * 1000:.1f} ms ({result})")
+    
+    if not browser_controller.running:
+        print("浏览器未成功启动，终止基准测试")
+        return
+    
+    try:
+        # 空操作只测量调用方线程与浏览器线程之间的往返开销
+        noop_samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            browser_controller.execute_command(lambda: None)
+            noop_samples.append((time.perf_counter() - start) * 1000)
+        
+        url_samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            browser_controller.get_url()
+            url_samples.append((time.perf_counter() - start) * 1000)
+        
+        # 空闲后的首条指令，体现从空闲到繁忙的唤醒延迟
+        idle_samples = []
+        for _ in range(min(iterations, 20)):
+            time.sleep(0.25)
+            start = time.perf_counter()
+            browser_controller.execute_command(lambda: None)
+            idle_samples.append((time.perf_counter() - start) * 1000)
+        
+        print()
+        _summarize_latencies("空操作", noop_samples)
+        _summarize_latencies("getUrl", url_samples)
+        _summarize_latencies("空闲后唤醒", idle_samples)
+    finally:
+        start = time.perf_counter()
+        result = browser_controller.stop_browser()
+        print(f"\n停止浏览器: {(time.perf_counter() - start) * 1000:.1f} ms ({result})")
+
 def main():
     parser = argparse.ArgumentParser(description="浏览器启动测试工具")
     parser.add_argument("--browser", choices=["chromium", "firefox", "webkit"], 
@@ -64,6 +118,8 @@ def main():
     parser.add_argument("--headless", type=str, default="false", 
                         help="无头模式 (true/false)")
     parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    parser.add_argument("--bench", type=int, default=0, metavar="N",
+                        help="运行指令调度延迟基准测试，N为每项的迭代次数")
     
     args = parser.parse_args()
     
@@ -72,7 +128,10 @@ def main():
     else:
         headless = False
     
-    test_browser_start(args.browser, headless, args.debug)
+    if args.bench > 0:
+        benchmark_latency(args.browser, headless, args.bench)
+    else:
+        test_browser_start(args.browser, headless, args.debug)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -8,7 +8,9 @@ import threading
 import argparse
 import subprocess
 import select
+import itertools
 from typing import Dict, Any, Optional, Union, Tuple
+from protocol import request as executor_request
 
 log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
 os.makedirs(log_dir, exist_ok=True)
@@ -34,6 +36,7 @@ class ExecutorTester:
         self.connected = False
         self.server_process = None
         self.socket = None
+        self.request_ids = itertools.count(1)
         
         if auto_start_server:
             self.start_server()
@@ -165,29 +168,23 @@ class ExecutorTester:
                     return None
             
             try:
-                command_str = command
+                request_params = {}
                 
                 if params:
-                    query_parts = []
                     for key, value in params.items():
                         if isinstance(value, bool):
                             value = "true" if value else "false"
-                        query_parts.append(f"{key}={value}")
-                    
-                    command_str += "?" + "&".join(query_parts)
+                        request_params[key] = value
                 
-                logger.info(f"发送命令: {command_str}")
-                self.socket.sendall(command_str.encode('utf-8'))
+                logger.info(f"发送命令: {command}, 参数: {request_params}")
+                response = executor_request(self.socket, command, request_params,
+                                            request_id=next(self.request_ids))
+                logger.info(f"收到响应: {response}")
                 
-                response_data = self.socket.recv(4096).decode('utf-8')
-                logger.info(f"收到响应: {response_data}")
+                if not isinstance(response, dict):
+                    return {"status": "error", "message": f"无效的响应: {response}"}
                 
-                try:
-                    response = json.loads(response_data)
-                    return response
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析响应JSON时出错: {str(e)}")
-                    return {"status": "error", "message": f"无效的JSON响应: {response_data}"}
+                return response
                 
             except (ConnectionError, socket.timeout, socket.error) as e:
                 logger.warning(f"连接错误: {str(e)}，尝试重新连接...")
@@ -224,7 +221,7 @@ class ExecutorTester:
             logger.error(f"status命令返回异常: {response}")
             return False
     
-    def test_start_browser(self, browser_type="chromium", headless=False) -> bool:
+    def test_start_browser(self, browser_type="chromium", headless=False, start_options=None) -> bool:
         logger.info(f"测试启动浏览器: {browser_type}, headless={headless}...")
         
         params = {
@@ -233,6 +230,7 @@ class ExecutorTester:
             "ignore_https_errors": True,
             "java_script_enabled": True
         }
+        params.update(start_options or {})
         
         response = self.send_command("startBrowser", params)
         
@@ -293,25 +291,31 @@ class ExecutorTester:
             logger.error(f"停止浏览器失败: {response}")
             return False
     
-    def run_all_tests(self) -> bool:
+    def run_all_tests(self, browser_type="chromium", headless=False, url="https://www.baidu.com",
+                      start_options=None, wait=True) -> bool:
         logger.info("开始运行所有测试...")
+        started = time.time()
         
         if not self.test_status():
             logger.error("状态测试失败，终止测试")
             return False
         
-        if not self.test_start_browser():
+        if not self.test_start_browser(browser_type, headless, start_options):
             logger.error("启动浏览器测试失败，终止测试")
             return False
         
-        logger.info("等待浏览器完全启动...")
-        time.sleep(3)
+        if wait:
+            logger.info("等待浏览器完全启动...")
+            time.sleep(3)
         
-        if not self.test_goto():
+        goto_started = time.time()
+        if not self.test_goto(url):
             logger.warning("导航测试失败，继续测试")
+        logger.info(f"导航耗时: {(time.time() - goto_started) * 1000:.0f} 毫秒")
         
-        logger.info("等待页面加载...")
-        time.sleep(2)
+        if wait:
+            logger.info("等待页面加载...")
+            time.sleep(2)
         
         title = self.test_get_title()
         if title is None:
@@ -321,7 +325,7 @@ class ExecutorTester:
             logger.error("停止浏览器测试失败")
             return False
         
-        logger.info("所有测试完成")
+        logger.info(f"所有测试完成，总耗时: {time.time() - started:.2f} 秒")
         return True
 
 
@@ -336,9 +340,21 @@ def main():
                         default='all', help='要运行的测试')
     parser.add_argument('--no-auto-start', action='store_true', help='不自动启动executor.py服务器')
     parser.add_argument('--check-executor', action='store_true', help='仅检查executor.py是否可以运行')
+    parser.add_argument('--record-har', help='将测试期间的所有网络请求录制到指定的HAR文件（停止浏览器时保存）')
+    parser.add_argument('--replay-har', help='从指定的HAR文件回放网络请求，测试过程不访问网络')
+    parser.add_argument('--har-not-found', choices=['abort', 'fallback'], default='abort',
+                        help='回放时HAR中没有的请求: abort(中止) 或 fallback(访问网络)')
+    parser.add_argument('--no-wait', action='store_true', help='跳过测试步骤之间的固定等待，用于测量耗时')
     
     args = parser.parse_args()
     
+    start_options = {}
+    if args.record_har:
+        start_options["record_har"] = os.path.abspath(args.record_har)
+    if args.replay_har:
+        start_options["replay_har"] = os.path.abspath(args.replay_har)
+        start_options["har_not_found"] = args.har_not_found
+    
     if args.check_executor:
         executor_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "executor.py")
         python_exe = sys.executable
@@ -376,11 +392,11 @@ def main():
     
     try:
         if args.test == 'all':
-            success = tester.run_all_tests()
+            success = tester.run_all_tests(args.browser, args.headless, args.url, start_options, wait=not args.no_wait)
         elif args.test == 'status':
             success = tester.test_status()
         elif args.test == 'start':
-            success = tester.test_start_browser(args.browser, args.headless)
+            success = tester.test_start_browser(args.browser, args.headless, start_options)
         elif args.test == 'goto':
             success = tester.test_goto(args.url)
         elif args.test == 'title':
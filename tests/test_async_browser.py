@@ -0,0 +1,73 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("playwright")
+
+from async_browser import AsyncBrowserController
+
+
+class FakeResource:
+    def __init__(self, fail=False):
+        self.closed = False
+        self.fail = fail
+
+    async def close(self):
+        self.closed = True
+        if self.fail:
+            raise RuntimeError("Target closed")
+
+    async def stop(self):
+        self.closed = True
+
+
+def test_disconnect_closes_context_and_stops_playwright():
+    async def run():
+        controller = AsyncBrowserController()
+        browser, context, driver = FakeResource(fail=True), FakeResource(fail=True), FakeResource()
+        controller.browser, controller.context, controller.playwright = browser, context, driver
+        controller.running = True
+
+        controller._on_browser_disconnected(browser)
+        await controller._closing
+
+        assert not controller.running
+        assert context.closed and browser.closed and driver.closed
+        assert controller.playwright is None
+
+    asyncio.run(run())
+
+
+def test_recycle_waits_for_commands_in_flight():
+    async def run():
+        controller = AsyncBrowserController()
+        controller.running = True
+        events = []
+        release = asyncio.Event()
+
+        async def slow_command():
+            async with controller._using_context():
+                events.append("command started")
+                await release.wait()
+                events.append("command finished")
+
+        async def fake_recycle(**kwargs):
+            events.append("recycled")
+            return "已回收浏览器上下文"
+
+        controller._recycle_context = fake_recycle
+        command = asyncio.create_task(slow_command())
+        await asyncio.sleep(0)
+        recycle = asyncio.create_task(controller.recycle_context())
+        await asyncio.sleep(0.01)
+
+        assert events == ["command started"]
+        release.set()
+        await asyncio.gather(command, recycle)
+        assert events == ["command started", "command finished", "recycled"]
+
+    asyncio.run(run())
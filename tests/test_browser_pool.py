@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_pool import BrowserPool, PoolExhaustedError, UnknownSessionError, DEFAULT_SESSION
+
+
+class FakeController:
+    def __init__(self, running=False):
+        self.running = running
+
+
+def make_pool(size=2):
+    return BrowserPool(size, FakeController)
+
+
+def test_default_session_is_acquired_on_first_use():
+    pool = make_pool()
+
+    controller = pool.get()
+
+    assert pool.get(DEFAULT_SESSION) is controller
+    assert DEFAULT_SESSION in pool.sessions
+
+
+def test_unknown_session_is_rejected_without_taking_a_worker():
+    pool = make_pool()
+
+    with pytest.raises(UnknownSessionError):
+        pool.get("typo")
+
+    assert pool.sessions == {}
+    assert len(pool._idle_indexes()) == 2
+
+
+def test_opened_session_routes_to_its_own_worker():
+    pool = make_pool()
+    session_id, controller = pool.acquire()
+
+    assert pool.get(session_id) is controller
+    assert pool.get() is not controller
+
+
+def test_released_session_is_unknown_again():
+    pool = make_pool()
+    session_id, _ = pool.acquire("crawler")
+    pool.release(session_id)
+
+    with pytest.raises(UnknownSessionError):
+        pool.get(session_id)
+
+
+def test_acquire_prefers_running_workers_and_reports_exhaustion():
+    pool = BrowserPool(2, FakeController)
+    pool.workers[1].running = True
+
+    _, first = pool.acquire()
+    assert first is pool.workers[1]
+
+    pool.acquire()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import Conversation, estimate_tokens
+
+
+SYSTEM_PROMPT = "你是浏览器自动化助手。" * 20
+TASK = "打开首页并搜索 Python 自动化"
+
+
+def fill(conversation, rounds):
+    for i in range(rounds):
+        conversation.add_assistant(f"第 {i} 步: goto?url=https://example.com/{i}")
+        result = f"执行结果 {i}: " + "页面内容 " * 40
+        conversation.add_user(result, summary_source=result)
+
+
+def encoded(messages):
+    return [json.dumps(message, ensure_ascii=False).encode("utf-8") for message in messages]
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("中文") == 2
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("中文abcdefgh") == 4
+
+
+def test_compact_keeps_prefix_and_reaches_ratio():
+    conversation = Conversation(SYSTEM_PROMPT, max_tokens=1500, keep_recent=4, compact_ratio=0.6)
+    conversation.add_user(TASK)
+    prefix = encoded(conversation.messages())
+
+    fill(conversation, 20)
+    assert conversation.token_count() > conversation.max_tokens
+
+    messages = conversation.messages()
+
+    assert conversation.compactions == 1
+    assert encoded(messages[:2]) == prefix
+    assert conversation.token_count() <= int(conversation.max_tokens * conversation.compact_ratio)
+    # 最近的 keep_recent 条消息保持原样
+    assert messages[-1]["content"].startswith("执行结果 19")
+    assert "[较早的执行结果]" not in messages[-1]["content"]
+
+
+def test_compact_drops_rounds_when_summaries_are_not_enough():
+    conversation = Conversation(SYSTEM_PROMPT, max_tokens=1307, keep_recent=4, compact_ratio=0.6,
+                                summary_chars=200)
+    conversation.add_user(TASK)
+    fill(conversation, 30)
+
+    messages = conversation.messages()
+
+    assert messages[1]["content"] == TASK
+    assert conversation.dropped_messages > 0
+    assert any("已省略较早的" in message["content"] for message in messages)
+    assert conversation.token_count() <= int(conversation.max_tokens * conversation.compact_ratio)
+
+
+def test_history_is_append_only_between_compactions():
+    conversation = Conversation(SYSTEM_PROMPT, max_tokens=1500, keep_recent=4, compact_ratio=0.6)
+    conversation.add_user(TASK)
+    fill(conversation, 20)
+    compacted = encoded(conversation.messages())
+
+    conversation.add_assistant("getTitle")
+    conversation.add_user("执行结果: 首页", summary_source="首页")
+    following = encoded(conversation.messages())
+
+    # 压缩后留有余量，下一轮只在末尾追加，之前的消息逐字节不变，可以复用 KV 缓存
+    assert conversation.compactions == 1
+    assert following[:len(compacted)] == compacted
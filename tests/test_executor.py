@@ -0,0 +1,152 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import CommandExecutor
+from protocol import send_frame, recv_frame
+
+
+def serve_client(executor):
+    # 用 socketpair 代替真实的监听端口，直接交给 handle_client 处理
+    client, server = socket.socketpair()
+    executor.running = True
+    executor.active_connections += 1
+    thread = threading.Thread(target=executor.handle_client, args=(server, "test"), daemon=True)
+    thread.start()
+    return client, thread
+
+
+def test_plain_text_command_uses_legacy_protocol():
+    executor = CommandExecutor()
+    client, thread = serve_client(executor)
+
+    with client:
+        client.sendall(b"status")
+        response = json.loads(client.recv(65536).decode("utf-8"))
+
+    thread.join(timeout=5)
+    assert response["status"] == "success"
+    assert response["server"] == "running"
+
+
+def test_framed_request_on_same_server():
+    executor = CommandExecutor()
+    client, thread = serve_client(executor)
+
+    with client:
+        send_frame(client, {"id": 3, "command": "status"})
+        header, body = recv_frame(client)
+
+    thread.join(timeout=5)
+    assert header["id"] == 3
+    assert header["result"]["status"] == "success"
+    assert body == b""
+
+
+class SlowController:
+    """启动需要一段时间的控制器，记录实际启动的次数"""
+
+    def __init__(self):
+        self.running = False
+        self.browser_type = "chromium"
+        self.starts = 0
+
+    def start_browser(self, browser_type=None, **kwargs):
+        self.starts += 1
+        time.sleep(0.05)
+        self.running = True
+        return "已启动"
+
+    def recycle_context(self, **kwargs):
+        return "已回收浏览器上下文"
+
+    def stop_browser(self):
+        self.running = False
+        return "浏览器已停止"
+
+
+class FakeExecutor(CommandExecutor):
+    def _create_controller(self):
+        return SlowController()
+
+
+def test_concurrent_start_browser_starts_once():
+    executor = FakeExecutor()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def start():
+        barrier.wait()
+        results.append(executor.start_browser(headless=True)["status"])
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert executor.browser_controller.starts == 1
+    assert sorted(results) == ["success"] + ["warning"] * 7
+    assert executor.stop_browser()["status"] == "success"
+    assert executor.stop_browser()["status"] == "warning"
+
+
+class BatchController(SlowController):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def goto(self, url, waitUntil="load", page_id=None):
+        self.calls.append(("goto", url))
+        return f"已导航到: {url}"
+
+    def wait_for_selector(self, selector, timeout=30000, state="visible", page_id=None):
+        self.calls.append(("wait_for_selector", selector, state))
+        return f"元素 {selector} 已可见"
+
+    def press(self, selector, key, page_id=None):
+        self.calls.append(("press", selector, key))
+        return f"已在元素 {selector} 上按下 {key} 键"
+
+    def run_batch(self, steps, stop_on_error=True):
+        return [{"command": step["command"], "status": "success",
+                 "result": getattr(self, step["method"])(**step["params"]), "elapsed_ms": 0}
+                for step in steps]
+
+
+class BatchExecutor(CommandExecutor):
+    def _create_controller(self):
+        return BatchController()
+
+
+def test_batch_runs_wait_and_keyboard_steps():
+    executor = BatchExecutor()
+    steps = ["goto?url=https://example.com",
+             {"command": "waitForSelector", "params": {"selector": "#result", "state": "attached"}},
+             "press?selector=%23q&key=Enter"]
+
+    response = executor.run_command("batch", {"steps": steps})
+
+    assert response["status"] == "success", response
+    assert executor.browser_controller.calls == [
+        ("goto", "https://example.com"),
+        ("wait_for_selector", "#result", "attached"),
+        ("press", "#q", "Enter"),
+    ]
+    assert {"waitForSelector", "press"} <= set(executor.list_commands()["commands"])
+
+
+def test_stream_request_rejects_invalid_range():
+    executor = CommandExecutor()
+
+    result, data, frame_options = executor.run_stream_command("getHtml", {"offset": "-1"})
+    assert result["status"] == "error" and "offset" in result["message"]
+    assert data == b""
+
+    result, _, _ = executor.run_stream_command("getHtml", {"max_size": "abc"}, {"encoding": "zlib"})
+    assert result["status"] == "error" and "max_size" in result["message"]
@@ -0,0 +1,106 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_cache import HttpCache
+
+URL = "https://example.com/app.js"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache"))
+    yield cache
+    cache.close()
+
+
+def route(cache, responses, method="GET", url=URL, request_headers=None):
+    """按控制器的方式驱动 route_steps，responses 依次作为每次 fetch 的结果；返回最终动作和各次 fetch 的请求头"""
+    steps = cache.route_steps(method, url, request_headers or {})
+    fetches = []
+    action, argument = next(steps)
+    while action == "fetch":
+        fetches.append(argument)
+        action, argument = steps.send(responses.pop(0))
+    return action, argument, fetches
+
+
+def test_fresh_response_served_from_cache(cache):
+    response = (200, {"Cache-Control": "max-age=600", "Content-Encoding": "gzip"}, b"js", False)
+
+    action, argument, fetches = route(cache, [response])
+    assert action == "fulfill" and argument["body"] == b"js"
+    assert "Content-Encoding" not in argument["headers"]
+    assert len(fetches) == 1
+
+    action, argument, fetches = route(cache, [])
+    assert action == "fulfill" and argument["body"] == b"js"
+    assert fetches == []
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_revalidated_with_304(cache):
+    route(cache, [(200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b"old", False)])
+
+    action, argument, fetches = route(cache, [(304, {"Cache-Control": "max-age=600"}, b"", False)])
+
+    assert fetches[0]["if-none-match"] == '"v1"'
+    assert action == "fulfill" and argument["status"] == 200 and argument["body"] == b"old"
+    assert cache.stats()["revalidated"] == 1
+    # 304 更新了有效期，之后直接命中
+    assert route(cache, [])[2] == []
+
+
+def test_private_and_credentialed_responses_not_stored(cache):
+    route(cache, [(200, {"Cache-Control": "private, max-age=600"}, b"mine", False)])
+    route(cache, [(200, {"Cache-Control": "max-age=600"}, b"a", False)], url="https://example.com/a")
+    route(cache, [(200, {"Cache-Control": "max-age=600"}, b"b", True)], url="https://example.com/b")
+    route(cache, [(200, {"Cache-Control": "max-age=600"}, b"c", False)], url="https://example.com/c",
+          request_headers={"Cookie": "sid=1"})
+
+    assert cache.lookup("GET", URL, {}) is None
+    assert cache.lookup("GET", "https://example.com/b", {}) is None
+    assert cache.lookup("GET", "https://example.com/c", {}) is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_redirect_replayed_without_following(cache):
+    headers = {"Location": "https://example.com/new", "Cache-Control": "max-age=600"}
+    route(cache, [(301, headers, b"", False)])
+
+    action, argument, fetches = route(cache, [])
+
+    assert fetches == []
+    assert action == "fulfill" and argument["status"] == 301
+    assert argument["headers"]["location"] == "https://example.com/new"
+
+
+def test_stale_entry_served_when_fetch_fails(cache):
+    route(cache, [(200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b"old", False)])
+
+    action, argument, _ = route(cache, [ConnectionError("offline")])
+
+    assert action == "fulfill" and argument["body"] == b"old"
+
+
+def test_fetch_error_without_entry_falls_back(cache):
+    action, argument, _ = route(cache, [ConnectionError("offline")])
+
+    # 没有缓存时交给浏览器正常访问网络，不把临时的网络错误变成页面错误
+    assert (action, argument) == ("fallback", None)
+
+
+def test_non_get_requests_fall_back(cache):
+    assert route(cache, [], method="POST") == ("fallback", None, [])
+    assert route(cache, [], url="data:text/plain,hi") == ("fallback", None, [])
+
+
+def test_vary_header_selects_variant(cache):
+    headers = {"Cache-Control": "max-age=600", "Vary": "Accept-Language"}
+    route(cache, [(200, headers, b"zh", False)], request_headers={"Accept-Language": "zh-CN"})
+
+    assert cache.lookup("GET", URL, {"accept-language": "zh-CN"}) is not None
+    assert cache.lookup("GET", URL, {"accept-language": "en"}) is None
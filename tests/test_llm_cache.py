@@ -0,0 +1,75 @@
+import os
+import sys
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_cache import LLMCache
+from talk import BrowserAgent
+
+
+class FakeChat:
+    model = "test-model"
+
+
+class FakeClient:
+    """模拟执行器：getPageHash 按执行器的格式返回 {"status", "message"}"""
+
+    def __init__(self):
+        self.page_hash = "hash-a"
+
+    def send_command(self, command, params=None, timeout=None, **options):
+        if command == "getPageHash":
+            return {"status": "success", "message": self.page_hash}
+        return {"status": "success", "message": ""}
+
+    def submit(self, command, params=None, **options):
+        future = Future()
+        future.set_result(self.send_command(command, params))
+        return future
+
+
+class CountingAgent(BrowserAgent):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.decisions = 0
+
+    def decide(self, messages):
+        self.decisions += 1
+        return f"回复 {self.decisions}", None, None
+
+
+def make_agent(tmp_path):
+    client = FakeClient()
+    agent = CountingAgent(FakeChat(), client, cache=LLMCache(str(tmp_path / "cache.db")), stream_output=False)
+    agent.commands = ["getPageHash"]
+    return agent, client
+
+
+def test_page_state_reads_hash_from_executor_response(tmp_path):
+    agent, client = make_agent(tmp_path)
+    assert agent.page_state() == "hash-a"
+
+
+def test_same_page_hits_cache(tmp_path):
+    agent, _ = make_agent(tmp_path)
+    messages = [{"role": "user", "content": "打开首页"}]
+
+    first, _, _ = agent.cached_step(messages)
+    second, _, _ = agent.cached_step(messages)
+
+    assert first == second
+    assert agent.decisions == 1
+
+
+def test_changed_page_hash_misses_cache(tmp_path):
+    agent, client = make_agent(tmp_path)
+    messages = [{"role": "user", "content": "打开首页"}]
+
+    agent.cached_step(messages)
+    client.page_hash = "hash-b"
+    reply, _, _ = agent.cached_step(messages)
+
+    assert reply == "回复 2"
+    assert agent.decisions == 2
+    assert agent.cache.misses == 2
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network import NetworkInterceptor, format_response_body, format_responses, parse_list
+
+
+def test_no_rules_means_no_routing():
+    interceptor = NetworkInterceptor()
+
+    assert not interceptor.blocking
+    assert not interceptor.should_block("https://google-analytics.com/collect", "image")
+    assert interceptor.describe() == "未设置拦截规则"
+
+
+def test_blocks_by_resource_type():
+    interceptor = NetworkInterceptor(block_resources="image, font")
+
+    assert interceptor.blocking
+    assert interceptor.should_block("https://example.com/logo.png", "image")
+    assert interceptor.should_block("https://example.com/a.woff2", "font")
+    assert not interceptor.should_block("https://example.com/", "document")
+
+
+def test_unknown_resource_type_rejected():
+    with pytest.raises(ValueError):
+        NetworkInterceptor(block_resources="image,pictures")
+
+
+def test_blocks_tracker_domains_and_subdomains_only():
+    interceptor = NetworkInterceptor(block_trackers="true")
+
+    assert interceptor.should_block("https://www.google-analytics.com/g/collect", "xhr")
+    assert interceptor.should_block("https://hm.baidu.com/hm.js?abc", "script")
+    assert not interceptor.should_block("https://notdoubleclick.net/", "script")
+    assert not interceptor.should_block("https://example.com/?ref=doubleclick.net", "document")
+
+
+def test_blocks_by_url_pattern():
+    interceptor = NetworkInterceptor(block_urls="*.mp4,https://cdn.example.com/ads/*")
+
+    assert interceptor.should_block("https://video.example.com/intro.mp4", "media")
+    assert interceptor.should_block("https://cdn.example.com/ads/banner.js", "script")
+    assert not interceptor.should_block("https://cdn.example.com/app.js", "script")
+
+
+def test_configure_none_clears_rules():
+    interceptor = NetworkInterceptor(block_resources="image", block_urls="*.mp4")
+
+    interceptor.configure(block_resources="none", block_urls=[])
+
+    assert parse_list("none") == []
+    assert not interceptor.blocking
+
+
+def test_ring_buffer_keeps_latest_responses():
+    interceptor = NetworkInterceptor(max_captured_responses=3)
+    for i in range(5):
+        interceptor.add_response(f"https://example.com/api/{i}", 200, "GET", "xhr", "application/json", None)
+
+    assert [entry["url"] for entry in interceptor.list()] == [f"https://example.com/api/{i}" for i in (2, 3, 4)]
+    assert [entry["url"] for entry in interceptor.list(limit=2)] == [f"https://example.com/api/{i}" for i in (3, 4)]
+    assert interceptor.find("api/0") is None
+    assert interceptor.find("api/")["url"] == "https://example.com/api/4"
+
+
+def test_find_prefers_exact_match_and_latest_document():
+    interceptor = NetworkInterceptor()
+    interceptor.add_response("https://example.com/", 200, "GET", "document", "text/html", b"home", page_id="p1")
+    interceptor.add_response("https://example.com/search", 200, "GET", "document", "text/html", b"s", page_id="p2")
+    interceptor.add_response("https://example.com/search?q=1", 200, "GET", "xhr", "application/json", b"{}",
+                             page_id="p2")
+
+    assert interceptor.find("https://example.com/search")["resource_type"] == "document"
+    assert interceptor.find()["url"] == "https://example.com/search"
+    assert interceptor.find(page_id="p1")["url"] == "https://example.com/"
+
+
+def test_large_body_truncated():
+    interceptor = NetworkInterceptor(max_body_size=10)
+    interceptor.add_response("https://example.com/", 200, "GET", "document", "text/html; charset=gbk",
+                             "中文内容很长很长".encode("gbk"))
+
+    entry = interceptor.find()
+    assert entry["truncated"]
+    assert entry["size"] == 16
+    assert len(entry["body"]) == 10
+    assert format_response_body(entry).startswith("响应 200 GET https://example.com/")
+    assert "已截断" in format_response_body(entry)
+
+
+def test_clear_resets_responses_and_blocked_count():
+    interceptor = NetworkInterceptor()
+    interceptor.add_response("https://example.com/", 200, "GET", "document", "text/html", None)
+    interceptor.blocked_count = 3
+    assert format_responses(interceptor.list(), interceptor.blocked_count).startswith("已记录 1 个响应，已拦截 3 个请求")
+
+    interceptor.clear()
+
+    assert interceptor.list() == []
+    assert interceptor.blocked_count == 0
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import socket
+import sys
+import threading
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from protocol import (send_frame, recv_frame, read_frame_async, write_frame, is_framed_prefix, ProtocolError,
+                      ExecutorClient, FRAME_PREFIX, STREAM_CHUNK_SIZE, StreamAssembler, iter_stream_frames,
+                      parse_stream_options, parse_stream_range, supported_encodings)
+
+
+class BufferWriter:
+    """收集 write_frame 写出的字节"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+def read_async(data: bytes, prefix: bytes = b""):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_frame_async(reader, prefix)
+
+    return asyncio.run(read())
+
+
+def test_frame_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, {"id": 1, "command": "goto", "params": {"url": "https://例子.com"}}, b"\x00\x01body")
+        send_frame(left, {"id": 2, "command": "getTitle"})
+
+        assert recv_frame(right) == ({"id": 1, "command": "goto", "params": {"url": "https://例子.com"}},
+                                     b"\x00\x01body")
+        assert recv_frame(right) == ({"id": 2, "command": "getTitle"}, b"")
+
+        left.close()
+        assert recv_frame(right) is None
+
+
+def test_frame_starts_with_zero_byte():
+    writer = BufferWriter()
+    write_frame(writer, {"id": 1, "command": "status"})
+
+    assert is_framed_prefix(bytes(writer.data[:1]))
+    assert not is_framed_prefix(b"g")
+    assert not is_framed_prefix(b"")
+
+
+def test_connection_closed_mid_frame():
+    left, right = socket.socketpair()
+    with left, right:
+        writer = BufferWriter()
+        write_frame(writer, {"id": 1}, b"body")
+        left.sendall(bytes(writer.data[:-2]))
+        left.close()
+
+        with pytest.raises(ProtocolError):
+            recv_frame(right)
+
+
+def test_oversized_frame_rejected():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(FRAME_PREFIX.pack(2, 512 * 1024 * 1024))
+
+        with pytest.raises(ProtocolError):
+            recv_frame(right)
+
+
+def test_read_frame_async_matches_sync_encoding():
+    writer = BufferWriter()
+    write_frame(writer, {"id": 7, "result": {"status": "success"}}, b"payload")
+    data = bytes(writer.data)
+
+    assert read_async(data) == ({"id": 7, "result": {"status": "success"}}, b"payload")
+    # 服务器先读取首字节判断协议，剩余的前缀由 read_frame_async 补齐
+    assert read_async(data[1:], prefix=data[:1]) == ({"id": 7, "result": {"status": "success"}}, b"payload")
+    assert read_async(b"") is None
+
+    with pytest.raises(ProtocolError):
+        read_async(data[:-1])
+
+
+def serve_once(handler):
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def run():
+        conn, _ = server.accept()
+        with conn:
+            handler(conn)
+        server.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return server.getsockname()[1], thread
+
+
+def test_client_resolves_out_of_order_responses():
+    def handler(conn):
+        first, _ = recv_frame(conn)
+        second, _ = recv_frame(conn)
+        # 先返回后到的请求，客户端应按 id 把结果交给对应的 Future
+        send_frame(conn, {"id": second["id"], "result": {"message": second["command"]}})
+        send_frame(conn, {"id": first["id"], "result": {"message": first["command"]}})
+        recv_frame(conn)
+
+    port, thread = serve_once(handler)
+    with ExecutorClient(port=port, timeout=5) as client:
+        slow = client.submit("goto", {"url": "https://example.com"})
+        fast = client.submit("getTitle")
+
+        assert fast.result(timeout=5) == {"message": "getTitle"}
+        assert slow.result(timeout=5) == {"message": "goto"}
+    thread.join(timeout=5)
+
+
+def test_client_fails_pending_requests_when_server_closes():
+    def handler(conn):
+        recv_frame(conn)
+
+    port, thread = serve_once(handler)
+    with ExecutorClient(port=port, timeout=5) as client:
+        future = client.submit("getTitle")
+
+        with pytest.raises(ConnectionResetError):
+            future.result(timeout=5)
+    thread.join(timeout=5)
+
+
+def test_stream_options_reject_invalid_values():
+    assert parse_stream_options() == ("identity", STREAM_CHUNK_SIZE)
+    assert parse_stream_options("zlib, identity", "1024") == ("zlib", 1024)
+
+    for encoding, chunk_size in (("br", None), (5, None), (None, 0), (None, "x"), (None, True), (None, -1)):
+        with pytest.raises(ValueError):
+            parse_stream_options(encoding, chunk_size)
+
+
+def test_stream_range_rejects_invalid_values():
+    assert parse_stream_range() == (0, None)
+    assert parse_stream_range("10", "") == (10, None)
+    assert parse_stream_range(0, 0) == (0, 0)
+
+    for offset, max_size in ((-1, None), ("abc", None), (None, -5), (None, "1k"), (True, None)):
+        with pytest.raises(ValueError):
+            parse_stream_range(offset, max_size)
+
+
+def test_plain_stream_frames_split_on_chunk_size():
+    data = bytes(range(256)) * 10
+    frames = list(iter_stream_frames(9, {"status": "success"}, data, "identity", 1000))
+
+    assert [len(body) for _, body in frames] == [1000, 1000, 560, 0]
+    assert [header["chunk"] for header, _ in frames] == [0, 1, 2, 3]
+    assert all(header["more"] for header, _ in frames[:-1])
+    last = frames[-1][0]
+    assert not last["more"]
+    assert last["result"]["chunks"] == 4
+    assert last["result"]["encoded_size"] == len(data)
+
+
+def test_compressed_stream_frames_round_trip():
+    data = b"<div>" * 50000
+    frames = list(iter_stream_frames(9, {"status": "success"}, data, "zlib", 4096))
+
+    # 压缩器会缓冲输入，帧数少于按原始大小切分的块数，各帧的大小也不等于 chunk_size
+    assert len(frames) < len(data) // 4096
+    assert frames[-1][0]["result"]["encoded_size"] == sum(len(body) for _, body in frames)
+    assert zlib.decompress(b"".join(bytes(body) for _, body in frames)) == data
+
+
+@pytest.mark.parametrize("encoding", supported_encodings())
+def test_assembler_reassembles_interleaved_streams(encoding):
+    first = os.urandom(3000) + b"a" * 20000
+    second = b"b" * 7000
+    assembler = StreamAssembler()
+    frames_a = list(iter_stream_frames(1, {"status": "success"}, first, encoding, 1024))
+    frames_b = list(iter_stream_frames(2, {"status": "success"}, second, encoding, 1024))
+
+    results = {}
+    for index in range(max(len(frames_a), len(frames_b))):
+        for frames in (frames_a, frames_b):
+            if index < len(frames):
+                header, body = frames[index]
+                done, result = assembler.feed(header, bytes(body))
+                if done:
+                    results[header["id"]] = result
+
+    assert results[1]["content"] == first
+    assert results[2]["content"] == second
+    assert results[1]["encoding"] == encoding
+    assert assembler.streams == {}
+
+
+def test_assembler_drops_partial_stream_on_error_reply():
+    assembler = StreamAssembler()
+    header, body = next(iter_stream_frames(4, {"status": "success"}, b"x" * 5000, "identity", 1024))
+    assert assembler.feed(header, bytes(body)) == (False, None)
+
+    done, result = assembler.feed({"id": 4, "result": {"status": "error", "message": "失败"}}, b"")
+
+    assert done and result["status"] == "error"
+    assert assembler.streams == {}
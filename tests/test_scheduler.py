@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt import get_task_completion_marker
+from scheduler import TaskScheduler
+from talk import OllamaChat
+
+
+class FakeExecutor:
+    """模拟执行器：每个 openSession 分配一个新会话，记录各会话收到的指令"""
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.opened = []
+        self.closed = []
+        self.commands = []
+
+    def send_command(self, command, params=None, timeout=None, **options):
+        session = options.get("session") or (params or {}).get("session")
+        with self.lock:
+            self.commands.append((command, session))
+            if command == "listCommands":
+                return {"status": "success", "commands": ["goto", "getTitle"]}
+            if command == "getSessions":
+                return {"status": "success", "workers": self.workers}
+            if command == "openSession":
+                session = f"s{len(self.opened) + 1}"
+                self.opened.append(session)
+                return {"status": "success", "session": session}
+            if command == "closeSession":
+                self.closed.append(session)
+        return {"status": "success", "message": ""}
+
+    def submit(self, command, params=None, **options):
+        future = Future()
+        future.set_result(self.send_command(command, params, **options))
+        return future
+
+
+class FakeResponse:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.tracker.leave()
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        time.sleep(0.03)
+        message = {"message": {"content": f"{get_task_completion_marker()}: 已完成"}, "done": True}
+        yield json.dumps(message, ensure_ascii=False).encode("utf-8")
+
+
+class ConcurrencyTracker:
+    """替代 requests.Session，统计同时进行的模型请求数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+
+    def post(self, url, json=None, stream=False, timeout=None):
+        with self.lock:
+            self.active += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.active)
+        return FakeResponse(self)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def close(self):
+        pass
+
+
+def make_scheduler(tracker, executor, **options):
+    def chat_factory(limiter):
+        chat = OllamaChat("test-model", limiter=limiter)
+        chat.session = tracker
+        return chat
+
+    return TaskScheduler(executor, chat_factory, **options)
+
+
+def test_llm_requests_never_exceed_parallel_limit():
+    tracker = ConcurrencyTracker()
+    executor = FakeExecutor(workers=6)
+    scheduler = make_scheduler(tracker, executor, llm_parallel=2)
+
+    results = scheduler.run([f"任务 {i}" for i in range(12)])
+
+    assert len(results) == 12
+    assert all(result["status"] == "completed" for result in results)
+    assert tracker.requests == 12
+    assert tracker.peak == 2
+
+
+def test_each_agent_uses_and_closes_its_own_session():
+    tracker = ConcurrencyTracker()
+    executor = FakeExecutor(workers=3)
+    scheduler = make_scheduler(tracker, executor, llm_parallel=3)
+
+    results = scheduler.run([f"任务 {i}" for i in range(6)])
+
+    assert len(executor.opened) == 3
+    assert sorted(executor.closed) == sorted(executor.opened)
+    assert {result["session"] for result in results} <= set(executor.opened)
+    starts = [session for command, session in executor.commands if command == "startBrowser"]
+    stops = [session for command, session in executor.commands if command == "stopBrowser"]
+    assert len(starts) == len(stops) == 6
+
+
+def test_agents_are_capped_by_task_count():
+    tracker = ConcurrencyTracker()
+    executor = FakeExecutor(workers=8)
+    scheduler = make_scheduler(tracker, executor, llm_parallel=4)
+
+    scheduler.run(["只有一个任务"])
+
+    assert len(executor.opened) == 1